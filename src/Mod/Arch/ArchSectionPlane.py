@@ -65,6 +65,53 @@ def makeSectionView(section):
     view.Label = str(translate("Arch","View of"))+" "+section.Name
     return view
 
+class _SectionCache:
+    """A cache of the cut and projected results of objects, shared by all section
+    views. The least recently used entries are dropped when the number of entries
+    exceeds the SectionCacheSize preference"""
+    def __init__(self):
+        self.entries = {}
+        self.tick = 0
+
+    def getMaxSize(self):
+        size = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch").GetInt("SectionCacheSize")
+        if not size:
+            size = 1024
+        return size
+
+    def get(self,key):
+        if key in self.entries:
+            self.tick += 1
+            self.entries[key][0] = self.tick
+            return self.entries[key][1]
+        return None
+
+    def set(self,key,value):
+        self.tick += 1
+        self.entries[key] = [self.tick,value]
+        size = self.getMaxSize()
+        if len(self.entries) > size:
+            # drop the oldest quarter in one go, not one entry per insertion
+            old = sorted(self.entries.iteritems(),key=lambda e:e[1][0])
+            for k,e in old[:len(self.entries)-(size*3)/4]:
+                del self.entries[k]
+
+    def clear(self):
+        self.entries = {}
+
+sectionCache = _SectionCache()
+
+def getViewKey(obj,o=None):
+    """getViewKey(view,[object]): returns a key identifying the rendering of the
+    given object (or of the whole view) by the given section view: the shape of the
+    object, the placement of the section plane, the rendering mode and cut display"""
+    key = (str(obj.Source.Placement.toMatrix()),obj.RenderingMode,getattr(obj,"ShowCut",False))
+    if o:
+        key = (o.Name,Draft.getShapeStamp(o.Shape),str(o.Placement.toMatrix()))+key
+        if obj.RenderingMode == "Solid":
+            key += (tuple(o.ViewObject.ShapeColor),)
+    return key
+
 class _CommandSectionPlane:
     "the Arch SectionPlane command definition"
     def GetResources(self):
@@ -208,6 +255,8 @@ class _ArchDrawingView:
 
     def execute(self, obj):
         if obj.Source:
+            # cheap when nothing changed, thanks to the section cache
+            self.buildSVG(obj)
             obj.ViewResult = self.updateSVG(obj)
             
     def onChanged(self, obj, prop):
@@ -250,15 +299,45 @@ class _ArchDrawingView:
             FreeCAD.Console.PrintMessage(str(translate("Arch","No shape has been computed yet, select wireframe rendering and render again")))
             return None
 
+    def getCutVolume(self,obj,objs):
+        "returns the cut face and volumes of the section plane for the given objects"
+        if obj.RenderingMode == "Solid":
+            shapes = [o.Shape for o in objs if o.Shape.Faces]
+        else:
+            shapes = []
+            for o in objs:
+                if o.Shape.isValid():
+                    shapes.extend(o.Shape.Solids)
+        if shapes:
+            return ArchCommands.getCutVolume(obj.Source.Shape.copy(),shapes)
+        return (None,None,None)
+
     def buildSVG(self, obj,join=False):
-        "creates a svg representation"
+        """creates a svg representation. Cut and projected results of each object are
+        kept in the section cache, so only the objects that changed are computed again"""
         import Part, DraftGeomUtils
         if hasattr(obj,"Source"):
             if obj.Source:
                 if obj.Source.Objects:
                     objs = Draft.getGroupContents(obj.Source.Objects,walls=True)
                     objs = Draft.removeHidden(objs)
+                    objs = [o for o in objs if o.isDerivedFrom("Part::Feature")]
                     self.svg = ''
+                    showcut = False
+                    if hasattr(obj,"ShowCut"):
+                        showcut = obj.ShowCut
+                    keys = [getViewKey(obj,o) for o in objs]
+                    viewkey = ("View",obj.Name,tuple(keys))
+                    cached = sectionCache.get(viewkey)
+                    if cached != None:
+                        if obj.RenderingMode != "Solid":
+                            self.direction = cached[1]
+                            if cached[3]:
+                                self.shapes,self.baseshape = cached[2:]
+                        self.svg = cached[0]
+                        return
+                    # the cut volumes are only needed by objects missing from the cache
+                    volumes = None
 
                     # generating SVG
                     if obj.RenderingMode == "Solid":
@@ -266,17 +345,27 @@ class _ArchDrawingView:
                         import ArchVRM
                         render = ArchVRM.Renderer()
                         render.setWorkingPlane(obj.Source.Placement)
-                        render.addObjects(objs)
-                        if hasattr(obj,"ShowCut"):
-                            render.cut(obj.Source.Shape,obj.ShowCut)
-                        else:
-                            render.cut(obj.Source.Shape)
+                        for i in range(len(objs)):
+                            data = sectionCache.get(keys[i])
+                            if data == None:
+                                if volumes == None:
+                                    volumes = self.getCutVolume(obj,objs)
+                                # cut, trim and reorient this object alone
+                                r = ArchVRM.Renderer()
+                                r.setWorkingPlane(obj.Source.Placement)
+                                r.addObjects([objs[i]])
+                                r.cut(obj.Source.Shape,showcut,volumes)
+                                r.removeHidden()
+                                r.reorient()
+                                data = (r.faces,r.sections,r.hiddenEdges)
+                                sectionCache.set(keys[i],data)
+                            render.addProjected(data[0],data[1],data[2])
                         self.svg += render.getViewSVG(linewidth="LWPlaceholder")
                         self.svg += render.getSectionSVG(linewidth="SWPLaceholder")
-                        if hasattr(obj,"ShowCut"):
-                            if obj.ShowCut:
-                                self.svg += render.getHiddenSVG(linewidth="LWPlaceholder")
+                        if showcut:
+                            self.svg += render.getHiddenSVG(linewidth="LWPlaceholder")
                         # print render.info()
+                        sectionCache.set(viewkey,(self.svg,))
                         
                     else:
                         # render using the Drawing module
@@ -286,28 +375,38 @@ class _ArchDrawingView:
                         sshapes = []
                         p = FreeCAD.Placement(obj.Source.Placement)
                         self.direction = p.Rotation.multVec(FreeCAD.Vector(0,0,1))
-                        for o in objs:
-                            if o.isDerivedFrom("Part::Feature"):
-                                if o.Shape.isValid():
-                                    shapes.extend(o.Shape.Solids)
-                                else:
-                                    FreeCAD.Console.PrintWarning(str(translate("Arch","Skipping invalid object: "))+o.Name)
-                        cutface,cutvolume,invcutvolume = ArchCommands.getCutVolume(obj.Source.Shape.copy(),shapes)
-                        if cutvolume:
-                            nsh = []
-                            for sh in shapes:
-                                for sol in sh.Solids:
-                                    if sol.Volume < 0:
-                                        sol.reverse()
-                                    c = sol.cut(cutvolume)
-                                    s = sol.section(cutface)
-                                    nsh.extend(c.Solids)
-                                    sshapes.append(s)
-                                    if hasattr(obj,"ShowCut"):
-                                        if obj.ShowCut:
+                        for i in range(len(objs)):
+                            o = objs[i]
+                            if not o.Shape.isValid():
+                                FreeCAD.Console.PrintWarning(str(translate("Arch","Skipping invalid object: "))+o.Name)
+                                continue
+                            data = sectionCache.get(keys[i])
+                            if data == None:
+                                if volumes == None:
+                                    volumes = self.getCutVolume(obj,objs)
+                                cutface,cutvolume,invcutvolume = volumes
+                                # cut this object alone
+                                osh = o.Shape.Solids
+                                osshapes = []
+                                ohshapes = []
+                                if cutvolume:
+                                    nsh = []
+                                    for sol in osh:
+                                        if sol.Volume < 0:
+                                            sol.reverse()
+                                        c = sol.cut(cutvolume)
+                                        s = sol.section(cutface)
+                                        nsh.extend(c.Solids)
+                                        osshapes.append(s)
+                                        if showcut:
                                             c = sol.cut(invcutvolume)
-                                            hshapes.append(c)
-                            shapes = nsh
+                                            ohshapes.append(c)
+                                    osh = nsh
+                                data = (osh,osshapes,ohshapes)
+                                sectionCache.set(keys[i],data)
+                            shapes.extend(data[0])
+                            sshapes.extend(data[1])
+                            hshapes.extend(data[2])
                         if shapes:
                             self.shapes = shapes
                             self.baseshape = Part.makeCompound(shapes)
@@ -342,6 +441,7 @@ class _ArchDrawingView:
                                 svgs = svgs.replace('stroke-width="1"','stroke-width="SWPlaceholder"')
                                 svgs = svgs.replace('stroke-width:0.01','stroke-width:SWPlaceholder')
                                 self.svg += svgs
+                        sectionCache.set(viewkey,(self.svg,self.direction,getattr(self,"shapes",None),getattr(self,"baseshape",None)))
 
     def updateSVG(self, obj):
         "Formats and places the calculated svg stuff on the page"
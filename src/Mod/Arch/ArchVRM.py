@@ -23,9 +23,16 @@
 
 "The FreeCAD Arch Vector Rendering Module"
 
-import FreeCAD,math,Part,ArchCommands,DraftVecUtils,DraftGeomUtils
+import FreeCAD,math,time,heapq,Part,ArchCommands,DraftVecUtils,DraftGeomUtils
+
+try:
+    import numpy
+except ImportError:
+    # faces are then culled and projected one by one
+    numpy = None
 
 MAXLOOP = 10 # the max number of loop before abort
+GRIDSIZE = 64 # the max number of cells per side of the sorting grid
 
 # WARNING: in this module, faces are lists whose first item is the actual OCC face, the
 # other items being additional information such as color, etc.
@@ -75,6 +82,8 @@ class Renderer:
         self.joined = False
         self.sections = []
         self.hiddenEdges = []
+        self.stats = {}
+        self.normals = None
 
     def setWorkingPlane(self,wp):
         "sets a Draft WorkingPlane or Placement for this renderer"
@@ -104,6 +113,17 @@ class Renderer:
         self.resetFlags()
         if DEBUG: print "adding ", len(self.objects), " objects, ", len(self.faces), " faces"
 
+    def addProjected(self,faces,sections=[],hiddenEdges=[]):
+        """add faces, section faces and hidden edges that are already cut, trimmed
+        and reoriented on the WP of this renderer, for ex. by another renderer"""
+        self.faces.extend(faces)
+        self.sections.extend(sections)
+        self.hiddenEdges.extend(hiddenEdges)
+        self.iscut = True
+        self.trimmed = True
+        self.oriented = True
+        self.sorted = False
+
     def addShapes(self,shapes,color=(0.9,0.9,0.9,1.0)):
         "add shapes to this renderer, optionally with a color. Warning, these will get lost if using join()"
         if DEBUG: print "adding ", len(shapes), " shapes"
@@ -120,6 +140,8 @@ class Renderer:
         r += "oriented: " + str(self.oriented) + "\n"
         r += "trimmed: " + str(self.trimmed) + "\n"
         r += "sorted: " + str(self.sorted) + "\n"
+        for k in sorted(self.stats.keys()):
+            r += k + ": " + str(self.stats[k]) + "\n"
         r += "contains " + str(len(self.faces)) + " faces\n"
         for i in range(len(self.faces)):
             r += "  face " + str(i) + " : center " + str(self.faces[i][0].CenterOfMass)
@@ -150,9 +172,18 @@ class Renderer:
         #print "VRM: start reorient"
         if not self.faces: 
             return
-        self.faces = [self.projectFace(f) for f in self.faces]
+        if numpy:
+            normals = None
+            if self.normals and (self.normals[0] is self.faces):
+                normals = self.normals[1]
+            self.faces = self.projectFaces(self.faces,normals)
+        else:
+            self.faces = [self.projectFace(f) for f in self.faces]
         if self.sections:
-            self.sections = [self.projectFace(f) for f in self.sections]
+            if numpy:
+                self.sections = self.projectFaces(self.sections)
+            else:
+                self.sections = [self.projectFace(f) for f in self.sections]
         if self.hiddenEdges:
             self.hiddenEdges = [self.projectEdge(e) for e in self.hiddenEdges]
         self.oriented = True
@@ -162,10 +193,19 @@ class Renderer:
         "removes faces pointing outwards"
         if not self.faces: 
             return
-        faces = []
-        for f in self.faces:
-            if self.isVisible(f):
-                faces.append(f)
+        if numpy:
+            # all normals against the view axis in one operation
+            normals = numpy.array([self.toTuple(f[0].normalAt(0,0)) for f in self.faces])
+            axis = numpy.array(self.toTuple(self.wp.axis))
+            visible = numpy.dot(normals,axis) > 0
+            faces = [self.faces[i] for i in numpy.nonzero(visible)[0]]
+            # kept for reorient, so each face is only asked its normal once
+            self.normals = (faces,normals[visible])
+        else:
+            faces = []
+            for f in self.faces:
+                if self.isVisible(f):
+                    faces.append(f)
         if DEBUG: print len(self.faces)-len(faces) , " faces removed, ", len(faces), " faces retained"
         self.faces = faces
         self.trimmed = True
@@ -204,6 +244,67 @@ class Renderer:
             #print "VRM: projectFace end: ",len(sh.Vertexes)," verts"
             return [sh]+face[1:]
 
+    def toTuple(self,v):
+        "returns a tuple from a vector"
+        return (v.x,v.y,v.z)
+
+    def getLocalMatrix(self):
+        "returns the origin and the rotation matrix of the WP as numpy arrays"
+        rows = []
+        for v in [self.wp.u,self.wp.v,self.wp.axis]:
+            rows.append(numpy.array(self.toTuple(v))/v.Length)
+        return numpy.array(self.toTuple(self.wp.position)),numpy.array(rows)
+
+    def projectFaces(self,faces,normals=None):
+        """projects a list of faces on the WP. The vertices and normals of all
+        the faces are transformed to WP coordinates in a single operation.
+        normals can be an array of the normals of the faces already computed"""
+        # gather the points of all wires in one flat list
+        points = []
+        wires = []
+        if normals is None:
+            normals = [self.toTuple(face[0].normalAt(0,0)) for face in faces]
+        for face in faces:
+            fwires = []
+            for w in face[0].Wires:
+                start = len(points)
+                edges = DraftGeomUtils.sortEdges(w.Edges)
+                for e in edges:
+                    points.append(self.toTuple(e.Vertexes[0].Point))
+                fwires.append((start,len(points)))
+            wires.append(fwires)
+        if not points:
+            return [self.projectFace(f) for f in faces]
+        origin,matrix = self.getLocalMatrix()
+        points = numpy.dot(numpy.array(points)-origin,matrix.T)
+        normals = numpy.dot(numpy.array(normals),matrix.T)
+        # rebuild the faces from the transformed points
+        result = []
+        for i in range(len(faces)):
+            polygons = []
+            for start,end in wires[i]:
+                verts = [FreeCAD.Vector(tuple(p)) for p in points[start:end]]
+                if verts:
+                    verts.append(verts[0])
+                if len(verts) > 2:
+                    polygons.append(Part.makePolygon(verts))
+            if not polygons:
+                if DEBUG: print "Error: Unable to project face on the WP"
+                result.append(None)
+                continue
+            try:
+                sh = ArchCommands.makeFace(polygons)
+            except:
+                if DEBUG: print "Error: Unable to project face on the WP"
+                result.append(None)
+            else:
+                # restoring flipped normals
+                vnorm = FreeCAD.Vector(tuple(normals[i]))
+                if vnorm.getAngle(sh.normalAt(0,0)) > 1:
+                    sh.reverse()
+                result.append([sh]+faces[i][1:])
+        return result
+
     def projectEdge(self,edge):
         "projects a single edge on the WP"
         if len(edge.Vertexes) > 1:
@@ -231,8 +332,10 @@ class Renderer:
         else:
             return [sh]+face[1:]
 
-    def cut(self,cutplane,hidden=False):
-        "Cuts through the shapes with a given cut plane and builds section faces"
+    def cut(self,cutplane,hidden=False,volumes=None):
+        """Cuts through the shapes with a given cut plane and builds section faces.
+        volumes can be a cutface,cutvolume,invcutvolume list already computed
+        with ArchCommands.getCutVolume"""
         if DEBUG: print "\n\n======> Starting cut\n\n"
         if self.iscut:
             return
@@ -243,7 +346,10 @@ class Renderer:
             shps = []
             for sh in self.shapes:
                 shps.append(sh[0])
-            cutface,cutvolume,invcutvolume = ArchCommands.getCutVolume(cutplane,shps)
+            if volumes:
+                cutface,cutvolume,invcutvolume = volumes
+            else:
+                cutface,cutvolume,invcutvolume = ArchCommands.getCutVolume(cutplane,shps)
             if cutface and cutvolume:
                 shapes = []
                 faces = []
@@ -435,33 +541,71 @@ class Renderer:
                         s = fs
                 objs.append([s,col])
 
-    def findPosition(self,f1,faces):
-        "Finds the position of a face in a list of faces"
-        l = None
-        h = None
-        for f2 in faces:
-            if DEBUG: print "comparing face",str(self.faces.index(f1))," with face",str(self.faces.index(f2))
-            r = self.compare(f1,f2)
-            if r == 1:
-                l = faces.index(f2)
-            elif r == 2:
-                if h == None:
-                    h = faces.index(f2)
-                else:
-                    if faces.index(f2) < h:
-                        h = faces.index(f2)
-        if l != None:
-            return l + 1
-        elif h != None:
-            return h
-        else:
+    def getGrid(self,faces):
+        """returns a dictionary of grid cells, each containing the indices of
+        the faces whose XY bounding box overlaps that cell"""
+        boxes = [f[0].BoundBox for f in faces]
+        xmin = min([b.XMin for b in boxes])
+        ymin = min([b.YMin for b in boxes])
+        xmax = max([b.XMax for b in boxes])
+        ymax = max([b.YMax for b in boxes])
+        # cells about the size of an average face, within GRIDSIZE per side
+        area = sum([b.XLength*b.YLength for b in boxes])
+        size = math.sqrt(area/len(boxes))
+        size = max(size,(xmax-xmin)/GRIDSIZE,(ymax-ymin)/GRIDSIZE,1e-9)
+        grid = {}
+        for i in range(len(boxes)):
+            b = boxes[i]
+            for x in range(int((b.XMin-xmin)/size),int((b.XMax-xmin)/size)+1):
+                for y in range(int((b.YMin-ymin)/size),int((b.YMax-ymin)/size)+1):
+                    grid.setdefault((x,y),[]).append(i)
+        return grid
+
+    def getPairs(self,faces):
+        "returns the pairs of face indices whose XY bounding boxes overlap"
+        pairs = set()
+        boxes = [f[0].BoundBox for f in faces]
+        for cell in self.getGrid(faces).itervalues():
+            for n in range(len(cell)):
+                i = cell[n]
+                b1 = boxes[i]
+                for j in cell[n+1:]:
+                    b2 = boxes[j]
+                    if (b1.XMax < b2.XMin) or (b1.XMin > b2.XMax) or (b1.YMax < b2.YMin) or (b1.YMin > b2.YMax):
+                        continue
+                    pairs.add((min(i,j),max(i,j)))
+        return pairs
+
+    def splitFace(self,face,cutter):
+        """splits a face by the plane of another face. Returns a list of faces,
+        or None if the face is not crossed by that plane"""
+        try:
+            norm = cutter[0].normalAt(0,0)
+            b = face[0].BoundBox
+            center = FreeCAD.Vector(b.Center)
+            point = cutter[0].Vertexes[0].Point
+            # project the face center on the cut plane
+            center = center.sub(DraftVecUtils.project(center.sub(point),norm))
+            r = b.DiagonalLength*2+1
+            disc = Part.Face(Part.Wire(Part.makeCircle(r,center,norm)))
+            half = disc.extrude(DraftVecUtils.scale(norm,r*2))
+            front = face[0].common(half).Faces
+            back = face[0].cut(half).Faces
+        except:
+            if DEBUG: print "Error: Unable to split face"
+            return None
+        if not (front and back):
             return None
+        return [[f]+face[1:] for f in front+back]
 
     def sort(self):
-        "projects a shape on the WP"
+        """sorts the faces by depth. Only faces whose XY bounding boxes overlap are
+        compared, then faces are ordered from back to front. Faces that are part of
+        a cycle are split by the plane of the face they intersect"""
         if DEBUG: print "\n\n======> Starting sort\n\n"
         if len(self.faces) <= 1:
             return
+        t1 = time.time()
         if not self.trimmed:
             self.removeHidden()
             if DEBUG: print "Done hidden face removal"
@@ -470,63 +614,100 @@ class Renderer:
         if not self.oriented:
             self.reorient()
             if DEBUG: print "Done reorientation"
-        faces = self.faces[:]
-        if DEBUG: print "sorting ",len(self.faces)," faces"
+        t2 = time.time()
+        faces = [f for f in self.faces if f]
+        if not faces:
+            return
+        if DEBUG: print "sorting ",len(faces)," faces"
+
+        # graph of faces: an edge i->j means face i must be drawn before face j
+        after = [set() for f in faces]
+        before = [set() for f in faces]
+        def link(i,j):
+            r = self.compare(faces[i],faces[j])
+            if r == 1:
+                after[j].add(i)
+                before[i].add(j)
+            elif r == 2:
+                after[i].add(j)
+                before[j].add(i)
+        pairs = self.getPairs(faces)
+        for i,j in pairs:
+            link(i,j)
+        compared = len(pairs)
+        t3 = time.time()
+
+        # topological sort, farthest faces first among the ready ones
+        def depth(i):
+            b = faces[i][0].BoundBox
+            return (b.ZMin+b.ZMax)/2
+        alive = set(range(len(faces)))
+        ready = [(depth(i),i) for i in alive if not before[i]]
+        heapq.heapify(ready)
         sfaces = []
-        loopcount = 0
-        notfoundstack = 0
-        while faces:
-            if DEBUG: print "loop ", loopcount
-            f1 = faces[0]
-            if sfaces and (notfoundstack < len(faces)):
-                if DEBUG: print "using ordered stack, notfound = ",notfoundstack
-                p = self.findPosition(f1,sfaces)
-                if p == None:
-                    # no position found, we move the face to the end of the pile
-                    faces.remove(f1)
-                    faces.append(f1)
-                    notfoundstack += 1
-                else:
-                    # position found, we insert it
-                    faces.remove(f1)
-                    sfaces.insert(p,f1)
-                    notfoundstack = 0
-            else:
-                # either there is no stack, or no more face can be compared
-                # find a root, 2 faces that can be compared
-                if DEBUG: print "using unordered stack, notfound = ",notfoundstack
-                for f2 in faces[1:]:
-                    if DEBUG: print "comparing face",str(self.faces.index(f1))," with face",str(self.faces.index(f2))
-                    r = self.compare(f1,f2)
-                    print "comparison result:",r
-                    if r == 1:
-                        faces.remove(f2)
-                        sfaces.append(f2)
-                        faces.remove(f1)
-                        sfaces.append(f1)
-                        notfoundstack = 0
-                        break
-                    elif r == 2:
-                        faces.remove(f1)
-                        sfaces.append(f1)
-                        faces.remove(f2)
-                        sfaces.append(f2)
-                        notfoundstack = 0
-                        break
-                    elif r == 31:
-                        faces.remove(f1)
-                    elif r == 32:
-                        faces.remove(f2)
+        splits = 0
+        cycles = 0
+        while alive:
+            if not ready:
+                # cycle: split the farthest blocked face by the plane of a face behind it
+                cycles += 1
+                i = min(alive,key=depth)
+                pieces = None
+                if splits < MAXLOOP * len(self.faces):
+                    for j in before[i]:
+                        pieces = self.splitFace(faces[i],faces[j])
+                        if pieces:
+                            break
+                neighbours = before[i] | after[i]
+                for j in before[i]:
+                    after[j].discard(i)
+                for j in after[i]:
+                    before[j].discard(i)
+                before[i] = set()
+                after[i] = set()
+                if pieces:
+                    splits += 1
+                    alive.discard(i)
+                    for p in pieces:
+                        k = len(faces)
+                        faces.append(p)
+                        after.append(set())
+                        before.append(set())
+                        alive.add(k)
+                        for j in neighbours:
+                            if j in alive:
+                                link(k,j)
+                                compared += 1
+                        if not before[k]:
+                            heapq.heappush(ready,(depth(k),k))
                 else:
-                    # nothing found, move the face to the end of the pile
-                    faces.remove(f1)
-                    faces.append(f1)
-            loopcount += 1
-            if loopcount == MAXLOOP * len(self.faces):
-                if DEBUG: print "Too many loops, aborting."
-                break
-
-        if DEBUG: print "done Z sorting. ", len(sfaces), " faces retained, ", len(self.faces)-len(sfaces), " faces lost."
+                    # no split possible, draw it as if it was behind
+                    heapq.heappush(ready,(depth(i),i))
+                for j in neighbours:
+                    if (j in alive) and not before[j]:
+                        heapq.heappush(ready,(depth(j),j))
+                continue
+            d,i = heapq.heappop(ready)
+            if (not i in alive) or before[i]:
+                # already drawn, or got a new face behind it since it was queued
+                continue
+            alive.discard(i)
+            sfaces.append(faces[i])
+            for j in after[i]:
+                before[j].discard(i)
+                if (j in alive) and not before[j]:
+                    heapq.heappush(ready,(depth(j),j))
+        t4 = time.time()
+
+        self.stats = {"faces in": len(self.faces),
+                      "faces out": len(sfaces),
+                      "pairs compared": compared,
+                      "cycles": cycles,
+                      "splits": splits,
+                      "projection time": round(t2-t1,3),
+                      "comparison time": round(t3-t2,3),
+                      "ordering time": round(t4-t3,3)}
+        if DEBUG: print "done Z sorting. ", len(sfaces), " faces retained, ", compared, " pairs compared, ", splits, " faces split."
         self.faces = sfaces
         self.sorted = True
         if DEBUG: print "\n\n======> Finished sort\n\n"
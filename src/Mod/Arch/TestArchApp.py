@@ -0,0 +1,177 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import os, shutil, tempfile, unittest
+import ifcReader
+
+#---------------------------------------------------------------------------
+# fixtures
+#---------------------------------------------------------------------------
+
+# a small excerpt of the IFC express schema, with the entities used below.
+# The schema reader expects the windows line endings of the official files
+SCHEMA = """ENTITY IfcRoot;
+	GlobalId : IfcGloballyUniqueId;
+	Name : OPTIONAL IfcLabel;
+END_ENTITY;
+
+ENTITY IfcCartesianPoint;
+	Coordinates : LIST [1:3] OF IfcLengthMeasure;
+END_ENTITY;
+
+ENTITY IfcPolyline;
+	Points : LIST [2:?] OF IfcCartesianPoint;
+END_ENTITY;
+
+ENTITY IfcLocalPlacement;
+	PlacementRelTo : OPTIONAL IfcObjectPlacement;
+	RelativePlacement : IfcAxis2Placement;
+END_ENTITY;
+
+ENTITY IfcWall
+ SUBTYPE OF (IfcRoot);
+	ObjectPlacement : OPTIONAL IfcObjectPlacement;
+	Representation : OPTIONAL IfcProductRepresentation;
+END_ENTITY;
+
+ENTITY IfcSlab
+ SUBTYPE OF (IfcRoot);
+	ObjectPlacement : OPTIONAL IfcObjectPlacement;
+	Representation : OPTIONAL IfcProductRepresentation;
+END_ENTITY;
+""".replace("\n","\r\n")
+
+# entities are not in id order, and some ids are missing
+IFC = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
+FILE_NAME('test.ifc','2013-01-01T00:00:00',('Author'),('Org'),'','','');
+FILE_SCHEMA(('IFC2X3'));
+ENDSEC;
+DATA;
+#1=IFCCARTESIANPOINT((0.,0.,0.));
+#2=IFCCARTESIANPOINT((5.,0.,0.));
+#7=IFCPOLYLINE((#1,#2));
+#5=IFCLOCALPLACEMENT($,#1);
+#12=IFCWALL('3vB2YO$MX4xv5uCqZZG05x','Wall B',#5,#7);
+#10=IFCWALL('2O2Fr$t4X7Zf8NOew3FLOH','Wall A',#5,#7);
+#11=IFCSLAB('0zkHc6sWbBHupNs2bYcCkR','Slab',#5,$);
+#14=IFCWALL('1xS3BCk291UvhgP2a6eflL','Wall A',$,$);
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+def describe(ent):
+    "returns the id, type and python attributes of an entity, references as ids"
+    def value(v):
+        if isinstance(v,ifcReader.IfcEntity):
+            return "#%d" % v.id
+        elif isinstance(v,list):
+            return [value(i) for i in v]
+        return v
+    return (ent.id,ent.type,sorted([(k.strip(),value(getattr(ent,k.strip()))) for k in ent.attributes.keys()]))
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD Arch module
+#---------------------------------------------------------------------------
+
+class IfcReaderTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.schema = os.path.join(self.dir,"schema.exp")
+        self.ifc = os.path.join(self.dir,"test.ifc")
+        f = open(self.schema,"wb")
+        f.write(SCHEMA)
+        f.close()
+        f = open(self.ifc,"wb")
+        f.write(IFC)
+        f.close()
+        self.docs = []
+
+    def tearDown(self):
+        for doc in self.docs:
+            doc.close()
+        shutil.rmtree(self.dir)
+
+    def open(self,streaming):
+        doc = ifcReader.IfcDocument(self.ifc,self.schema,streaming=streaming)
+        self.docs.append(doc)
+        return doc
+
+    def testEntities(self):
+        doc = self.open(False)
+        wall = doc.getEnt(10)
+        self.assertEqual(describe(wall),
+                         (10,"IFCWALL",[("GlobalId","2O2Fr$t4X7Zf8NOew3FLOH"),("Name","Wall A"),
+                                        ("ObjectPlacement","#5"),("Representation","#7")]))
+        self.assertEqual(describe(wall.Representation)[2],[("Points",["#1","#2"])])
+        self.assertEqual(doc.getEnt(3),None)
+
+    def testStreaming(self):
+        doc = self.open(False)
+        stream = self.open(True)
+        # nothing is parsed before it is asked for
+        self.assertEqual(stream.Entities.keys(),[0])
+        self.assertEqual(stream.Entities[0],doc.Entities[0])
+        for i in (1,2,5,7,10,11,12,14):
+            self.assertEqual(describe(stream.getEnt(i)),describe(doc.getEnt(i)))
+        for i in (0,3,13,100):
+            self.assertEqual(stream.getEnt(i) == None,doc.getEnt(i) == None)
+        for t in ("IFCWALL","IfcSlab","IFCDOOR"):
+            self.assertEqual([describe(e) for e in stream.getEnt(t)],[describe(e) for e in doc.getEnt(t)])
+        self.assertEqual([e.id for e in doc.getEnt("IFCWALL")],[10,12,14])
+        self.assertEqual(stream.search("wall"),doc.search("wall"))
+        for args in (("IFCWALL","Name","Wall A"),("IFCWALL","Name","Wall C"),("IFCSLAB","Name","Slab"),("WALL",)):
+            self.assertEqual([describe(e) for e in stream.find(*args)],[describe(e) for e in doc.find(*args)])
+        self.assertEqual([e.id for e in doc.find("IFCWALL","Name","Wall A")],[10,14])
+
+    def testSavedIndex(self):
+        self.open(True)
+        index = ifcReader.IfcIndex(self.ifc)
+        self.failUnless(os.path.exists(index.getIndexFile()))
+        self.failUnless(index.load())
+        self.assertEqual(list(index.ids),[1,2,5,7,10,11,12,14])
+        self.assertEqual(list(index.types["IFCWALL"]),[10,12,14])
+
+    def testModifiedFile(self):
+        self.open(True).close()
+        # the saved index is rejected once the file has changed...
+        f = open(self.ifc,"wb")
+        f.write(IFC.replace("#11=IFCSLAB('0zkHc6sWbBHupNs2bYcCkR','Slab'","#11=IFCWALL('0zkHc6sWbBHupNs2bYcCkR','Wall C'"))
+        f.close()
+        self.failIf(ifcReader.IfcIndex(self.ifc).load())
+        # ...and rebuilt from the new contents
+        self.assertEqual([e.id for e in self.open(True).getEnt("IFCWALL")],[10,11,12,14])
+        self.failUnless(ifcReader.IfcIndex(self.ifc).load())
+        # a change that keeps the file size is detected by its modification time
+        st = os.stat(self.ifc)
+        os.utime(self.ifc,(st.st_atime,st.st_mtime+10))
+        self.failIf(ifcReader.IfcIndex(self.ifc).load())
+
+    def testBrokenIndex(self):
+        index = ifcReader.IfcIndex(self.ifc)
+        f = open(index.getIndexFile(),"wb")
+        f.write("not an index")
+        f.close()
+        self.failIf(index.load())
+        self.assertEqual(self.open(True).getEnt(12).Name,"Wall B")
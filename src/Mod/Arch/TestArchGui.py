@@ -0,0 +1,271 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# The Arch modules need the FreeCAD GUI, so these tests only run when it is up
+
+import FreeCAD, os, shutil, tempfile, unittest, Part
+from FreeCAD import Vector
+import ifcReader
+
+#---------------------------------------------------------------------------
+# fixtures
+#---------------------------------------------------------------------------
+
+# a simplified excerpt of the IFC express schema, with the entities used below
+SCHEMA = """ENTITY IfcRoot;
+	GlobalId : IfcGloballyUniqueId;
+	Name : OPTIONAL IfcLabel;
+END_ENTITY;
+
+ENTITY IfcWindow
+ SUBTYPE OF (IfcRoot);
+	ObjectPlacement : OPTIONAL IfcObjectPlacement;
+	Representation : OPTIONAL IfcProductRepresentation;
+END_ENTITY;
+
+ENTITY IfcProductDefinitionShape;
+	Name : OPTIONAL IfcLabel;
+	Description : OPTIONAL IfcText;
+	Representations : LIST [1:?] OF IfcRepresentation;
+END_ENTITY;
+
+ENTITY IfcShapeRepresentation;
+	RepresentationIdentifier : OPTIONAL IfcLabel;
+	RepresentationType : OPTIONAL IfcLabel;
+	Items : SET [1:?] OF IfcRepresentationItem;
+END_ENTITY;
+
+ENTITY IfcRepresentationMap;
+	MappingOrigin : IfcAxis2Placement;
+	MappedRepresentation : IfcRepresentation;
+END_ENTITY;
+
+ENTITY IfcMappedItem;
+	MappingSource : IfcRepresentationMap;
+	MappingTarget : IfcCartesianTransformationOperator;
+END_ENTITY;
+
+ENTITY IfcCartesianTransformationOperator3D;
+	Scale : OPTIONAL REAL;
+END_ENTITY;
+
+ENTITY IfcExtrudedAreaSolid;
+	Depth : IfcPositiveLengthMeasure;
+END_ENTITY;
+""".replace("\n","\r\n")
+
+# windows #100 and #101 use the same representation map with the same mapping
+# target, #102 uses it with another target, and #103 has geometry of its own
+IFC = """ISO-10303-21;
+HEADER;
+FILE_NAME('test.ifc','2013-01-01T00:00:00',(''),(''),'','','');
+ENDSEC;
+DATA;
+#1=IFCEXTRUDEDAREASOLID(0.1);
+#2=IFCSHAPEREPRESENTATION('Body','SweptSolid',(#1));
+#3=IFCREPRESENTATIONMAP($,#2);
+#4=IFCCARTESIANTRANSFORMATIONOPERATOR3D($);
+#5=IFCCARTESIANTRANSFORMATIONOPERATOR3D(2.);
+#10=IFCMAPPEDITEM(#3,#4);
+#11=IFCSHAPEREPRESENTATION('Body','MappedRepresentation',(#10));
+#12=IFCPRODUCTDEFINITIONSHAPE($,$,(#11));
+#13=IFCMAPPEDITEM(#3,#4);
+#14=IFCSHAPEREPRESENTATION('Body','MappedRepresentation',(#13));
+#15=IFCPRODUCTDEFINITIONSHAPE($,$,(#14));
+#16=IFCMAPPEDITEM(#3,#5);
+#17=IFCSHAPEREPRESENTATION('Body','MappedRepresentation',(#16));
+#18=IFCPRODUCTDEFINITIONSHAPE($,$,(#17));
+#19=IFCPRODUCTDEFINITIONSHAPE($,$,(#2));
+#100=IFCWINDOW('2O2Fr$t4X7Zf8NOew3FLOH','Window',$,#12);
+#101=IFCWINDOW('3vB2YO$MX4xv5uCqZZG05x','Window',$,#15);
+#102=IFCWINDOW('0zkHc6sWbBHupNs2bYcCkR','Window',$,#18);
+#103=IFCWINDOW('1xS3BCk291UvhgP2a6eflL','Window',$,#19);
+#104=IFCWINDOW('1hqIFTRjfV6AWq_bMtnZwI','Window',$,$);
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+def matrix(x,y,z):
+    "returns an IfcOpenShell 4x3 matrix of a translation"
+    return [1,0,0, 0,1,0, 0,0,1, x,y,z]
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD Arch module
+#---------------------------------------------------------------------------
+
+class IfcImportTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        schema = os.path.join(self.dir,"schema.exp")
+        ifc = os.path.join(self.dir,"test.ifc")
+        f = open(schema,"wb")
+        f.write(SCHEMA)
+        f.close()
+        f = open(ifc,"wb")
+        f.write(IFC)
+        f.close()
+        self.doc = ifcReader.IfcDocument(ifc,schema)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testRepresentationKey(self):
+        import importIFC
+        keys = [importIFC.getRepresentationKey(self.doc.getEnt(i)) for i in range(100,105)]
+        self.assertEqual(keys[0],((3,4),))
+        self.assertEqual(keys[1],keys[0])
+        self.assertEqual(keys[2],((3,5),))
+        self.assertEqual(keys[3],None)
+        self.assertEqual(keys[4],None)
+
+    def testSharedMesh(self):
+        # the two products sharing a representation get one mesh
+        import importIFC
+        geometry = {}
+        products = []
+        verts = [0,0,0, 1,0,0, 0,1,0, 0,0,1]
+        faces = [0,2,1, 0,1,3, 0,3,2, 1,2,3]
+        for pid in (100,101,103):
+            rid = importIFC.getRepresentationKey(self.doc.getEnt(pid))
+            if rid == None:
+                rid = pid
+            if not rid in geometry:
+                geometry[rid] = (verts,faces)
+            products.append(rid)
+        self.assertEqual(products[0],products[1])
+        meshes = importIFC.buildGeometry(geometry)
+        self.assertEqual(sorted(meshes.keys(),key=str),sorted([products[0],103],key=str))
+        self.assertEqual(meshes[products[0]].CountFacets,4)
+
+    def testSharedShape(self):
+        # instances share the geometry of their shape, at their own placement
+        import importIFC
+        box = Part.makeBox(1,2,3)
+        a = importIFC.getInstance(box,matrix(10,0,0))
+        b = importIFC.getInstance(box,matrix(0,20,0))
+        self.failUnless(box.Placement.isNull())
+        self.failUnless(a.Solids[0].isPartner(b.Solids[0]))
+        self.failUnless(a.Solids[0].isPartner(box))
+        self.assertEqual((a.BoundBox.XMin,a.BoundBox.YMin),(10,0))
+        self.assertEqual((b.BoundBox.XMin,b.BoundBox.YMin),(0,20))
+        self.assertAlmostEqual(a.Volume+b.Volume,12)
+
+    def testParallelMeshes(self):
+        # meshes built in a pool of processes are the same as the ones built here
+        import importIFC
+        geometry = {}
+        for i in range(importIFC.PARALLEL_MIN+4):
+            verts = [0,0,0, i+1,0,0, 0,1,0, 0,0,1]
+            faces = [0,2,1, 0,1,3, 0,3,2, 1,2,3][:3*(i%4+1)]
+            geometry[i] = (verts,faces)
+        serial = importIFC.buildGeometry(geometry)
+        parallel = importIFC.buildGeometry(geometry,parallel=True)
+        self.assertEqual(sorted(parallel.keys()),sorted(serial.keys()))
+        for i in serial.keys():
+            self.assertEqual(parallel[i].CountFacets,serial[i].CountFacets)
+            self.assertEqual(parallel[i].BoundBox.XMax,serial[i].BoundBox.XMax)
+
+def makeFace(points,plane):
+    """returns a renderer face, facing the +Z view direction, from a list of
+    (x,y) points on the plane z = a+b*x+c*y given by plane = (a,b,c)"""
+    a,b,c = plane
+    verts = [Vector(x,y,a+b*x+c*y) for x,y in points]
+    f = Part.Face(Part.makePolygon(verts+verts[:1]))
+    if f.normalAt(0,0).z < 0:
+        f.reverse()
+    return [f,(0.9,0.9,0.9,1.0)]
+
+class RendererTestCases(unittest.TestCase):
+
+    def render(self,faces):
+        "returns a renderer with the given faces, sorted, already projected on the XY plane"
+        import ArchVRM
+        r = ArchVRM.Renderer()
+        r.addProjected(faces)
+        r.sort()
+        return r
+
+    def checkOrder(self,r):
+        "no face is drawn before a face it hides"
+        for i in range(len(r.faces)):
+            for j in range(i+1,len(r.faces)):
+                self.assertNotEqual(r.compare(r.faces[i],r.faces[j]),1)
+
+    def testSortStack(self):
+        square = [(0,0),(4,0),(4,4),(0,4)]
+        faces = [makeFace(square,(z,0,0)) for z in (2,0,3,1)]
+        faces.append(makeFace([(10,0),(11,0),(11,1),(10,1)],(5,0,0)))
+        r = self.render(faces)
+        self.assertEqual(len(r.faces),5)
+        self.assertEqual(sorted([f[0].BoundBox.ZMin for f in r.faces]),[0,1,2,3,5])
+        self.assertEqual([f[0].BoundBox.ZMin for f in r.faces if f[0].BoundBox.XMin < 5],[0,1,2,3])
+        self.assertEqual(r.stats["pairs compared"],6)
+        self.assertEqual(r.stats["cycles"],0)
+        self.checkOrder(r)
+
+    def testSortCycle(self):
+        # three bars around a triangle, each one hiding the next one at a corner
+        faces = [makeFace([(0,0),(10,0),(10,1),(0,1)],(0,0.1,0)),
+                 makeFace([(9,0),(10,0),(5,8),(4,8)],(2,-0.2,-0.1)),
+                 makeFace([(0,0),(1,0),(6,8),(5,8)],(1,0.1,-0.2))]
+        import ArchVRM
+        r = ArchVRM.Renderer()
+        self.assertEqual([r.compare(faces[0],faces[1]),r.compare(faces[1],faces[2]),r.compare(faces[2],faces[0])],[1,1,1])
+        area = sum([f[0].Area for f in faces])
+        r = self.render(faces)
+        self.failUnless(r.stats["cycles"] > 0)
+        self.failUnless(r.stats["splits"] > 0)
+        self.assertEqual(r.stats["faces out"],len(r.faces))
+        self.failUnless(len(r.faces) > 3)
+        # split faces are replaced by their pieces, nothing is lost
+        self.assertAlmostEqual(sum([f[0].Area for f in r.faces]),area)
+        self.checkOrder(r)
+
+    def testProjectFaces(self):
+        # the numpy projection gives the same faces as the face by face one
+        import ArchVRM
+        shape = Part.makeBox(4,4,1).cut(Part.makeBox(2,2,1,Vector(1,1,0)))
+        r = ArchVRM.Renderer()
+        r.setWorkingPlane(FreeCAD.Placement(Vector(0,0,0),FreeCAD.Rotation(Vector(1,1,0),30)))
+        r.addShapes([shape])
+        faces = r.faces
+        numpy = ArchVRM.numpy
+        try:
+            ArchVRM.numpy = None
+            r.removeHidden()
+            visible = r.faces
+        finally:
+            ArchVRM.numpy = numpy
+        r.faces = faces
+        r.removeHidden()
+        self.assertEqual(r.faces,visible)
+        self.failUnless(0 < len(visible) < len(faces))
+        serial = [r.projectFace(f) for f in r.faces]
+        r.reorient()
+        self.assertEqual(len(r.faces),len(serial))
+        for f1,f2 in zip(r.faces,serial):
+            self.assertAlmostEqual(f1[0].Area,f2[0].Area)
+            self.assertEqual(len(f1[0].Wires),len(f2[0].Wires))
+            self.failUnless(f1[0].normalAt(0,0).sub(f2[0].normalAt(0,0)).Length < 1e-6)
+            points = lambda f: sorted([tuple([round(c,6) for c in (v.Point.x,v.Point.y,v.Point.z)]) for v in f[0].Vertexes])
+            self.assertEqual(points(f1),points(f2))
@@ -21,7 +21,7 @@
 #*                                                                         *
 #***************************************************************************
 
-import os, re, copy
+import os, re, copy, bisect, marshal, array
 
 __title__="FreeCAD IFC parser"
 __author__ = "Yorik van Havre, Marijn van Aerle"
@@ -56,9 +56,17 @@ Just place the .exp file together with this script.
 2) IFC files can have ordered content (ordered list, no entity number missing)
 or be much messier (entity numbers missing, etc). The performance of the reader
 will be drastically different.
+
+3) For big files, use the streaming mode:
+        ifcdoc = ifcReader.IfcDocument("path/to/file.ifc",streaming=True)
+Only the position of each entity in the file is read at first, and stored in
+a .idx file next to the ifc file, so the next opening of the same file is
+immediate. Entities are then parsed only when they are first accessed by
+getEnt() or find().
 '''
 
 IFCLINE_RE = re.compile("#(\d+)[ ]?=[ ]?(.*?)\((.*)\);[\\r]?$")
+IFCINDEX_RE = re.compile("#(\d+)[ ]?=[ ]?(.*?)\(")
 DEBUG = False
 
 class IfcSchema:
@@ -180,9 +188,7 @@ class IfcFile:
             e = self.parseLine(line)
             if e:
                 entById[int(e["id"])] = e
-                ids = e.get(e["name"],[])
-                ids.append(e["id"])
-                entsByName[e["name"]] = list(set(ids))
+                entsByName.setdefault(e["name"],[]).append(e["id"])
             elif 'HEADER' in line:
                 readheader = True
             elif readheader:
@@ -279,6 +285,147 @@ class IfcFile:
             
         return len(s)+1                  
 
+class IfcIndex:
+    """
+    A compact index of an ifc file: stores only the byte offset of each entity
+    line, sorted by id, and the list of ids of each entity type
+    """
+
+    VERSION = 1
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.ids = array.array('l')
+        self.offsets = array.array('l')
+        self.types = {}
+        self.header = 'HEADER '
+
+    def build(self):
+        """
+        Scans the ifc file once, without parsing any attribute
+        """
+        f = open(self.filename,"rb")
+        pairs = []
+        types = {}
+        readheader = False
+        pos = 0
+        for line in f:
+            m = IFCINDEX_RE.search(line)
+            if m:
+                eid = int(m.group(1))
+                pairs.append((eid,pos))
+                types.setdefault(m.group(2).strip().upper().strip(",[]()"),[]).append(eid)
+            elif 'HEADER' in line:
+                readheader = True
+            elif readheader:
+                if 'ENDSEC' in line:
+                    readheader = False
+                else:
+                    self.header += line
+            pos += len(line)
+        f.close()
+        pairs.sort()
+        self.ids = array.array('l',[p[0] for p in pairs])
+        self.offsets = array.array('l',[p[1] for p in pairs])
+        self.types = {}
+        for k,v in types.iteritems():
+            v.sort()
+            self.types[k] = array.array('l',v)
+
+    def getIndexFile(self):
+        return self.filename + ".idx"
+
+    def save(self):
+        """
+        Writes the index next to the ifc file. Returns False if this is not possible
+        """
+        st = os.stat(self.filename)
+        data = {"version": self.VERSION,
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "header": self.header,
+                "ids": self.ids.tostring(),
+                "offsets": self.offsets.tostring(),
+                "types": dict([(k,v.tostring()) for k,v in self.types.iteritems()])}
+        try:
+            f = open(self.getIndexFile(),"wb")
+            marshal.dump(data,f)
+            f.close()
+        except IOError:
+            return False
+        return True
+
+    def load(self):
+        """
+        Reads a previously saved index. Returns False if there is none,
+        or if the ifc file has changed since it was saved
+        """
+        if not os.path.exists(self.getIndexFile()):
+            return False
+        try:
+            f = open(self.getIndexFile(),"rb")
+            data = marshal.load(f)
+            f.close()
+        except (IOError,EOFError,ValueError,TypeError):
+            return False
+        st = os.stat(self.filename)
+        if (data.get("version") != self.VERSION) or (data.get("size") != st.st_size) or (data.get("mtime") != st.st_mtime):
+            return False
+        self.header = data["header"]
+        self.ids = array.array('l')
+        self.ids.fromstring(data["ids"])
+        self.offsets = array.array('l')
+        self.offsets.fromstring(data["offsets"])
+        self.types = {}
+        for k,v in data["types"].iteritems():
+            a = array.array('l')
+            a.fromstring(v)
+            self.types[k] = a
+        return True
+
+    def getOffset(self, id):
+        i = bisect.bisect_left(self.ids,id)
+        if (i < len(self.ids)) and (self.ids[i] == id):
+            return self.offsets[i]
+        return None
+
+    def __len__(self):
+        return len(self.ids)
+
+class IfcStream(IfcFile):
+    """
+    Reads an ifc file given by filename entity by entity. Only an index of the
+    file is built at first, each entity is parsed when it is requested
+    """
+
+    def __init__(self, filename, schema, saveindex=True):
+        self.filename = filename
+        self.schema = IfcSchema(schema)
+        self.index = IfcIndex(filename)
+        if not self.index.load():
+            self.index.build()
+            if saveindex:
+                self.index.save()
+        self.header = self.index.header
+        self.file = open(self.filename,"rb")
+        if DEBUG: print "Indexed file %s: %s entities" % (self.filename, len(self.index))
+
+    def getEntityById(self, id):
+        offset = self.index.getOffset(id)
+        if offset == None:
+            return None
+        self.file.seek(offset)
+        return self.parseLine(self.file.readline())
+
+    def getIdsByName(self, name):
+        return self.index.types.get(name.upper(),[])
+
+    def getNames(self):
+        return self.index.types.keys()
+
+    def close(self):
+        self.file.close()
+
 class IfcEntity:
     "a container for an IFC entity"
     def __init__(self,ent,doc=None):
@@ -321,36 +468,66 @@ class IfcEntity:
         return None
             
 class IfcDocument:
-    "an object representing an IFC document"
-    def __init__(self,filename,schema="IFC2X3_TC1.exp",debug=False):
+    """an object representing an IFC document. If streaming is True, entities
+    are only read from the file when they are first accessed"""
+    def __init__(self,filename,schema="IFC2X3_TC1.exp",debug=False,streaming=False):
         DEBUG = debug
-        f = IfcFile(filename,schema)
         self.filename = filename
+        self.streaming = streaming
+        if streaming:
+            self.stream = IfcStream(filename,schema)
+            self.data = {}
+            self.Entities = {0:self.stream.header}
+            self.types = None
+            if DEBUG: print "Document successfully indexed"
+            return
+        f = IfcFile(filename,schema)
+        self.stream = None
         self.data = f.entById
         self.Entities = {0:f.header}
+        self.types = {}
         for k,e in self.data.iteritems():
             eid = int(e['id'])
-            self.Entities[eid] = IfcEntity(e,self)
+            ent = IfcEntity(e,self)
+            self.Entities[eid] = ent
+            self.types.setdefault(ent.type,[]).append(eid)
+        for v in self.types.itervalues():
+            v.sort()
         if DEBUG: print len(self.Entities),"entities created. Creating attributes..."
         for k,ent in self.Entities.iteritems():
-            if DEBUG: print "attributing entity ",ent
-            if hasattr(ent,"attributes"):
-                for k,v in ent.attributes.iteritems():
-                    if DEBUG: print "parsing attribute: ",k," value ",v
-                    if isinstance(v,str):
-                        val = self.__clean__(v)
-                    elif isinstance(v,list):
-                        val = []
-                        for item in v:
-                            if isinstance(item,str):
-                                val.append(self.__clean__(item))
-                            else:
-                                val.append(item)
-                    else:
-                        val = v
-                    setattr(ent,k.strip(),val)
+            self.__attribute__(ent)
         if DEBUG: print "Document successfully created"
 
+    def __attribute__(self,ent):
+        "turns the raw attributes of an entity into python attributes"
+        if DEBUG: print "attributing entity ",ent
+        if hasattr(ent,"attributes"):
+            for k,v in ent.attributes.iteritems():
+                if DEBUG: print "parsing attribute: ",k," value ",v
+                if isinstance(v,str):
+                    val = self.__clean__(v)
+                elif isinstance(v,list):
+                    val = []
+                    for item in v:
+                        if isinstance(item,str):
+                            val.append(self.__clean__(item))
+                        else:
+                            val.append(item)
+                else:
+                    val = v
+                setattr(ent,k.strip(),val)
+
+    def __load__(self,id):
+        "reads an entity from the file, in streaming mode"
+        e = self.stream.getEntityById(id)
+        if not e:
+            return None
+        ent = IfcEntity(e,self)
+        # register before attributing, so references back to this entity resolve
+        self.Entities[id] = ent
+        self.__attribute__(ent)
+        return ent
+
     def __clean__(self,value):
         "turns an attribute value into something usable"
         try:
@@ -398,27 +575,36 @@ class IfcDocument:
         if isinstance(ref,int):
             if ref in self.Entities:
                 return self.Entities[ref]
+            if self.streaming:
+                return self.__load__(ref)
         elif isinstance(ref,str):
-            l = []
             ref = ref.upper()
-            for k,ob in self.Entities.iteritems():
-                if hasattr(ob,"type"):
-                    if ob.type == ref:
-                        l.append(ob)
-            return l
+            if self.streaming:
+                ids = self.stream.getIdsByName(ref)
+            else:
+                ids = self.types.get(ref,[])
+            return [self.getEnt(i) for i in ids]
         return None
 
     def search(self,pat):
         "searches entities types for partial match"
         l = []
         pat = pat.upper()
-        for k,ob in self.Entities.iteritems():
-            if hasattr(ob,"type"):
-                if pat in ob.type:
-                    if not ob.type in l:
-                        l.append(ob.type)
+        if self.streaming:
+            names = self.stream.getNames()
+        else:
+            names = self.types.keys()
+        for t in names:
+            if pat in t:
+                l.append(t)
+        l.sort()
         return l
 
+    def close(self):
+        "closes the underlying file, in streaming mode"
+        if self.stream:
+            self.stream.close()
+
     def find(self,pat1,pat2=None,pat3=None):
         '''finds objects in the current IFC document.
         arguments can be of the following form:
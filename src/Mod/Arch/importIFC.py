@@ -32,6 +32,7 @@ __url__ = "http://free-cad.sourceforge.net"
 DEBUG = True
 SCHEMA = "http://www.steptools.com/support/stdev_docs/express/ifc2x3/ifc2x3_tc1.exp"
 SKIP = ["IfcOpeningElement","IfcSpace"]
+PARALLEL_MIN = 16 # minimum number of unique meshes to build them in a pool of processes
 # end config
 
 if open.__module__ == '__builtin__':
@@ -43,10 +44,12 @@ def open(filename):
     doc = FreeCAD.newDocument(docname)
     doc.Label = decode(docname)
     FreeCAD.ActiveDocument = doc
-    global createIfcGroups, useIfcOpenShell, importIfcFurniture
-    createIfcGroups = useIfcOpenShell = importIfcFurniture = False
+    global createIfcGroups, useIfcOpenShell, importIfcFurniture, useIfcStreaming, useIfcProcessPool
+    createIfcGroups = useIfcOpenShell = importIfcFurniture = useIfcStreaming = useIfcProcessPool = False
     p = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch")
     useIfcOpenShell = p.GetBool("useIfcOpenShell")
+    useIfcStreaming = p.GetBool("useIfcStreaming")
+    useIfcProcessPool = p.GetBool("useIfcProcessPool")
     createIfcGroups = p.GetBool("createIfcGroups")
     importIfcFurniture = p.GetBool("importIfcFurniture")
     if not importIfcFurniture:
@@ -61,10 +64,12 @@ def insert(filename,docname):
     except:
         doc = FreeCAD.newDocument(docname)
     FreeCAD.ActiveDocument = doc
-    global createIfcGroups, useIfcOpenShell, importIfcFurniture
-    createIfcGroups = useIfcOpenShell = importIfcFurniture = False
+    global createIfcGroups, useIfcOpenShell, importIfcFurniture, useIfcStreaming, useIfcProcessPool
+    createIfcGroups = useIfcOpenShell = importIfcFurniture = useIfcStreaming = useIfcProcessPool = False
     p = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch")
     useIfcOpenShell = p.GetBool("useIfcOpenShell")
+    useIfcStreaming = p.GetBool("useIfcStreaming")
+    useIfcProcessPool = p.GetBool("useIfcProcessPool")
     createIfcGroups = p.GetBool("createIfcGroups")
     importIfcFurniture = p.GetBool("importIfcFurniture")
     if not importIfcFurniture:
@@ -117,7 +122,7 @@ def read(filename):
     if schema:
         if DEBUG: global ifc
         if DEBUG: print "opening",filename,"..."
-        ifc = ifcReader.IfcDocument(filename,schema=schema,debug=DEBUG)
+        ifc = ifcReader.IfcDocument(filename,schema=schema,debug=DEBUG,streaming=useIfcStreaming)
     else:
         FreeCAD.Console.PrintWarning(str(translate("Arch","IFC Schema not found, IFC import disabled.\n")))
         return None
@@ -132,40 +137,61 @@ def read(filename):
             IfcImport.Settings(IfcImport.USE_BREP_DATA,True)
             useShapes = True
         if IfcImport.Init(filename):
+
+            # first pass: collect the products, and the data of each unique representation
+            products = []
+            geometry = {}
             while True:
 
                 obj = IfcImport.Get()
                 if DEBUG: print "parsing ",obj.id,": ",obj.name," of type ",obj.type
-                meshdata = []
+                # products using the same representation maps share their geometry
+                rid = getRepresentationKey(ifc.getEnt(obj.id))
+                if rid == None:
+                    rid = obj.id
+                if not rid in geometry:
+                    if useShapes:
+                        geometry[rid] = obj.mesh.brep_data
+                    else:
+                        geometry[rid] = (list(obj.mesh.verts),list(obj.mesh.faces))
+                products.append((obj.id,obj.name,obj.type,list(obj.matrix),rid))
+                if not IfcImport.Next():
+                    break
+
+            # second pass: build each unique representation only once
+            t3 = time.time()
+            shapes = buildGeometry(geometry,useShapes,useIfcProcessPool)
+            if DEBUG: print "built",len(shapes),"unique representations for",len(products),"products in %s s" % ((time.time()-t3))
+
+            for pid,n,ptype,matrix,rid in products:
 
                 # retrieving name
-                n = obj.name
                 if not n:
                     n = ""
 
                 # build shape
                 shape = None
                 if useShapes:
-                    shape = getShape(obj)
+                    shape = getInstance(shapes[rid],matrix)
             
                 # skip types
-                if obj.type in SKIP:
+                if ptype in SKIP:
                     pass
 
                 # walls
-                elif obj.type == "IfcWallStandardCase":
-                    nobj = makeWall(ifc.Entities[obj.id],shape,n)
+                elif ptype == "IfcWallStandardCase":
+                    nobj = makeWall(ifc.getEnt(pid),shape,n)
 
                 # windows
-                elif obj.type in ["IfcWindow","IfcDoor"]:
-                    nobj = makeWindow(ifc.Entities[obj.id],shape,n)
+                elif ptype in ["IfcWindow","IfcDoor"]:
+                    nobj = makeWindow(ifc.getEnt(pid),shape,n)
 
                 # structs
-                elif obj.type in ["IfcBeam","IfcColumn","IfcSlab","IfcFooting"]:
-                    nobj = makeStructure(ifc.Entities[obj.id],shape,n)
+                elif ptype in ["IfcBeam","IfcColumn","IfcSlab","IfcFooting"]:
+                    nobj = makeStructure(ifc.getEnt(pid),shape,n)
                     
                 # furniture
-                elif obj.type == "IfcFurnishingElement":
+                elif ptype == "IfcFurnishingElement":
                     nobj = FreeCAD.ActiveDocument.addObject("Part::Feature",n)
                     nobj.Shape = shape
                     
@@ -180,21 +206,17 @@ def read(filename):
                     # treat as meshes
                     if not n:
                         n = "Unnamed"
-                    me,pl = getMesh(obj)
                     nobj = FreeCAD.ActiveDocument.addObject("Mesh::Feature",n)
-                    nobj.Mesh = me
-                    nobj.Placement = pl
+                    nobj.Mesh = shapes[rid]
+                    nobj.Placement = getPlacementFromMatrix(matrix)
 
-                ifcRel[obj.id] = nobj
+                ifcRel[pid] = nobj
 
                 # mark terrain objects so they can be associated to sites
-                if obj.type == "IfcSite":
+                if ptype == "IfcSite":
                     if not "terrains" in ifcRel:
                         ifcRel["terrains"] = []
-                    ifcRel["terrains"].append([obj.id,nobj])
-                    
-                if not IfcImport.Next():
-                    break
+                    ifcRel["terrains"].append([pid,nobj])
 
         IfcImport.CleanUp()
         
@@ -218,6 +240,7 @@ def read(filename):
             ifcRel[w.id] = nobj
             
     order(ifc,ifcRel)
+    ifc.close()
     FreeCAD.ActiveDocument.recompute()
     t3 = time.time()
     if DEBUG: print "done processing",ifc,"in %s s" % ((t3-t1))
@@ -445,22 +468,8 @@ def makeStructure(entity,shape=None,name=""):
 def getMesh(obj):
     "gets mesh and placement from an IfcOpenShell object"
     import Mesh
-    f = obj.mesh.faces
-    v = obj.mesh.verts
-    for i in range(0, len(f), 3):
-        face = []
-        for j in range(3):
-            vi = f[i+j]*3
-            face.append([v[vi],v[vi+1],v[vi+2]])
-        meshdata.append(face)
-    me = Mesh.Mesh(meshdata)
-    # get transformation matrix
-    m = obj.matrix
-    mat = FreeCAD.Matrix(m[0], m[3], m[6], m[9],
-                         m[1], m[4], m[7], m[10],
-                         m[2], m[5], m[8], m[11],
-                         0, 0, 0, 1)
-    pl = FreeCAD.Placement(mat)
+    me = Mesh.Mesh(getTriangles((obj.mesh.verts,obj.mesh.faces)))
+    pl = getPlacementFromMatrix(obj.matrix)
     return me,pl
 
 def getShape(obj):
@@ -468,14 +477,120 @@ def getShape(obj):
     import StringIO
     sh=Part.Shape()
     sh.importBrep(StringIO.StringIO(obj.mesh.brep_data))
-    m = obj.matrix
+    sh.Placement = getPlacementFromMatrix(obj.matrix)
+    if DEBUG: print "getting Shape from ",obj 
+    return sh
+
+def getPlacementFromMatrix(m):
+    "returns a placement from an IfcOpenShell 4x3 matrix"
     mat = FreeCAD.Matrix(m[0], m[3], m[6], m[9],
                          m[1], m[4], m[7], m[10],
                          m[2], m[5], m[8], m[11],
                          0, 0, 0, 1)
-    sh.Placement = FreeCAD.Placement(mat)
-    if DEBUG: print "getting Shape from ",obj 
-    return sh
+    return FreeCAD.Placement(mat)
+
+def getTriangles(data):
+    """getTriangles((verts,faces)): returns a list of triangles from flat IfcOpenShell
+    vertex and face index lists"""
+    v,f = data
+    meshdata = []
+    for i in range(0, len(f), 3):
+        face = []
+        for j in range(3):
+            vi = f[i+j]*3
+            face.append([v[vi],v[vi+1],v[vi+2]])
+        meshdata.append(face)
+    return meshdata
+
+def getRepresentationKey(entity):
+    """getRepresentationKey(entity): returns a key identifying the geometry of an
+    ifcReader product entity. Products whose representations are only made of
+    mapped items, with the same representation maps and mapping targets, get
+    the same key, so their geometry can be built once. Returns None if the
+    product has geometry of its own."""
+    shape = getattr(entity,"Representation",None)
+    if not isinstance(shape,ifcReader.IfcEntity):
+        return None
+    key = []
+    reps = getattr(shape,"Representations",None)
+    if not isinstance(reps,list):
+        return None
+    for rep in reps:
+        items = getattr(rep,"Items",None)
+        if not isinstance(items,list):
+            return None
+        for item in items:
+            if getattr(item,"type",None) != "IFCMAPPEDITEM":
+                return None
+            source = getattr(item,"MappingSource",None)
+            target = getattr(item,"MappingTarget",None)
+            if not (isinstance(source,ifcReader.IfcEntity) and isinstance(target,ifcReader.IfcEntity)):
+                return None
+            key.append((source.id,target.id))
+    if not key:
+        return None
+    return tuple(key)
+
+def _buildMesh(args):
+    "process pool worker: builds a mesh from the forked geometry data and saves it in the given file"
+    import Mesh
+    rid,path = args
+    Mesh.Mesh(getTriangles(meshData[rid])).write(path)
+    return rid,path
+
+def buildGeometry(geometry,useShapes=False,parallel=False):
+    """buildGeometry(geometry,[useShapes,parallel]): builds each representation of
+    a {id:data} dictionary once, and returns an {id:shape or mesh} dictionary.
+    Data is brep data if useShapes is True, (verts,faces) lists otherwise. If
+    parallel is True and there are enough of them, meshes are built in a pool
+    of processes."""
+    ids = geometry.keys()
+    result = {}
+    if useShapes:
+        # the brep reader must run here, shapes can't travel between processes
+        import StringIO
+        for i in ids:
+            sh = Part.Shape()
+            sh.importBrep(StringIO.StringIO(geometry[i]))
+            result[i] = sh
+        return result
+    import Mesh
+    if parallel and (os.name == "posix") and (len(ids) > PARALLEL_MIN):
+        # workers are forked, so they share the geometry data, and hand back
+        # binary mesh files, which are much faster to read than to rebuild
+        import multiprocessing, tempfile, shutil
+        global meshData
+        meshData = geometry
+        tmpdir = tempfile.mkdtemp()
+        tasks = [(ids[n],os.path.join(tmpdir,str(n)+".bms")) for n in range(len(ids))]
+        pool = None
+        try:
+            pool = multiprocessing.Pool()
+            for i,path in pool.imap_unordered(_buildMesh,tasks,8):
+                me = Mesh.Mesh()
+                me.read(path)
+                result[i] = me
+            pool.close()
+            pool.join()
+        except:
+            if DEBUG: print "couldn't use a process pool, building meshes serially"
+            if pool: pool.terminate()
+            result = {}
+        meshData = None
+        shutil.rmtree(tmpdir,True)
+        if result:
+            return result
+    for i in ids:
+        result[i] = Mesh.Mesh(getTriangles(geometry[i]))
+    return result
+
+def getInstance(shape,matrix):
+    """getInstance(shape,matrix): returns an instance of the given shape placed by
+    the given IfcOpenShell matrix. The instance is a located compound that shares
+    the geometry of shape instead of copying it, shape itself is left untouched"""
+    instance = Part.makeCompound([shape])
+    instance.Placement = getPlacementFromMatrix(matrix)
+    return instance
         
 def getWire(entity,placement=None):
     "returns a wire (created in the freecad document) from the given entity"
@@ -1235,6 +1235,60 @@ def draftify(objectslist,makeblock=False):
             return newobjlist[0]
         return newobjlist
 
+class _ShapeStamp:
+    """A token identifying a shape in cache keys. Shape.hashCode() alone is
+    derived from the address of the shape data, which OCC can give to a new
+    shape once a recompute has freed the old one. The stamp holds a reference
+    to the shape, so that address can't be reused while the stamp lives, and
+    two stamps are only equal if they refer to the same shape"""
+
+    def __init__(self,shape):
+        self.shape = shape
+        self.hash = shape.hashCode()
+
+    def __eq__(self,other):
+        if not isinstance(other,_ShapeStamp):
+            return False
+        return (self.hash == other.hash) and self.shape.isSame(other.shape)
+
+    def __ne__(self,other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.hash
+
+def getShapeStamp(shape):
+    """getShapeStamp(shape): returns a hashable token identifying the given
+    shape, safe to use in cache keys: it only compares equal to the stamp of
+    the very same shape, even after the shape was recomputed"""
+    return _ShapeStamp(shape)
+
+# cache of the svg fragments produced by getSVG for Part-based objects,
+# holding one (key,svg) pair per object and projection. Entries of closed
+# documents are dropped each time a fragment is built
+svgCache = {}
+
+def getSVGView(plane):
+    """getSVGView(plane): returns a key identifying the projection used by
+    getSVG with the given plane"""
+    if plane:
+        return (str(plane.u),str(plane.v),str(plane.axis))
+    elif gui:
+        return (str(FreeCAD.DraftWorkingPlane.axis),)
+    return None
+
+def getSVGKey(obj,linewidth,fillstyle):
+    """getSVGKey(obj,linewidth,fillstyle): returns a key identifying
+    everything the svg fragment of the given object depends on, apart from
+    the projection: its shape, its placement and the display properties"""
+    key = [getShapeStamp(obj.Shape),str(obj.Placement.toMatrix()),
+           linewidth,fillstyle,getParam('SvgLinesBlack')]
+    vobj = obj.ViewObject
+    key.extend([vobj.LineColor,vobj.ShapeColor,vobj.DisplayMode])
+    if hasattr(vobj,"DrawStyle"):
+        key.append(vobj.DrawStyle)
+    return tuple(key)
+
 def getSVG(obj,scale=1,linewidth=0.35,fontsize=12,fillstyle="shape color",direction=None):
     '''getSVG(object,[scale], [linewidth],[fontsize],[fillstyle],[direction]):
     returns a string containing a SVG representation of the given object,
@@ -1275,20 +1329,21 @@ def getSVG(obj,scale=1,linewidth=0.35,fontsize=12,fillstyle="shape color",direct
         b = str(hex(int(color[2]*255)))[2:].zfill(2)
         col = "#"+r+g+b
         if col == "#ffffff":
-            print getParam('SvgLinesBlack')
             if getParam('SvgLinesBlack'):
                 col = "#000000"
         return col
 
+    if plane:
+        # the signed lengths of the projections on the plane axes
+        # are simply the dot products with the normalized axes
+        pu = Vector(plane.u)
+        pu.normalize()
+        pv = Vector(plane.v)
+        pv.normalize()
+
     def getProj(vec):
         if not plane: return vec
-        nx = DraftVecUtils.project(vec,plane.u)
-        lx = nx.Length
-        if abs(nx.getAngle(plane.u)) > 0.1: lx = -lx
-        ny = DraftVecUtils.project(vec,plane.v)
-        ly = ny.Length
-        if abs(ny.getAngle(plane.v)) > 0.1: ly = -ly
-        return Vector(lx,ly,0)
+        return Vector(vec.dot(pu),vec.dot(pv),0)
 
     def getPattern(pat):
         if pat in FreeCAD.svgpatterns:
@@ -1297,7 +1352,8 @@ def getSVG(obj,scale=1,linewidth=0.35,fontsize=12,fillstyle="shape color",direct
 
     def getPath(edges):
         svg ='<path id="' + name + '" '
-        edges = DraftGeomUtils.sortEdges(edges)
+        if len(edges) > 1:
+            edges = DraftGeomUtils.sortEdges(edges)
         v = getProj(edges[0].Vertexes[0].Point)
         svg += 'd="M '+ str(v.x) +' '+ str(v.y) + ' '
         for e in edges:
@@ -1470,7 +1526,16 @@ def getSVG(obj,scale=1,linewidth=0.35,fontsize=12,fillstyle="shape color",direct
 
     elif obj.isDerivedFrom('Part::Feature'):
         if obj.Shape.isNull(): return ''
-        color = getrgb(obj.ViewObject.LineColor)
+        key = getSVGKey(obj,linewidth,fillstyle)
+        view = (obj.Document.Name,obj.Name,getSVGView(plane))
+        cached = svgCache.get(view)
+        if cached and (cached[0] == key):
+            return cached[1]
+        # forget the objects of closed documents
+        docs = FreeCAD.listDocuments()
+        for k in svgCache.keys():
+            if not k[0] in docs:
+                del svgCache[k]
         # setting fill
         if obj.Shape.Faces and (obj.ViewObject.DisplayMode != "Wireframe"):
             if fillstyle == "shape color":
@@ -1503,6 +1568,7 @@ def getSVG(obj,scale=1,linewidth=0.35,fontsize=12,fillstyle="shape color",direct
                         svg += getPath([e])
         else:
             svg = getCircle(obj.Shape.Edges[0])
+        svgCache[view] = (key,svg)
     return svg
 
 def makeDrawingView(obj,page,lwmod=None,tmod=None):
@@ -2658,12 +2724,22 @@ class _DrawingView(_DraftObject):
             obj.ViewResult = self.updateSVG(obj)
 
     def onChanged(self, obj, prop):
-        if prop in ["X","Y","Scale","LineWidth","FontSize","FillStyle","Direction"]:
+        if prop in ["X","Y","Rotation"]:
+            # only the transformation node changes, the fragment is reused
+            if getattr(self,"fragment",None) is not None:
+                obj.ViewResult = self.wrapSVG(obj,self.fragment)
+            elif obj.Source:
+                obj.ViewResult = self.updateSVG(obj)
+        elif prop in ["Scale","LineWidth","FontSize","FillStyle","Direction"]:
             obj.ViewResult = self.updateSVG(obj)
 
     def updateSVG(self, obj):
         "encapsulates a svg fragment into a transformation node"
-        svg = getSVG(obj.Source,obj.Scale,obj.LineWidth,obj.FontSize,obj.FillStyle,obj.Direction)
+        self.fragment = getSVG(obj.Source,obj.Scale,obj.LineWidth,obj.FontSize,obj.FillStyle,obj.Direction)
+        return self.wrapSVG(obj,self.fragment)
+
+    def wrapSVG(self, obj, svg):
+        "places a svg fragment inside the transformation node of this view"
         result = ''
         result += '<g id="' + obj.Name + '"'
         result += ' transform="'
@@ -2981,6 +3057,15 @@ class _Array(_DraftObject):
     def createGeometry(self,obj):
         import DraftGeomUtils
         if obj.Base:
+            # rebuild only if something the array depends on has changed
+            if obj.ArrayType == "ortho":
+                key = [obj.NumberX,obj.NumberY,obj.NumberZ,
+                       obj.IntervalX,obj.IntervalY,obj.IntervalZ]
+            else:
+                key = [obj.NumberPolar,obj.Angle,obj.Center,obj.Axis]
+            key = [getShapeStamp(obj.Base.Shape),obj.ArrayType] + [str(k) for k in key]
+            if key == getattr(self,"lastkey",None):
+                return
             pl = obj.Placement
             if obj.ArrayType == "ortho":
                 sh = self.rectArray(obj.Base.Shape,obj.IntervalX,obj.IntervalY,
@@ -2990,49 +3075,53 @@ class _Array(_DraftObject):
             obj.Shape = sh
             if not DraftGeomUtils.isNull(pl):
                 obj.Placement = pl
-
-    def rectArray(self,shape,xvector,yvector,zvector,xnum,ynum,znum):
-        import Part
-        base = [shape.copy()]
-        for xcount in range(xnum):
-            currentxvector=DraftVecUtils.scale(xvector,xcount)
-            if not xcount==0:
-                nshape = shape.copy()
-                nshape.translate(currentxvector)
-                base.append(nshape)
-            for ycount in range(ynum):
-                currentyvector=FreeCAD.Vector(currentxvector)
-                currentyvector=currentyvector.add(DraftVecUtils.scale(yvector,ycount))
-                if not ycount==0:
-                    nshape = shape.copy()
-                    nshape.translate(currentyvector)
-                    base.append(nshape)
-                for zcount in range(znum):
-                    currentzvector=FreeCAD.Vector(currentyvector)
-                    currentzvector=currentzvector.add(DraftVecUtils.scale(zvector,zcount))
-                    if not zcount==0:
-                        nshape = shape.copy()
-                        nshape.translate(currentzvector)
-                        base.append(nshape)
-        return Part.makeCompound(base)
-
-    def polarArray(self,shape,center,angle,num,axis):
-        print "angle ",angle," num ",num
-        import Part
+            self.lastkey = key
+
+    def rectPlacements(self,xvector,yvector,zvector,xnum,ynum,znum):
+        "returns the placements of the copies of a rectangular array"
+        xs = [DraftVecUtils.scale(xvector,i) for i in range(xnum)]
+        ys = [DraftVecUtils.scale(yvector,i) for i in range(ynum)]
+        zs = [DraftVecUtils.scale(zvector,i) for i in range(znum)]
+        return [FreeCAD.Placement(x.add(y).add(z),FreeCAD.Rotation())
+                for x in xs for y in ys for z in zs]
+
+    def polarPlacements(self,center,angle,num,axis):
+        "returns the placements of the copies of a polar array"
         if angle == 360:
             fraction = angle/num
         else:
-            if num == 0:
-                return shape
             fraction = angle/(num-1)
-        base = [shape.copy()]
+        pls = [FreeCAD.Placement()]
         for i in range(num-1):
-            currangle = fraction + (i*fraction)
-            nshape = shape.copy()
-            nshape.rotate(DraftVecUtils.tup(center), DraftVecUtils.tup(axis), currangle)
+            # a rotation around center is a rotation plus a translation
+            rot = FreeCAD.Rotation(axis,fraction + (i*fraction))
+            pls.append(FreeCAD.Placement(center.sub(rot.multVec(center)),rot))
+        return pls
+
+    def getInstances(self,shape,placements):
+        '''returns a compound of copies of shape at the given placements.
+        The copies only differ by their location, so they all share
+        the geometry of shape instead of duplicating it'''
+        import Part
+        base = []
+        for pl in placements:
+            nshape = Part.makeCompound([shape])
+            nshape.Placement = pl
             base.append(nshape)
         return Part.makeCompound(base)
 
+    def rectArray(self,shape,xvector,yvector,zvector,xnum,ynum,znum):
+        pls = self.rectPlacements(xvector,yvector,zvector,xnum,ynum,znum)
+        if not pls:
+            pls = [FreeCAD.Placement()]
+        return self.getInstances(shape,pls)
+
+    def polarArray(self,shape,center,angle,num,axis):
+        if (angle != 360) and (num == 0):
+            return shape
+        pls = self.polarPlacements(center,angle,num,axis)
+        return self.getInstances(shape,pls)
+
 class _Point(_DraftObject):
     "The Draft Point object"
     def __init__(self, obj,x,y,z):
@@ -457,6 +457,82 @@ def isLine(bsp):
             return False
     return True
 
+class EdgeHash:
+    """EdgeHash(edges,[prec]): an endpoint-keyed spatial hash of a list of edges.
+    Vertex coordinates are quantized to the Draft precision setting (or prec),
+    so looking up the edges that touch a point costs O(1) instead of a scan
+    of the whole list. Edges are consumed with take() as they get used."""
+
+    def __init__(self,edges,prec=None):
+        if prec == None:
+            prec = precision()
+        self.factor = 10**prec
+        self.edges = edges
+        self.used = [False]*len(edges)
+        self.cells = {}
+        for i in range(len(edges)):
+            verts = edges[i].Vertexes
+            if verts:
+                # last vertex before first one, same lookup order as Part.__sortEdges__
+                for end in (-1,0):
+                    self.cells.setdefault(self.key(verts[end].Point),[]).append((i,end))
+
+    def key(self,point):
+        "key(point): returns the hash cell of a vector"
+        f = self.factor
+        return (int(round(point.x*f)),int(round(point.y*f)),int(round(point.z*f)))
+
+    def keys(self,point):
+        """keys(point): returns the hash cell of a vector plus the neighbouring
+        cells that can hold a vector equal to it. DraftVecUtils.equals accepts
+        differences of up to half a cell, so on each axis the only other cell
+        to look at is the adjacent one on the side the vector is offset to"""
+        f = self.factor
+        axes = []
+        for c in (point.x,point.y,point.z):
+            q = c*f
+            k = int(round(q))
+            d = q-k
+            if d > 0:
+                axes.append((k,k+1))
+            elif d < 0:
+                axes.append((k,k-1))
+            else:
+                axes.append((k,))
+        return [(x,y,z) for x in axes[0] for y in axes[1] for z in axes[2]]
+
+    def matches(self,point):
+        """matches(point): returns the (index,end) pairs of unused edges touching
+        point, in list order. An edge touches point if one of its ends is equal
+        to it according to DraftVecUtils.equals"""
+        result = []
+        for k in self.keys(point):
+            if k in self.cells:
+                cell = self.cells[k]
+                # drop consumed entries from the front so each entry is skipped only once
+                while cell and self.used[cell[0][0]]:
+                    cell.pop(0)
+                for i,end in cell:
+                    if not self.used[i]:
+                        if DraftVecUtils.equals(point,self.edges[i].Vertexes[end].Point):
+                            result.append((i,end))
+        if len(result) > 1:
+            result.sort(key=lambda m:(m[0],m[1] != -1))
+        return result
+
+    def count(self,point):
+        "count(point): returns the number of unused edge ends touching point"
+        return len(self.matches(point))
+
+    def take(self,point):
+        """take(point): marks the first unused edge touching point as used and returns
+        its (index,end) pair, or None if no edge touches point"""
+        m = self.matches(point)
+        if not m:
+            return None
+        self.used[m[0][0]] = True
+        return m[0]
+
 def sortEdges(lEdges, aVertex=None):
     "an alternative, more accurate version of Part.__sortEdges__"
 
@@ -467,132 +543,73 @@ def sortEdges(lEdges, aVertex=None):
     #                print "Warning: sortedges cannot treat wired containing curves yet."
     #                return lEdges
 
-    def lookfor(aVertex, inEdges):
-        ''' Look for (aVertex, inEdges) returns count, the position of the instance
-        the position in the instance and the instance of the Edge'''
-        count = 0
-        linstances = [] #lists the instances of aVertex
-        for i in range(len(inEdges)) :
-            for j in range(2) :
-                if aVertex.Point == inEdges[i].Vertexes[j-1].Point:
-                        instance = inEdges[i]
-                        count += 1
-                        linstances += [i,j-1,instance]
-        return [count]+linstances
-
-    if (len(lEdges) < 2):
-        if aVertex == None:
-            return lEdges
-        else:
-            result = lookfor(aVertex,lEdges)
-            if result[0] != 0:
-                if aVertex.Point == result[3].Vertexes[0].Point:
-                    return lEdges
-                else:
-                    if isinstance(result[3].Curve,Part.Line):
-                        return [Part.Line(aVertex.Point,result[3].Vertexes[0].Point).toShape()]
-                    elif isinstance(result[3].Curve,Part.Circle):
-                        mp = findMidpoint(result[3])
-                        return [Part.Arc(aVertex.Point,mp,result[3].Vertexes[0].Point).toShape()]
-                    elif isinstance(result[3].Curve,Part.BSplineCurve):
-                        if isLine(result[3].Curve):
-                            return [Part.Line(aVertex.Point,result[3].Vertexes[0].Point).toShape()]
-                        else:
-                            return lEdges
-                    else:
-                        return lEdges
+    def invert(edge,point):
+        "returns edge running from point towards its first vertex"
+        if isinstance(edge.Curve,Part.Line):
+            return Part.Line(point,edge.Vertexes[0].Point).toShape()
+        elif isinstance(edge.Curve,Part.Circle):
+            mp = findMidpoint(edge)
+            return Part.Arc(point,mp,edge.Vertexes[0].Point).toShape()
+        elif isinstance(edge.Curve,Part.BSplineCurve):
+            if isLine(edge.Curve):
+                return Part.Line(point,edge.Vertexes[0].Point).toShape()
+        return edge
+
+    if (len(lEdges) < 2) and (aVertex == None):
+        return lEdges
 
-    olEdges = [] # ol stands for ordered list 
+    index = EdgeHash(lEdges)
     if aVertex == None:
-        for i in range(len(lEdges)*2) :
-            if len(lEdges[i/2].Vertexes) > 1:
-                result = lookfor(lEdges[i/2].Vertexes[i%2],lEdges)
-                if result[0] == 1 :  # Have we found an end ?
-                    olEdges = sortEdges(lEdges, result[3].Vertexes[result[2]])
-                    return olEdges
+        # start from an end of the wire, if there is one
+        aVertex = lEdges[0].Vertexes[0]
+        for i in range(len(lEdges)*2):
+            verts = lEdges[i/2].Vertexes
+            if len(verts) > 1:
+                if index.count(verts[i%2].Point) == 1:
+                    aVertex = verts[i%2]
+                    break
         # if the wire is closed there is no end so choose 1st Vertex
         # print "closed wire, starting from ",lEdges[0].Vertexes[0].Point
-        return sortEdges(lEdges, lEdges[0].Vertexes[0]) 
-    else :
-        #print "looking ",aVertex.Point
-        result = lookfor(aVertex,lEdges)
-        if result[0] != 0 :
-            del lEdges[result[1]]
-            next = sortEdges(lEdges, result[3].Vertexes[-((-result[2])^1)])
-            #print "result ",result[3].Vertexes[0].Point,"    ",result[3].Vertexes[1].Point, " compared to ",aVertex.Point
-            if aVertex.Point == result[3].Vertexes[0].Point:
-                #print "keeping"
-                olEdges += [result[3]] + next
-            else:
-                #print "inverting", result[3].Curve
-                if isinstance(result[3].Curve,Part.Line):
-                    newedge = Part.Line(aVertex.Point,result[3].Vertexes[0].Point).toShape()
-                    olEdges += [newedge] + next
-                elif isinstance(result[3].Curve,Part.Circle):
-                    mp = findMidpoint(result[3])
-                    newedge = Part.Arc(aVertex.Point,mp,result[3].Vertexes[0].Point).toShape()
-                    olEdges += [newedge] + next
-                elif isinstance(result[3].Curve,Part.BSplineCurve):
-                    if isLine(result[3].Curve):
-                        newedge = Part.Line(aVertex.Point,result[3].Vertexes[0].Point).toShape()
-                        olEdges += [newedge] + next
-                    else:
-                        olEdges += [result[3]] + next
-                else:
-                    olEdges += [result[3]] + next                                        
-            return olEdges
-        else :
-            return []
+
+    olEdges = [] # ol stands for ordered list
+    point = aVertex.Point
+    while True:
+        result = index.take(point)
+        if result == None:
+            break
+        edge = lEdges[result[0]]
+        # keep the edge if it was reached by its first vertex
+        if (result[1] == 0) or (len(edge.Vertexes) == 1):
+            olEdges.append(edge)
+        else:
+            olEdges.append(invert(edge,point))
+        # continue from the other end of the edge
+        point = edge.Vertexes[-(result[1]+1)].Point
+    return olEdges
 
 
 def findWires(edgeslist):
     '''finds connected wires in the given list of edges'''
 
-    def touches(e1,e2):
-        if len(e1.Vertexes) < 2:
-            return False
-        if len(e2.Vertexes) < 2:
-            return False
-        if DraftVecUtils.equals(e1.Vertexes[0].Point,e2.Vertexes[0].Point):
-            return True
-        if DraftVecUtils.equals(e1.Vertexes[0].Point,e2.Vertexes[-1].Point):
-            return True
-        if DraftVecUtils.equals(e1.Vertexes[-1].Point,e2.Vertexes[0].Point):
-            return True
-        if DraftVecUtils.equals(e1.Vertexes[-1].Point,e2.Vertexes[-1].Point):
-            return True
-        return False
-    
-    edges = edgeslist[:]
+    index = EdgeHash(edgeslist)
     wires = []
-    lost = []
-    while edges:
-        e = edges[0]
-        if not wires:
-            # create first group
-            edges.remove(e)
-            wires.append([e])
-        else:
-            found = False
-            for w in wires:
-                if not found:
-                    for we in w:
-                        if touches(e,we):
-                            edges.remove(e)
-                            w.append(e)
-                            found = True
-                            break
-            if not found:
-                if e in lost:
-                    # we already tried this edge, and still nothing
-                    edges.remove(e)
-                    wires.append([e])
-                    lost = []
-                else:
-                    # put to the end of the list
-                    edges.remove(e)
-                    edges.append(e)
-                    lost.append(e)
+    for i in range(len(edgeslist)):
+        if index.used[i]:
+            continue
+        # grow a new group from this edge, each added edge touching a previous one
+        index.used[i] = True
+        w = [edgeslist[i]]
+        n = 0
+        while n < len(w):
+            verts = w[n].Vertexes
+            if len(verts) > 1:
+                for v in (verts[0],verts[-1]):
+                    for j,end in index.matches(v.Point):
+                        if (not index.used[j]) and (len(edgeslist[j].Vertexes) > 1):
+                            index.used[j] = True
+                            w.append(edgeslist[j])
+            n += 1
+        wires.append(w)
     nwires = []
     for w in wires:
         try:
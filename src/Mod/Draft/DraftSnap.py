@@ -32,6 +32,149 @@ from FreeCAD import Vector
 from pivy import coin
 from PyQt4 import QtCore,QtGui
 
+# the angles of the circle points snapped by the angle and center snaps
+angleSnaps = [0,30,45,60,90,120,135,150,180,210,225,240,270,300,315,330]
+centerSnaps = [15,37.5,52.5,75,105,127.5,142.5,165,195,217.5,232.5,255,285,307.5,322.5,345]
+
+class SnapIndex:
+    """The SnapIndex keeps, for each object the Snapper works with, the
+    list of its edges and a grid of their bounding boxes, so intersection
+    candidates can be found without testing every edge of an object, and
+    the endpoint, midpoint, angle and center snap locations of its edges
+    in the same grid, so the ones near the cursor can be found without
+    computing them again. The data of an object is built the first time
+    it is needed, and rebuilt only when the shape of that object has
+    changed."""
+
+    def __init__(self,divisions=64,maxcells=64):
+        self.divisions = divisions # number of grid cells along the largest side of an object
+        self.maxcells = maxcells # edges spanning more cells are kept apart
+        self.data = {}
+
+    def clear(self):
+        self.data = {}
+
+    def get(self,obj):
+        "returns the index data of the given object, building it if needed"
+        key = (obj.Document.Name,obj.Name)
+        shape = obj.Shape
+        h = Draft.getShapeStamp(shape)
+        d = self.data.get(key)
+        if d and (d[0] == h):
+            return d
+        # forget the objects of closed documents
+        docs = FreeCAD.listDocuments()
+        for k in self.data.keys():
+            if not k[0] in docs:
+                del self.data[k]
+        edges = shape.Edges
+        boxes = []
+        grid = {}
+        large = []
+        bb = shape.BoundBox
+        size = max(bb.XLength,bb.YLength,bb.ZLength)/self.divisions
+        if size <= 0: size = 1
+        origin = (bb.XMin,bb.YMin,bb.ZMin)
+        snaps = []
+        points = {}
+        for i in range(len(edges)):
+            b = edges[i].BoundBox
+            b = (b.XMin,b.YMin,b.ZMin,b.XMax,b.YMax,b.ZMax)
+            boxes.append(b)
+            cells = self.getCells(b,origin,size)
+            if cells:
+                for c in cells:
+                    grid.setdefault(c,[]).append(i)
+            else:
+                large.append(i)
+            for snap in self.getSnaps(edges[i]):
+                p = snap[0]
+                points.setdefault(self.getCells((p.x,p.y,p.z,p.x,p.y,p.z),origin,size)[0],[]).append(len(snaps))
+                snaps.append(snap)
+        d = (h,edges,boxes,grid,large,origin,size,snaps,points)
+        self.data[key] = d
+        return d
+
+    def getSnaps(self,edge):
+        "returns the endpoint, midpoint, angle and center snap locations of an edge"
+        import Part, DraftGeomUtils
+        snaps = [[v.Point,'endpoint',v.Point] for v in edge.Vertexes]
+        mp = DraftGeomUtils.findMidpoint(edge)
+        if mp:
+            snaps.append([mp,'midpoint',mp])
+        if isinstance(edge.Curve,Part.Circle):
+            rad = edge.Curve.Radius
+            pos = edge.Curve.Center
+            for i in angleSnaps:
+                ang = math.radians(i)
+                cur = Vector(math.sin(ang)*rad+pos.x,math.cos(ang)*rad+pos.y,pos.z)
+                snaps.append([cur,'angle',cur])
+            for i in centerSnaps:
+                ang = math.radians(i)
+                cur = Vector(math.sin(ang)*rad+pos.x,math.cos(ang)*rad+pos.y,pos.z)
+                snaps.append([cur,'center',pos])
+        return snaps
+
+    def getCells(self,box,origin,size):
+        "returns the grid cells covered by a box, or None if there are too many"
+        lo = [int(math.floor((box[j]-origin[j])/size)) for j in range(3)]
+        hi = [int(math.floor((box[j+3]-origin[j])/size)) for j in range(3)]
+        if (hi[0]-lo[0]+1)*(hi[1]-lo[1]+1)*(hi[2]-lo[2]+1) > self.maxcells:
+            return None
+        return [(x,y,z) for x in range(lo[0],hi[0]+1)
+                for y in range(lo[1],hi[1]+1)
+                for z in range(lo[2],hi[2]+1)]
+
+    def getEdges(self,obj):
+        "returns the edges of the given object"
+        return self.get(obj)[1]
+
+    def getNearEdges(self,obj,boundbox):
+        "returns the edges of the given object whose bounding box meets the given one"
+        h,edges,boxes,grid,large,origin,size,snaps,points = self.get(obj)
+        tol = 10**(-Draft.precision())
+        q = (boundbox.XMin-tol,boundbox.YMin-tol,boundbox.ZMin-tol,
+             boundbox.XMax+tol,boundbox.YMax+tol,boundbox.ZMax+tol)
+        cells = self.getCells(q,origin,size)
+        if cells is None:
+            candidates = range(len(edges))
+        else:
+            candidates = set(large)
+            for c in cells:
+                if c in grid:
+                    candidates.update(grid[c])
+            candidates = sorted(candidates)
+        result = []
+        for i in candidates:
+            b = boxes[i]
+            if (b[0] <= q[3]) and (b[3] >= q[0]) and (b[1] <= q[4]) and (b[4] >= q[1]) and (b[2] <= q[5]) and (b[5] >= q[2]):
+                result.append(edges[i])
+        return result
+
+    def getNearSnaps(self,obj,point,radius,types=None):
+        """returns the snap locations of the given object lying within the given
+        radius of a point, nearest first. If a list of snap types is given, only
+        the locations of these types are returned"""
+        h,edges,boxes,grid,large,origin,size,snaps,points = self.get(obj)
+        q = (point.x-radius,point.y-radius,point.z-radius,
+             point.x+radius,point.y+radius,point.z+radius)
+        cells = self.getCells(q,origin,size)
+        if cells is None:
+            candidates = range(len(snaps))
+        else:
+            candidates = []
+            for c in cells:
+                if c in points:
+                    candidates.extend(points[c])
+        result = []
+        for i in candidates:
+            if (types is None) or (snaps[i][1] in types):
+                dist = snaps[i][0].sub(point).Length
+                if dist <= radius:
+                    result.append((dist,i))
+        result.sort()
+        return [snaps[i] for dist,i in result]
+
 class Snapper:
     """The Snapper objects contains all the functionality used by draft
     and arch module to manage object snapping. It is responsible for
@@ -62,6 +205,7 @@ class Snapper:
         self.affinity = None
         self.mask = None
         self.cursorMode = None
+        self.index = SnapIndex()
         if Draft.getParam("maxSnap"):
             self.maxEdges = Draft.getParam("maxSnapEdges")
 
@@ -244,24 +388,31 @@ class Snapper:
                         snaps.extend(self.snapToElines(edge,eline))
                             
                 elif obj.isDerivedFrom("Part::Feature"):
-                    if (not self.maxEdges) or (len(obj.Edges) <= self.maxEdges):
+                    objedges = self.index.getEdges(obj)
+                    if (not self.maxEdges) or (len(objedges) <= self.maxEdges):
                         if "Edge" in comp:
                             # we are snapping to an edge
                             en = int(comp[4:])-1
-                            if len(obj.Shape.Edges) > en:
-                                edge = obj.Shape.Edges[en]
-                                snaps.extend(self.snapToEndpoints(edge))
-                                snaps.extend(self.snapToMidpoint(edge))
+                            if len(objedges) > en:
+                                edge = objedges[en]
+                                if self.radius:
+                                    # the endpoints, midpoints, angles and centers of the edges
+                                    # lying within the snap radius are taken from the index
+                                    origin = Vector(self.snapInfo['x'],self.snapInfo['y'],self.snapInfo['z'])
+                                    types = [t for t in ['endpoint','midpoint','angle','center'] if self.isEnabled(t)]
+                                    snaps.extend(self.index.getNearSnaps(obj,origin,self.radius,types))
+                                else:
+                                    snaps.extend(self.snapToEndpoints(edge))
+                                    snaps.extend(self.snapToMidpoint(edge))
+                                    if isinstance (edge.Curve,Part.Circle):
+                                        # the edge is an arc, we have extra options
+                                        snaps.extend(self.snapToAngles(edge))
+                                        snaps.extend(self.snapToCenter(edge))
                                 snaps.extend(self.snapToPerpendicular(edge,lastpoint))
                                 #snaps.extend(self.snapToOrtho(edge,lastpoint,constrain)) # now part of snapToPolar
                                 snaps.extend(self.snapToIntersection(edge))
                                 snaps.extend(self.snapToElines(edge,eline))
 
-                                if isinstance (edge.Curve,Part.Circle):
-                                    # the edge is an arc, we have extra options
-                                    snaps.extend(self.snapToAngles(edge))
-                                    snaps.extend(self.snapToCenter(edge))
-
                         elif "Vertex" in comp:
                             # directly snapped to a vertex
                             snaps.append(self.snapToVertex(self.snapInfo,active=True))
@@ -380,7 +531,7 @@ class Snapper:
                 ob = FreeCAD.ActiveDocument.getObject(o)
                 if ob:
                     if ob.isDerivedFrom("Part::Feature"):
-                        edges = ob.Shape.Edges
+                        edges = self.index.getEdges(ob)
                         if (not self.maxEdges) or (len(edges) <= self.maxEdges):
                             for e in edges:
                                 if isinstance(e.Curve,Part.Line):
@@ -582,7 +733,7 @@ class Snapper:
         if self.isEnabled("angle"):
             rad = shape.Curve.Radius
             pos = shape.Curve.Center
-            for i in [0,30,45,60,90,120,135,150,180,210,225,240,270,300,315,330]:
+            for i in angleSnaps:
                 ang = math.radians(i)
                 cur = Vector(math.sin(ang)*rad+pos.x,math.cos(ang)*rad+pos.y,pos.z)
                 snaps.append([cur,'angle',cur])
@@ -594,7 +745,7 @@ class Snapper:
         if self.isEnabled("center"):
             rad = shape.Curve.Radius
             pos = shape.Curve.Center
-            for i in [15,37.5,52.5,75,105,127.5,142.5,165,195,217.5,232.5,255,285,307.5,322.5,345]:
+            for i in centerSnaps:
                 ang = math.radians(i)
                 cur = Vector(math.sin(ang)*rad+pos.x,math.cos(ang)*rad+pos.y,pos.z)
                 snaps.append([cur,'center',pos])
@@ -609,8 +760,9 @@ class Snapper:
                 obj = FreeCAD.ActiveDocument.getObject(self.lastObj[0])
                 if obj:
                     if obj.isDerivedFrom("Part::Feature"):
-                        if (not self.maxEdges) or (len(obj.Shape.Edges) <= self.maxEdges):
-                            for e in obj.Shape.Edges:
+                        if (not self.maxEdges) or (len(self.index.getEdges(obj)) <= self.maxEdges):
+                            # only the edges lying around the given shape can intersect it
+                            for e in self.index.getNearEdges(obj,shape.BoundBox):
                                 # get the intersection points
                                 pt = DraftGeomUtils.findIntersection(e,shape)
                                 if pt:
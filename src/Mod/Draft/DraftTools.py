@@ -3051,6 +3051,7 @@ class Edit(Modifier):
 
     def __init__(self):
         self.running = False
+        self.nodetracker = None
 
     def GetResources(self):
         return {'Pixmap'  : 'Draft_Edit',
@@ -3114,11 +3115,10 @@ class Edit(Modifier):
                         self.editpoints.append(self.obj.End)
                         self.editpoints.append(self.obj.Dimline)
                         self.editpoints.append(Vector(p[0],p[1],p[2]))
-                    self.trackers = []
+                    self.nodetracker = None
                     if self.editpoints:
-                        for ep in range(len(self.editpoints)):
-                            self.trackers.append(editTracker(self.editpoints[ep],self.obj.Name,
-                                                             ep,self.obj.ViewObject.LineColor))
+                        # all the nodes share a single tracker
+                        self.nodetracker = editPointsTracker(self.editpoints,self.obj.ViewObject.LineColor)
                         self.call = self.view.addEventCallback("SoEvent",self.action)
                         self.running = True
                         plane.save()
@@ -3139,9 +3139,9 @@ class Edit(Modifier):
                 if not self.obj.Closed:
                     self.obj.Closed = True
         if self.ui:
-            if self.trackers:
-                for t in self.trackers:
-                    t.finalize()
+            if self.nodetracker:
+                self.nodetracker.finalize()
+                self.nodetracker = None
         if hasattr(self.obj.ViewObject,"Selectable"):
             self.obj.ViewObject.Selectable = self.selectstate
         Modifier.finish(self)
@@ -3161,36 +3161,35 @@ class Edit(Modifier):
         elif arg["Type"] == "SoLocation2Event": #mouse movement detection
             if self.editing != None:
                 self.point,ctrlPoint,info = getPoint(self,arg)
-                self.trackers[self.editing].set(self.point)
-                self.update(self.trackers[self.editing].get())
+                self.nodetracker.set(self.editing,self.point)
+                self.update(self.nodetracker.get(self.editing))
         elif arg["Type"] == "SoMouseButtonEvent":
             if (arg["State"] == "DOWN") and (arg["Button"] == "BUTTON1"):
                 if self.editing == None:
-                    sel = FreeCADGui.Selection.getSelectionEx()
-                    if sel:
-                        sel = sel[0]
-                        if sel.ObjectName == self.obj.Name:
-                            if self.ui.addButton.isChecked():
+                    if self.ui.addButton.isChecked():
+                        sel = FreeCADGui.Selection.getSelectionEx()
+                        if sel:
+                            if sel[0].ObjectName == self.obj.Name:
                                 if self.point:
                                     self.pos = arg["Position"]
                                     self.addPoint(self.point)
-                            elif self.ui.delButton.isChecked():
-                                if 'EditNode' in sel.SubElementNames[0]:
-                                    self.delPoint(int(sel.SubElementNames[0][8:]))
-                            elif 'EditNode' in sel.SubElementNames[0]:
+                    else:
+                        node = self.nodetracker.pick(arg["Position"])
+                        if node != None:
+                            if self.ui.delButton.isChecked():
+                                self.delPoint(node)
+                            else:
                                 self.ui.pointUi()
                                 self.ui.isRelative.show()
-                                self.editing = int(sel.SubElementNames[0][8:])
-                                self.trackers[self.editing].off()
+                                self.editing = node
                                 if hasattr(self.obj.ViewObject,"Selectable"):
                                     self.obj.ViewObject.Selectable = False
                                 if "Points" in self.obj.PropertiesList:
                                     self.node.append(self.obj.Points[self.editing])
                 else:
-                    self.trackers[self.editing].on()
                     if hasattr(self.obj.ViewObject,"Selectable"):
                         self.obj.ViewObject.Selectable = True
-                    self.numericInput(self.trackers[self.editing].get())
+                    self.numericInput(self.nodetracker.get(self.editing))
 
     def update(self,v):
         if Draft.getType(self.obj) in ["Wire","BSpline"]:
@@ -3204,17 +3203,17 @@ class Edit(Modifier):
             if ( editPnt in pts ) == False:
                 pts[self.editing] = editPnt
                 self.obj.Points = pts
-                self.trackers[self.editing].set(v)
+                self.nodetracker.set(self.editing,v)
         elif Draft.getType(self.obj) == "Circle":
             delta = v.sub(self.obj.Placement.Base)
             if self.editing == 0:
                 p = self.obj.Placement
                 p.move(delta)
                 self.obj.Placement = p
-                self.trackers[0].set(self.obj.Placement.Base)
+                self.nodetracker.set(0,self.obj.Placement.Base)
             elif self.editing == 1:
                 self.obj.Radius = delta.Length
-            self.trackers[1].set(self.obj.Shape.Vertexes[0].Point)
+            self.nodetracker.set(1,self.obj.Shape.Vertexes[0].Point)
         elif Draft.getType(self.obj) == "Rectangle":
             delta = v.sub(self.obj.Placement.Base)
             if self.editing == 0:
@@ -3234,15 +3233,15 @@ class Edit(Modifier):
                         ay = -ay
                     self.obj.Length = ax
                     self.obj.Height = ay
-            self.trackers[0].set(self.obj.Placement.Base)
-            self.trackers[1].set(self.obj.Shape.Vertexes[2].Point)
+            self.nodetracker.set(0,self.obj.Placement.Base)
+            self.nodetracker.set(1,self.obj.Shape.Vertexes[2].Point)
         elif Draft.getType(self.obj) == "Polygon":
             delta = v.sub(self.obj.Placement.Base)
             if self.editing == 0:
                 p = self.obj.Placement
                 p.move(delta)
                 self.obj.Placement = p
-                self.trackers[0].set(self.obj.Placement.Base)
+                self.nodetracker.set(0,self.obj.Placement.Base)
             elif self.editing == 1:
                 if self.obj.DrawMode == 'inscribed':
                     self.obj.Radius = delta.Length
@@ -3250,7 +3249,7 @@ class Edit(Modifier):
                     halfangle = ((math.pi*2)/self.obj.FacesNumber)/2
                     rad = math.cos(halfangle)*delta.Length
                     self.obj.Radius = rad
-            self.trackers[1].set(self.obj.Shape.Vertexes[0].Point)
+            self.nodetracker.set(1,self.obj.Shape.Vertexes[0].Point)
         elif Draft.getType(self.obj) == "Dimension":
             if self.editing == 0:
                 self.obj.Start = v
@@ -3326,13 +3325,9 @@ class Edit(Modifier):
             self.resetTrackers()
 
     def resetTrackers(self):
-        for t in self.trackers:
-            t.finalize()
-        self.trackers = []
-        for ep in range(len(self.obj.Points)):
-            objPoints = self.obj.Points[ep]
-            if self.pl: objPoints = self.pl.multVec(objPoints)
-            self.trackers.append(editTracker(objPoints,self.obj.Name,ep,self.obj.ViewObject.LineColor))
+        pts = self.obj.Points
+        if self.pl: pts = [self.pl.multVec(p) for p in pts]
+        self.nodetracker.update(pts)
 
             
 class AddToGroup():
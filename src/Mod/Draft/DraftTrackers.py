@@ -399,28 +399,48 @@ class arcTracker(Tracker):
 
 class ghostTracker(Tracker):
     '''A Ghost tracker, that allows to copy whole object representations.
-    You can pass it an object or a list of objects, or a shape.'''
+    You can pass it an object or a list of objects, or a shape. Shapes,
+    and Part objects of selections bigger than maxNodes, are all drawn
+    together as a single set of lines, limited to about maxPoints points.'''
+
+    maxNodes = 32
+    maxPoints = 100000
+    curveSegments = 16
+
     def __init__(self,sel):
         self.trans = coin.SoTransform()
         self.trans.translation.setValue([0,0,0])
         self.children = [self.trans]
-        rootsep = coin.SoSeparator()
-        if not isinstance(sel,list):
-            sel = [sel]
-        for obj in sel:
-            rootsep.addChild(self.getNode(obj))
-        self.children.append(rootsep)        
+        self.children.append(self.getRootNode(sel))
         Tracker.__init__(self,children=self.children)
 
     def update(self,obj):
         "recreates the ghost from a new object"
         obj.ViewObject.show()
         self.finalize()
-        sep = getNode(obj)
-        Tracker.__init__(self,children=[self.sep])
+        self.children = [self.trans,self.getRootNode(obj)]
+        Tracker.__init__(self,children=self.children)
         self.on()
         obj.ViewObject.hide()
 
+    def getRootNode(self,sel):
+        "returns a coin node representing the given objects and shapes"
+        import Part
+        rootsep = coin.SoSeparator()
+        if not isinstance(sel,list):
+            sel = [sel]
+        shapes = []
+        for obj in sel:
+            if isinstance(obj,Part.Shape):
+                shapes.append(obj)
+            elif (len(sel) > self.maxNodes) and obj.isDerivedFrom("Part::Feature"):
+                shapes.append(obj.Shape)
+            else:
+                rootsep.addChild(self.getNode(obj))
+        if shapes:
+            rootsep.addChild(self.getNodeProxy(shapes))
+        return rootsep
+
     def move(self,delta):
         "moves the ghost to a given position, relative from its start position"
         self.trans.translation.setValue([delta.x,delta.y,delta.z])
@@ -440,13 +460,11 @@ class ghostTracker(Tracker):
     def getNode(self,obj):
         "returns a coin node representing the given object"
         if isinstance(obj,Part.Shape):
-            return self.getNodeLight(obj)
-        elif obj.isDerivedFrom("Part::Feature"):
-            return self.getNodeFull(obj)
+            return self.getNodeProxy([obj])
         else:
             return self.getNodeFull(obj)
 
-    def getNode(self,obj):
+    def getNodeFull(self,obj):
         "gets a coin node which is a full copy of the current representation"
         sep = coin.SoSeparator()
         try:
@@ -455,19 +473,34 @@ class ghostTracker(Tracker):
             pass
         return sep
 
-    def getNodeLight(self,shape):
-        "extract a lighter version directly from a shape"
-        # very error-prone, will be obsoleted ASAP
+    def getNodeProxy(self,shapes):
+        '''builds a single line set from the edges of the given shapes. If
+        they would give more than maxPoints points, only one edge out of
+        every few is drawn'''
+        import Part
+        edges = []
+        for shape in shapes:
+            edges.extend(shape.Edges)
+        step = 1
+        if len(edges)*2 > self.maxPoints:
+            step = int(math.ceil(len(edges)*2.0/self.maxPoints))
+        pts = []
+        nums = []
+        for e in edges[::step]:
+            if isinstance(e.Curve,Part.Line):
+                verts = [e.Vertexes[0].Point,e.Vertexes[-1].Point]
+            else:
+                verts = e.discretize(self.curveSegments+1)
+            pts.extend([[v.x,v.y,v.z] for v in verts])
+            nums.append(len(verts))
         sep = coin.SoSeparator()
-        try:
-            inputstr = coin.SoInput()
-            inputstr.setBuffer(shape.writeInventor())
-            coinobj = coin.SoDB.readAll(inputstr)
-            # only add wireframe or full node?
-            sep.addChild(coinobj.getChildren()[1])
-            # sep.addChild(coinobj)
-        except:
-            pass
+        if pts:
+            coords = coin.SoCoordinate3()
+            coords.point.setValues(pts)
+            lines = coin.SoLineSet()
+            lines.numVertices.setValues(nums)
+            sep.addChild(coords)
+            sep.addChild(lines)
         return sep
 
 class editTracker(Tracker):
@@ -504,6 +537,71 @@ class editTracker(Tracker):
     def move(self,delta):
         self.set(self.get().add(delta))
 
+class editPointsTracker(Tracker):
+    '''A tracker showing all the edit nodes of an object in a single point
+    set. The nodes are not selectable, use pick() to find the node under
+    the mouse cursor'''
+    def __init__(self,points=None,objcol=None):
+        color = coin.SoBaseColor()
+        if objcol:
+            color.rgb = objcol[:3]
+        else:
+            color.rgb = FreeCADGui.draftToolBar.getDefaultColor("snap")
+        pick = coin.SoPickStyle()
+        pick.style.setValue(coin.SoPickStyle.UNPICKABLE)
+        self.marker = coin.SoMarkerSet() # this is the marker symbol
+        self.marker.markerIndex = coin.SoMarkerSet.SQUARE_FILLED_9_9
+        self.coords = coin.SoCoordinate3() # these are the coordinates
+        node = coin.SoAnnotation()
+        node.addChild(pick)
+        node.addChild(self.coords)
+        node.addChild(color)
+        node.addChild(self.marker)
+        self.points = []
+        if points:
+            self.update(points)
+        Tracker.__init__(self,children=[node],ontop=True)
+        self.on()
+
+    def update(self,points):
+        "replaces all the nodes by the given points"
+        self.points = [Vector(p) for p in points]
+        self.coords.point.setNum(len(self.points))
+        if self.points:
+            self.coords.point.setValues([[p.x,p.y,p.z] for p in self.points])
+
+    def set(self,idx,pos):
+        "moves the node with the given index to the given position"
+        self.points[idx] = Vector(pos)
+        self.coords.point.set1Value(idx,[pos.x,pos.y,pos.z])
+
+    def get(self,idx):
+        "returns the position of the node with the given index"
+        return Vector(self.points[idx])
+
+    def pick(self,screenpos,radius=None):
+        '''pick(screenpos,[radius]): returns the index of the node closest to
+        the given (x,y) screen position, or None if there is none within radius
+        pixels (defaults to the snap range)'''
+        if radius == None:
+            radius = Draft.getParam("snapRange")
+        view = Draft.get3DView()
+        # work on the focal plane: the cursor, the pick radius and the
+        # view direction give the distance of each node to the pick ray
+        cursor = view.getPoint((screenpos[0],screenpos[1]))
+        radius = view.getPoint((screenpos[0]+radius,screenpos[1])).sub(cursor).Length
+        vdir = Vector(view.getViewDirection())
+        vdir.normalize()
+        best = None
+        shortest = radius*radius
+        for i in range(len(self.points)):
+            v = self.points[i].sub(cursor)
+            d = v.dot(v) - v.dot(vdir)**2
+            if d <= shortest:
+                shortest = d
+                best = i
+        return best
+
 class PlaneTracker(Tracker):
     "A working plane tracker"
     def __init__(self):
@@ -0,0 +1,451 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import FreeCAD, math, os, tempfile, unittest, Part, Draft, DraftGeomUtils, DraftVecUtils
+from FreeCAD import Vector
+from draftlibs import dxfReader
+import importSVG, importDXF
+
+#---------------------------------------------------------------------------
+# helpers and fixtures
+#---------------------------------------------------------------------------
+
+def placed(points,placements):
+    "the positions of the given points at each of the given placements"
+    return [pl.multVec(p) for pl in placements for p in points]
+
+def rounded(points):
+    "a sorted list of rounded point coordinates, to compare point sets"
+    return sorted([tuple([round(c,6) for c in p]) for p in points])
+
+class FakeObject:
+    "stands for a document object, so a proxy can be created without a document"
+    def addProperty(self,*args):
+        return self
+
+def ends(edges):
+    "returns the list of (first,last) vertex coordinates of a list of edges"
+    return [(tuple(e.Vertexes[0].Point),tuple(e.Vertexes[-1].Point)) for e in edges]
+
+# a minimal dxf file, with a layer table, a line and a circle
+DXF = """  0
+SECTION
+  2
+HEADER
+  9
+$ACADVER
+  1
+AC1009
+  0
+ENDSEC
+  0
+SECTION
+  2
+TABLES
+  0
+TABLE
+  2
+LAYER
+ 70
+1
+  0
+LAYER
+  2
+Walls
+ 70
+0
+ 62
+1
+  6
+CONTINUOUS
+  0
+ENDTAB
+  0
+ENDSEC
+  0
+SECTION
+  2
+ENTITIES
+  0
+LINE
+  8
+Walls
+ 10
+0.0
+ 20
+0.0
+ 30
+0.0
+ 11
+10.0
+ 21
+5.0
+ 31
+0.0
+  0
+CIRCLE
+  8
+0
+ 10
+2.0
+ 20
+3.0
+ 30
+0.0
+ 40
+1.5
+  0
+ENDSEC
+  0
+EOF
+"""
+
+# the (type,layer,points,loc,radius) of the entities of the dxf file above
+ENTITIES = [('line','Walls',[[0.0,0.0,0.0],[10.0,5.0,0.0]],None,None),
+            ('circle','0',None,[2.0,3.0,0.0],1.5)]
+
+def dxfEntity(kind,layer,*pairs):
+    "the dxf text of an entity, from its type, its layer and its (code,value) pairs"
+    pairs = ((0,kind),(8,layer)) + pairs
+    return "".join(["%3d\n%s\n" % p for p in pairs])
+
+def dxfBlock(name,*entities):
+    "the dxf text of a block definition containing the given entities"
+    return dxfEntity("BLOCK","0",(2,name),(70,0),(10,0.0),(20,0.0),(30,0.0)) + "".join(entities) + dxfEntity("ENDBLK","0")
+
+def dxfLine(layer,p1,p2,*pairs):
+    return dxfEntity("LINE",layer,(10,p1[0]),(20,p1[1]),(30,0.0),(11,p2[0]),(21,p2[1]),(31,0.0),*pairs)
+
+def dxfInsert(layer,block,pos,rotation=0):
+    return dxfEntity("INSERT",layer,(2,block),(10,pos[0]),(20,pos[1]),(30,0.0),(50,rotation))
+
+def dxfText(layer,text,pos):
+    return dxfEntity("TEXT",layer,(10,pos[0]),(20,pos[1]),(30,0.0),(40,0.5),(1,text))
+
+def dxfDrawing(blocks,entities):
+    "the dxf text of a drawing with the Walls and Doors layers, and the given blocks and entities"
+    return ("  0\nSECTION\n  2\nHEADER\n  9\n$ACADVER\n  1\nAC1009\n  0\nENDSEC\n"
+            "  0\nSECTION\n  2\nTABLES\n  0\nTABLE\n  2\nLAYER\n 70\n2\n" +
+            dxfEntity("LAYER","0",(2,"Walls"),(70,0),(62,7),(6,"CONTINUOUS")) +
+            dxfEntity("LAYER","0",(2,"Doors"),(70,0),(62,3),(6,"CONTINUOUS")) +
+            "  0\nENDTAB\n  0\nENDSEC\n  0\nSECTION\n  2\nBLOCKS\n" + "".join(blocks) +
+            "  0\nENDSEC\n  0\nSECTION\n  2\nENTITIES\n" + "".join(entities) +
+            "  0\nENDSEC\n  0\nEOF\n")
+
+# a drawing with entities on two layers, and a door block which inserts a leaf block
+DRAWING = dxfDrawing([dxfBlock("Leaf",
+                               dxfLine("0",(0,0),(1,0)),
+                               dxfEntity("ARC","0",(10,0.0),(20,0.0),(30,0.0),(40,1.0),(50,0.0),(51,90.0))),
+                      dxfBlock("Door",
+                               dxfLine("0",(0,0),(0,2)),
+                               dxfInsert("0","Leaf",(0,2)))],
+                     [dxfLine("Walls",(0,0),(10,0)),
+                      dxfLine("Walls",(10,0),(10,5),(62,1)),
+                      dxfEntity("LWPOLYLINE","Walls",(90,4),(70,1),(10,0.0),(20,6.0),(10,4.0),(20,6.0),
+                                (10,4.0),(20,8.0),(10,0.0),(20,8.0)),
+                      dxfEntity("ARC","Doors",(10,5.0),(20,5.0),(30,0.0),(40,2.0),(50,0.0),(51,90.0)),
+                      dxfEntity("CIRCLE","Doors",(10,2.0),(20,3.0),(30,0.0),(40,1.5)),
+                      dxfInsert("Doors","Door",(10,0)),
+                      dxfInsert("Doors","Door",(20,0),90)])
+
+# blocks inserting themselves, directly or through another block
+RECURSIVE = dxfDrawing([dxfBlock("Loop",
+                                 dxfLine("0",(0,0),(3,0)),
+                                 dxfInsert("0","Loop",(1,1))),
+                        dxfBlock("A",
+                                 dxfLine("0",(0,0),(1,0)),
+                                 dxfInsert("0","B",(0,1))),
+                        dxfBlock("B",
+                                 dxfLine("0",(0,0),(0,1)),
+                                 dxfInsert("0","a",(1,0)))],
+                       [dxfInsert("Walls","Loop",(0,10)),
+                        dxfInsert("Walls","A",(5,0)),
+                        dxfInsert("Walls","B",(20,0))])
+
+# block texts, of an inserted block and of a block that is not inserted
+TEXTS = dxfDrawing([dxfBlock("Tag",
+                             dxfLine("0",(0,0),(1,0)),
+                             dxfText("Doors","A",(0,1))),
+                    dxfBlock("Note",
+                             dxfText("Doors","B",(0,2)))],
+                   [dxfInsert("Walls","Tag",(0,0)),
+                    dxfInsert("Walls","Tag",(5,0))])
+
+# the import preferences the tests depend on, and the values they are tested with
+DXFPARAMS = [("Bool","dxfBatch",False),("Int","dxfProcesses",1),("Int","dxfstyle",0),
+             ("Bool","joingeometry",False),("Bool","groupLayers",False),("Bool","dxftext",False),
+             ("Bool","dxflayouts",False),("Bool","dxfstarblocks",False)]
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD Draft module
+#---------------------------------------------------------------------------
+
+class DraftGeomUtilsTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.pts = [Vector(0,0,0),Vector(4,0,0),Vector(4,3,0),Vector(1,5,0),Vector(-2,2,0),Vector(-2,-3,0)]
+        self.lines = [Part.Line(self.pts[i],self.pts[i+1]).toShape() for i in range(len(self.pts)-1)]
+        self.cell = 10**(-DraftVecUtils.precision())
+
+    def reversed(self,edge):
+        return Part.Line(edge.Vertexes[-1].Point,edge.Vertexes[0].Point).toShape()
+
+    def testSortEdgesShuffled(self):
+        # shuffled and partly reversed open polyline, read from its free end at pts[0]
+        edges = [self.lines[3],self.reversed(self.lines[0]),self.lines[4],
+                 self.reversed(self.lines[2]),self.lines[1]]
+        result = DraftGeomUtils.sortEdges(edges[:])
+        self.assertEqual(ends(result),[(tuple(self.pts[i]),tuple(self.pts[i+1])) for i in range(5)])
+        # edges reached by their first vertex are kept as they are
+        self.failUnless(result[1] is self.lines[1])
+        self.failUnless(result[3] is self.lines[3])
+        self.failUnless(result[4] is self.lines[4])
+
+    def testSortEdgesClosed(self):
+        # a closed wire has no free end, it is read from the first vertex of the first edge
+        closing = Part.Line(self.pts[-1],self.pts[0]).toShape()
+        edges = [self.lines[2],closing,self.lines[0],self.lines[4],self.lines[1],self.lines[3]]
+        order = [2,3,4,5,0,1,2]
+        self.assertEqual(ends(DraftGeomUtils.sortEdges(edges[:])),
+                         [(tuple(self.pts[order[i]]),tuple(self.pts[order[i+1]])) for i in range(6)])
+
+    def testSortEdgesArcs(self):
+        a,b,c,d = Vector(0,0,0),Vector(4,0,0),Vector(8,0,0),Vector(8,5,0)
+        line1 = Part.Line(a,b).toShape()
+        arc = Part.Arc(c,Vector(6,2,0),b).toShape()
+        line2 = Part.Line(c,d).toShape()
+        # read from the free end at d, the arc is reached by its first vertex and kept
+        result = DraftGeomUtils.sortEdges([arc,line2,line1])
+        self.assertEqual(ends(result),[(tuple(d),tuple(c)),(tuple(c),tuple(b)),(tuple(b),tuple(a))])
+        self.failUnless(result[1] is arc)
+        # read from a, the arc is reached by its last vertex and gets inverted
+        result = DraftGeomUtils.sortEdges([line1,arc,line2])
+        self.assertEqual(ends(result),[(tuple(a),tuple(b)),(tuple(b),tuple(c)),(tuple(c),tuple(d))])
+        self.failUnless(result[0] is line1)
+        self.failUnless(result[2] is line2)
+        self.failUnless(isinstance(result[1].Curve,Part.Circle))
+        self.failUnless(DraftVecUtils.equals(DraftGeomUtils.findMidpoint(result[1]),Vector(6,2,0)))
+
+    def testSortEdgesLong(self):
+        # longer than the recursion limit of the former implementation
+        import random
+        pts = [Vector(i,(i%2)*3,0) for i in range(3001)]
+        edges = [Part.Line(pts[i],pts[i+1]).toShape() for i in range(3000)]
+        for i in range(0,3000,7):
+            edges[i] = self.reversed(edges[i])
+        # the edge at the start of the polyline comes first, so the wire is read from there
+        rest = edges[1:]
+        random.Random(0).shuffle(rest)
+        edges = edges[:1]+rest
+        self.assertEqual(ends(DraftGeomUtils.sortEdges(edges)),
+                         [(tuple(pts[i]),tuple(pts[i+1])) for i in range(3000)])
+
+    def testFindWires(self):
+        triangle = [Part.Line(Vector(10,0,0),Vector(12,0,0)).toShape(),
+                    Part.Line(Vector(12,0,0),Vector(11,2,0)).toShape(),
+                    Part.Line(Vector(10,0,0),Vector(11,2,0)).toShape()]
+        edges = [self.lines[2],triangle[1],self.lines[0],triangle[2],self.lines[1],triangle[0]]
+        wires = DraftGeomUtils.findWires(edges)
+        self.assertEqual([len(w.Edges) for w in wires],[3,3])
+        self.assertEqual(ends(wires[0].Edges),ends([self.lines[2],self.lines[1],self.lines[0]]))
+        self.assertEqual(ends(wires[1].Edges),ends([triangle[1],triangle[0],triangle[2]]))
+
+    def testSortEdgesAcrossCells(self):
+        # two ends equal within precision but falling in two different hash cells
+        p1 = Vector(1+0.3*self.cell,2,0)
+        p2 = Vector(1+0.79*self.cell,2,0)
+        self.failUnless(DraftVecUtils.equals(p1,p2))
+        e1 = Part.Line(Vector(0,0,0),p1).toShape()
+        e2 = Part.Line(p2,Vector(3,0,0)).toShape()
+        result = DraftGeomUtils.sortEdges([e1,e2])
+        self.assertEqual(len(result),2)
+        # the second edge is reached by its first vertex and must be kept as it is
+        self.failUnless(result[1] is e2)
+
+    def testEdgeHashAcrossCells(self):
+        p1 = Vector(5,1-0.3*self.cell,-1)
+        p2 = Vector(5,1-0.79*self.cell,-1)
+        index = DraftGeomUtils.EdgeHash([Part.Line(p2,Vector(0,0,0)).toShape()])
+        self.assertEqual(index.matches(p1),[(0,0)])
+        self.assertEqual(index.matches(Vector(5,1-1.5*self.cell,-1)),[])
+
+class DxfReaderTestCases(unittest.TestCase):
+
+    def read(self,data):
+        "writes the given data to a file, and returns its entities read by dxfReader"
+        f,path = tempfile.mkstemp(suffix=".dxf")
+        os.write(f,data)
+        os.close(f)
+        try:
+            drawing = dxfReader.readDXF(path)
+        finally:
+            os.remove(path)
+        self.assertEqual([s.name for s in drawing.data],['header','tables','entities'])
+        return [(e.type,e.layer,getattr(e,"points",None),getattr(e,"loc",None),getattr(e,"radius",None))
+                for e in drawing.entities.data]
+
+    def testEntities(self):
+        self.assertEqual(self.read(DXF),ENTITIES)
+
+    def testTrailingBlankLines(self):
+        self.assertEqual(self.read(DXF+"\n\n"),ENTITIES)
+        self.assertEqual(self.read(DXF.replace("\n","\r\n")+"\r\n\r\n"),ENTITIES)
+
+    def testChunks(self):
+        # pairs split across chunks must be read as a whole
+        import StringIO
+        whole = list(dxfReader.tokenize(StringIO.StringIO(DXF)))
+        for chunk in (1,5,16):
+            self.assertEqual(list(dxfReader.tokenize(StringIO.StringIO(DXF+"\n"),chunk)),whole)
+        self.assertEqual(whole[-1],(0,'EOF'))
+
+class DxfImportTestCases(unittest.TestCase):
+
+    def setUp(self):
+        f,self.path = tempfile.mkstemp(suffix=".dxf")
+        os.close(f)
+        self.params = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Draft")
+        self.saved = []
+        for kind,name,value in DXFPARAMS:
+            self.saved.append((kind,name,getattr(self.params,"Get"+kind)(name)))
+            getattr(self.params,"Set"+kind)(name,value)
+        self.docs = []
+
+    def tearDown(self):
+        for kind,name,value in self.saved:
+            getattr(self.params,"Set"+kind)(name,value)
+        for doc in self.docs:
+            FreeCAD.closeDocument(doc.Name)
+        os.remove(self.path)
+
+    def load(self,batch,data=DRAWING):
+        "imports the given drawing in a new document, in batch mode or not"
+        f = open(self.path,"wb")
+        f.write(data)
+        f.close()
+        self.params.SetBool("dxfBatch",batch)
+        doc = FreeCAD.newDocument("DxfImportTest")
+        self.docs.append(doc)
+        importDXF.processdxf(doc,self.path)
+        return doc
+
+    def layers(self,doc):
+        "returns the objects of each layer group of a document, by layer name"
+        return dict([(o.Label,o.Group) for o in doc.Objects if o.isDerivedFrom("App::DocumentObjectGroup")])
+
+    def edges(self,objects):
+        "a sorted list of the rounded end points and lengths of the edges of the given objects"
+        return sorted([(tuple(rounded([e.Vertexes[0].Point,e.Vertexes[-1].Point])),round(e.Length,6))
+                       for o in objects for e in o.Shape.Edges])
+
+    def testBatchMode(self):
+        serial = self.layers(self.load(False))
+        batch = self.layers(self.load(True))
+        self.assertEqual(sorted(serial.keys()),["Doors","Walls"])
+        self.assertEqual(sorted(batch.keys()),["Doors","Walls"])
+        for layer in serial.keys():
+            self.assertEqual(self.edges(batch[layer]),self.edges(serial[layer]),layer)
+        self.assertEqual(len(self.edges(serial["Walls"])),6)
+        self.assertEqual(len(self.edges(serial["Doors"])),8)
+        # entities are grouped by type, layer and color
+        self.assertEqual(sorted([o.Name.rstrip("0123456789") for o in batch["Walls"]]),["Lines","Lines","Polylines"])
+        self.assertEqual(sorted([o.Name.rstrip("0123456789") for o in batch["Doors"]]),["Arcs","Blocks","Circles"])
+
+    def segments(self,segments):
+        "the edges description of a list of (start,end,length) segments"
+        return sorted([(tuple(rounded([Vector(*p1),Vector(*p2)])),round(l,6)) for p1,p2,l in segments])
+
+    def testNestedBlocks(self):
+        doors = self.layers(self.load(False))["Doors"]
+        self.assertEqual(self.edges(doors),
+                         self.segments([((7,5,0),(5,7,0),math.pi),
+                                        ((3.5,3,0),(3.5,3,0),3*math.pi),
+                                        # the leaf is placed in the door, the door in the drawing
+                                        ((10,0,0),(10,2,0),2),((10,2,0),(11,2,0),1),((11,2,0),(10,3,0),math.pi/2),
+                                        ((20,0,0),(18,0,0),2),((18,0,0),(18,1,0),1),((18,1,0),(17,0,0),math.pi/2)]))
+
+    def testRecursiveBlocks(self):
+        for batch in (False,True):
+            walls = self.layers(self.load(batch,RECURSIVE))["Walls"]
+            # the inserts closing a loop are skipped, the rest of the blocks is kept
+            self.assertEqual(self.edges(walls),
+                             self.segments([((0,10,0),(3,10,0),3),
+                                            ((5,0,0),(6,0,0),1),((5,1,0),(5,2,0),1),
+                                            ((20,0,0),(20,1,0),1)]))
+            self.assertEqual(sorted([b.name for b in importDXF.badobjects]),["A","Loop"])
+
+    def testBlockTexts(self):
+        self.params.SetBool("dxftext",True)
+        doc = self.load(False,TEXTS)
+        # the texts of all the blocks are added once, whatever the number of inserts
+        texts = [o.LabelText for o in doc.Objects if o.isDerivedFrom("App::Annotation")]
+        self.assertEqual(sorted(texts),[["A"],["B"]])
+        self.assertEqual(len(self.edges(self.layers(doc)["Walls"])),2)
+
+class SvgPathTestCases(unittest.TestCase):
+
+    def testStraightPaths(self):
+        # (points,closed) subpaths, y flipped, as the segment by segment reading builds them
+        for d,polygons in [("M 10,20 L 30,20 L 30,40 Z",
+                            [([(10,-20),(30,-20),(30,-40),(10,-20)],True)]),
+                           ("m 0 0 h 10 v 10 h -10 z m 20 0 l 5 5 5 -5",
+                            [([(0,0),(10,0),(10,-10),(0,-10),(0,0)],True),
+                             ([(20,0),(25,-5),(30,0)],False)]),
+                           ("M1e1-2L3.5.5 20 20",
+                            [([(10,2),(3.5,-0.5),(20,-20)],False)]),
+                           ("M 0 0 10 0 10 10",
+                            [([(0,0),(10,0),(10,-10)],False)]),
+                           ("M 0,0 L 10,0 M 5,5 L 5,15 L 0,15 Z",
+                            [([(0,0),(10,0)],False),
+                             ([(5,-5),(5,-15),(0,-15),(5,-5)],True)]),
+                           # repeated points are dropped
+                           ("M 0,0 L 10,0 L 10,0 L 10,10 L 0,0 Z",
+                            [([(0,0),(10,0),(10,-10),(0,0)],True)])]:
+            self.assertEqual(importSVG.getPolygons(importSVG.getPathData(d)),polygons,d)
+
+    def testCurvedPaths(self):
+        # paths with curves are left to the edge by edge reading
+        self.assertEqual(importSVG.getPolygons(importSVG.getPathData("M 0 0 C 1 1 2 2 3 3")),None)
+        self.assertEqual(importSVG.getPolygons(importSVG.getPathData("M 0 0 L 4 0 A 2 2 0 0 1 0 0")),None)
+
+class ArrayTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.array = Draft._Array(FakeObject())
+        self.points = [Vector(0,0,0),Vector(2,0,0),Vector(2,1,0.5),Vector(-1,3,2)]
+
+    def testRectPlacements(self):
+        placements = self.array.rectPlacements(Vector(5,0,0),Vector(1,4,0),Vector(0,0,3),3,2,2)
+        self.assertEqual(len(placements),12)
+        expected = [p.add(Vector(5*i+j,4*j,3*k)) for i in range(3) for j in range(2) for k in range(2) for p in self.points]
+        self.assertEqual(rounded(placed(self.points,placements)),rounded(expected))
+
+    def testPolarPlacements(self):
+        # a full circle does not repeat the base, a partial one ends on the given angle
+        for angle,num,angles in [(360,6,[0,60,120,180,240,300]),(180,4,[0,60,120,180]),(90.0,3,[0,45,90])]:
+            placements = self.array.polarPlacements(Vector(10,2,0),angle,num,Vector(0,0,1))
+            self.assertEqual(len(placements),num)
+            expected = []
+            for a in angles:
+                c,s = math.cos(math.radians(a)),math.sin(math.radians(a))
+                expected.extend([Vector(10+c*(p.x-10)-s*(p.y-2),2+s*(p.x-10)+c*(p.y-2),p.z) for p in self.points])
+            self.assertEqual(rounded(placed(self.points,placements)),rounded(expected))
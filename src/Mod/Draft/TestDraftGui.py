@@ -0,0 +1,139 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# The Draft snapper and trackers need the FreeCAD GUI, so these tests only run when it is up
+
+import FreeCAD, unittest, Part, Draft
+from FreeCAD import Vector
+import DraftSnap, DraftTrackers
+from DraftGui import todo
+
+#---------------------------------------------------------------------------
+# helpers
+#---------------------------------------------------------------------------
+
+def described(snaps):
+    "the rounded points and the type of a list of [point,type,visual point] snaps"
+    return [(tuple([round(c,6) for c in s[0]]),s[1],tuple([round(c,6) for c in s[2]])) for s in snaps]
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD Draft module
+#---------------------------------------------------------------------------
+
+class SnapIndexTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = FreeCAD.newDocument("SnapIndexTest")
+        self.obj = self.doc.addObject("Part::Feature","Shape")
+        # a line and a circle of radius 2
+        self.obj.Shape = Part.makeCompound([Part.Line(Vector(0,0,0),Vector(10,0,0)).toShape(),
+                                            Part.makeCircle(2,Vector(20,0,0))])
+        self.index = DraftSnap.SnapIndex()
+
+    def tearDown(self):
+        FreeCAD.closeDocument(self.doc.Name)
+
+    def testNearSnaps(self):
+        self.assertEqual(described(self.index.getNearSnaps(self.obj,Vector(0.5,0.1,0),1)),
+                         [((0,0,0),'endpoint',(0,0,0))])
+        self.assertEqual(described(self.index.getNearSnaps(self.obj,Vector(5,0.2,0),1)),
+                         [((5,0,0),'midpoint',(5,0,0))])
+        self.assertEqual(self.index.getNearSnaps(self.obj,Vector(2.5,0,0),1),[])
+        # nearest first
+        snaps = described(self.index.getNearSnaps(self.obj,Vector(0.4,0,0),10))
+        self.assertEqual(snaps[:3],[((0,0,0),'endpoint',(0,0,0)),((5,0,0),'midpoint',(5,0,0)),
+                                    ((10,0,0),'endpoint',(10,0,0))])
+        # the angle points of circles, and the points snapping to their center
+        self.assertEqual(described(self.index.getNearSnaps(self.obj,Vector(20,2.1,0),0.5)),
+                         [((20,2,0),'angle',(20,2,0))])
+        snaps = self.index.getNearSnaps(self.obj,Vector(20,2.1,0),1,['center'])
+        self.assertEqual(len(snaps),2)
+        self.assertEqual(described(snaps)[0][1:],('center',(20,0,0)))
+        # a radius covering the whole object, a full circle only has one vertex
+        self.assertEqual(len(self.index.getNearSnaps(self.obj,Vector(10,0,0),100)),3+2+16+16)
+
+    def testInvalidation(self):
+        data = self.index.get(self.obj)
+        self.failUnless(self.index.get(self.obj) is data)
+        # a new shape is indexed again
+        self.obj.Shape = Part.Line(Vector(0,5,0),Vector(10,5,0)).toShape()
+        self.failIf(self.index.get(self.obj) is data)
+        self.assertEqual(self.index.getNearSnaps(self.obj,Vector(0.5,0.1,0),1),[])
+        self.assertEqual(described(self.index.getNearSnaps(self.obj,Vector(0.5,5.1,0),1)),
+                         [((0,5,0),'endpoint',(0,5,0))])
+        # the objects of closed documents are forgotten
+        doc = FreeCAD.newDocument("SnapIndexTest")
+        obj = doc.addObject("Part::Feature","Shape")
+        obj.Shape = Part.makeCircle(1)
+        self.index.get(obj)
+        self.assertEqual(len(self.index.data),2)
+        FreeCAD.closeDocument(doc.Name)
+        self.obj.Shape = Part.makeCircle(3)
+        self.index.get(self.obj)
+        self.assertEqual(self.index.data.keys(),[(self.doc.Name,self.obj.Name)])
+
+class EditPointsTrackerTestCases(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = FreeCAD.newDocument("EditPointsTest")
+        self.view = Draft.get3DView()
+        self.view.viewTop()
+        self.tracker = None
+
+    def tearDown(self):
+        if self.tracker:
+            self.tracker.finalize()
+            todo.doTasks()
+        FreeCAD.closeDocument(self.doc.Name)
+
+    def testDefaultPoints(self):
+        self.tracker = DraftTrackers.editPointsTracker(objcol=(1.0,0.0,0.0))
+        self.assertEqual(self.tracker.points,[])
+        self.assertEqual(self.tracker.pick((20,20)),None)
+        # the nodes of a tracker are not shared with the next one
+        self.tracker.update([Vector(1,2,3)])
+        other = DraftTrackers.editPointsTracker(objcol=(1.0,0.0,0.0))
+        self.assertEqual(other.points,[])
+        other.finalize()
+
+    def testPick(self):
+        # nodes under given screen positions, the last one is far behind the first one
+        vdir = Vector(self.view.getViewDirection())
+        vdir.normalize()
+        points = [self.view.getPoint(pos) for pos in [(20,20),(60,20),(20,60),(80,60),(86,60)]]
+        points.append(points[0].add(Vector(vdir).multiply(1000)))
+        self.tracker = DraftTrackers.editPointsTracker(points[:5],objcol=(1.0,0.0,0.0))
+        self.assertEqual(self.tracker.pick((22,21),10),0)
+        self.assertEqual(self.tracker.pick((57,24),10),1)
+        self.assertEqual(self.tracker.pick((20,60),10),2)
+        self.assertEqual(self.tracker.pick((40,40),10),None)
+        # the nearest of two nodes within the radius
+        self.assertEqual(self.tracker.pick((82,60),10),3)
+        self.assertEqual(self.tracker.pick((84,60),10),4)
+        self.assertEqual(self.tracker.pick((84,60),1),None)
+        # the depth of the nodes along the view direction doesn't count
+        self.tracker.update([points[5],points[1]])
+        self.assertEqual(self.tracker.pick((21,20),10),0)
+        # moved nodes are picked at their new position
+        self.tracker.set(1,self.view.getPoint((40,40)))
+        self.assertEqual(self.tracker.pick((40,41),10),1)
+        self.assertEqual(self.tracker.pick((60,20),10),None)
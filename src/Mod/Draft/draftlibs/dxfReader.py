@@ -2,6 +2,10 @@
 
 	The convert function is called by the readDXF fuction to convert dxf strings into the correct data based
 	on their type code.  readDXF expects a (full path) file name as input.
+
+	The file is read in a single pass: code/value pairs are tokenized from large buffered chunks, and
+	iterDXF yields each object as soon as it is complete, so callers can start working before the whole
+	file has been read.
 """
 
 # --------------------------------------------------------------------------
@@ -28,8 +32,12 @@
 # --------------------------------------------------------------------------
 
 
+from itertools import izip
 from dxfImportObjects import *
 
+CHUNK = 1 << 20 # bytes read at once by the tokenizer
+INDEXED = 32 # minimum number of items of indexed objects
+
 class Object:
 	"""Empty container class for dxf objects"""
 
@@ -38,6 +46,9 @@ class Object:
 		self.type = _type
 		self.name = ''
 		self.data = []
+		self._index = None
+		self._indexed = None
+		self._count = 0
 
 	def __str__(self):
 		if self.name:
@@ -48,60 +59,44 @@ class Object:
 	def __repr__(self):
 		return str(self.data)
 
+	def index(self):
+		"""Returns a dictionary of the objects in self.data by type (or data by code).
+
+		The index is built in one pass over self.data, and rebuilt only if self.data
+		has been replaced or resized since the last call.
+		"""
+		if self._indexed is not self.data or self._count != len(self.data):
+			index = {}
+			for item in self.data:
+				if type(item) == list:
+					# data, indexed by its code
+					key, item = item[0], item[1]
+				else:
+					key = item.type
+				if key in index:
+					index[key].append(item)
+				else:
+					index[key] = [item]
+			self._index = index
+			self._indexed = self.data
+			self._count = len(self.data)
+		return self._index
+
 	def get_type(self, kind=''):
 		"""Despite the name, this method actually returns all objects of type 'kind' from self.data."""
-		if type:
+		if len(self.data) < INDEXED:
+			# scanning a few items is cheaper than indexing them
 			objects = []
 			for item in self.data:
-				if type(item) != list and item.type == kind:
-					# we want this type of object
+				if type(item) == list:
+					if item[0] == kind:
+						objects.append(item[1])
+				elif item.type == kind:
 					objects.append(item)
-				elif type(item) == list and item[0] == kind:
-					# we want this type of data
-					objects.append(item[1])
 			return objects
+		return list(self.index().get(kind, ()))
 
 
-class InitializationError(Exception): pass
-
-class StateMachine:
-	"""(finite) State Machine from the great David Mertz's great Charming Python article."""
-
-	def __init__(self):
-		self.handlers = []
-		self.startState = None
-		self.endStates = []
-
-	def add_state(self, handler, end_state=0):
-		"""All states and handlers are functions which return
-		a state and a cargo."""
-		self.handlers.append(handler)
-		if end_state:
-			self.endStates.append(handler)
-	def set_start(self, handler):
-		"""Sets the starting handler function."""
-		self.startState = handler
-
-
-	def run(self, cargo=None):
-		if not self.startState:
-			raise InitializationError,\
-				  "must call .set_start() before .run()"
-		if not self.endStates:
-			raise InitializationError, \
-				  "at least one state must be an end_state"
-		handler = self.startState
-		while 1:
-			(newState, cargo) = handler(cargo)
-			#print cargo
-			if newState in self.endStates:
-				return newState(cargo)
-				#break
-			elif newState not in self.handlers:
-				raise RuntimeError, "Invalid target %s" % newState
-			else:
-				handler = newState
-
 def get_name(data):
 	"""Get the name of an object from its object data.
 
@@ -154,182 +149,115 @@ def convert(code, value):
 	return value
 
 
-def findObject(infile, kind=''):
-	"""Finds the next occurance of an object."""
-	obj = False
-	while 1:
-		line = infile.readline()
-		if not line: # readline returns '' at eof
-			return False
-		if not obj: # We're still looking for our object code
-			if line.lower().strip() == '0':
-				obj = True # found it
-		else: # we are in an object definition
-			if kind: # if we're looking for a particular kind
-				if line.lower().strip() == kind:
-					obj = Object(line.lower().strip())
-					break
-			else: # otherwise take anything non-numeric
-				if line.lower().strip() not in string.digits:
-					obj = Object(line.lower().strip())
-					break
-			obj = False # whether we found one or not it's time to start over
-	return obj
-
-def handleObject(infile):
-	"""Add data to an object until end of object is found."""
-	line = infile.readline()
-	if line.lower().strip() == 'section':
-		return 'section' # this would be a problem
-	elif line.lower().strip() == 'endsec':
-		return 'endsec' # this means we are done with a section
-	else: # add data to the object until we find a new object
-		obj = Object(line.lower().strip())
-		obj.name = obj.type
-		done = False
-		data = []
-		while not done:
-			line = infile.readline()
-			if not data:
-				if line.lower().strip() == '0':
-					#we've found an object, time to return
-					return obj
-				else:
-					# first part is always an int
-					data.append(int(line.lower().strip()))
-			else:
-				data.append(convert(data[0], line.strip()))
-				obj.data.append(data)
-				data = []
-
-def handleTable(table, infile):
-	"""Special handler for dealing with nested table objects."""
-	item, name = get_name(table.data)
-	if name: # We should always find a name
-		table.data.remove(item)
-		table.name = name.lower()
-	# This next bit is from handleObject
-	# handleObject should be generalized to work with any section like object
-	while 1:
-		obj = handleObject(infile)
-		if obj.type == 'table':
-			print "Warning: previous table not closed!"
-			return table
-		elif obj.type == 'endtab':
-			return table # this means we are done with the table
-		else: # add objects to the table until one of the above is found
-			table.data.append(obj)
+def tokenize(infile, chunk=CHUNK):
+	"""Generator of the (code, value) pairs of a dxf file.
 
-
-
-
-def handleBlock(block, infile):
-	"""Special handler for dealing with nested table objects."""
-	item, name = get_name(block.data)
-	if name: # We should always find a name
-		# block.data.remove(item)
-		block.name = name
-	# This next bit is from handleObject
-	# handleObject should be generalized to work with any section like object
+	The file is read in chunks of the given size, codes are returned as ints and values as
+	stripped strings (they still have to be converted). Reading stops at the EOF group, or
+	at the first blank code line, so anything written after the drawing is ignored.
+	"""
+	tail = ''
 	while 1:
-		obj = handleObject(infile)
-		if obj.type == 'block':
-			print "Warning: previous block not closed!"
-			return block
-		elif obj.type == 'endblk':
-			return block # this means we are done with the table
-		else: # add objects to the table until one of the above is found
-			block.data.append(obj)
-
-
-
-
-"""These are the states/functions used in the State Machine.
-states:
- start - find first section
- start_section - add data, find first object
-   object - add obj-data, watch for next obj (called directly by start_section)
- end_section - look for next section or eof
- end - return results
-"""
-
-def start(cargo):
-	"""Expects the infile as cargo, initializes the cargo."""
-	#print "Entering start state!"
-	infile = cargo
-	drawing = Object('drawing')
-	section = findObject(infile, 'section')
-	if section:
-		return start_section, (infile, drawing, section)
-	else:
-		return error, (infile, "Failed to find any sections!")
-
-def start_section(cargo):
-	"""Expects [infile, drawing, section] as cargo, builds a nested section object."""
-	#print "Entering start_section state!"
-	infile = cargo[0]
-	drawing = cargo[1]
-	section = cargo[2]
-	# read each line, if it is an object declaration go to object mode
-	# otherwise create a [index, data] pair and add it to the sections data.
-	done = False
-	data = []
-	while not done:
-		line = infile.readline()
-
-		if not data: # if we haven't found a dxf code yet
-			if line.lower().strip() == '0':
-				# we've found an object
-				while 1: # no way out unless we find an end section or a new section
-					obj = handleObject(infile)
-					if obj == 'section': # shouldn't happen
-						print "Warning: failed to close previous section!"
-						return end_section, (infile, drawing)
-					elif obj == 'endsec': # This section is over, look for the next
-						drawing.data.append(section)
-						return end_section, (infile, drawing)
-					elif obj.type == 'table': # tables are collections of data
-						obj = handleTable(obj, infile) # we need to find all there contents
-						section.data.append(obj) # before moving on
-					elif obj.type == 'block': # the same is true of blocks
-						obj = handleBlock(obj, infile) # we need to find all there contents
-						section.data.append(obj) # before moving on
-					else: # found another sub-object
-						section.data.append(obj)
+		buf = infile.read(chunk)
+		if not buf: # eof
+			break
+		lines = (tail + buf).split('\n')
+		# keep the incomplete line, and an unpaired code, for the next chunk
+		tail = lines.pop()
+		if len(lines) % 2:
+			tail = lines.pop() + '\n' + tail
+		for code, value in izip(lines[0::2], lines[1::2]):
+			if not code.strip():
+				return
+			code = int(code)
+			value = value.strip()
+			yield code, value
+			if not code and value == 'EOF':
+				return
+	lines = tail.split('\n')
+	for code, value in izip(lines[0::2], lines[1::2]):
+		if not code.strip():
+			return
+		yield int(code), value.strip()
+
+def iterDXF(infile, chunk=CHUNK):
+	"""Generator parsing a dxf file in a single pass.
+
+	Yields (section, obj) each time obj has been completely read and appended to the
+	section, and (section, None) when the section is over.  Tables and blocks are
+	yielded once, with all their contents.
+	"""
+	section = None # current section
+	group = None # current table or block
+	obj = None # current object
+	for code, value in tokenize(infile, chunk):
+		if code:
+			if obj:
+				obj.data.append([code, convert(code, value)])
+			elif section:
+				# section data, found before its first object
+				value = convert(code, value)
+				if code == 2:
+					section.name = value.lower()
+				section.data.append([code, value])
+			continue
+		# we've found a new object, first finish the previous one
+		if obj:
+			if obj.type == 'table':
+				item, name = get_name(obj.data)
+				if name: # We should always find a name
+					obj.data.remove(item)
+					obj.name = name.lower()
+				group = obj
+			elif obj.type == 'block':
+				item, name = get_name(obj.data)
+				if name: # We should always find a name
+					obj.name = name
+				group = obj
+			elif obj.type in ('endtab', 'endblk'):
+				pass # already closed
+			elif group:
+				group.data.append(obj)
 			else:
-				data.append(int(line.lower().strip()))
-		else: # we have our code, now we just need to convert the data and add it to our list.
-			data.append(convert(data[0], line.strip()))
-			section.data.append(data)
-			data = []
-def end_section(cargo):
-	"""Expects (infile, drawing) as cargo, searches for next section."""
-	#print "Entering end_section state!"
-	infile = cargo[0]
-	drawing = cargo[1]
-	section = findObject(infile, 'section')
-	if section:
-		return start_section, (infile, drawing, section)
-	else:
-		return end, (infile, drawing)
-
-def end(cargo):
-	"""Expects (infile, drawing) as cargo, called when eof has been reached."""
-	#print "Entering end state!"
-	infile = cargo[0]
-	drawing = cargo[1]
-	#infile.close()
-	return drawing
-
-def error(cargo):
-	"""Expects a (infile, string) as cargo, called when there is an error during processing."""
-	#print "Entering error state!"
-	infile = cargo[0]
-	err = cargo[1]
-	infile.close()
-	print "There has been an error:"
-	print err
-	return False
+				section.data.append(obj)
+				yield section, obj
+			obj = None
+		kind = value.lower()
+		if section is None:
+			if kind == 'section':
+				section = Object(kind)
+			continue
+		if kind in ('endtab', 'endblk'):
+			if group:
+				section.data.append(group)
+				yield section, group
+				group = None
+			else:
+				print "Warning: %s found out of a table or block!" % kind
+			obj = Object(kind) # its data is dropped
+		elif kind in ('table', 'block') and group:
+			print "Warning: previous %s not closed!" % group.type
+			section.data.append(group)
+			yield section, group
+			group = None
+			obj = Object(kind)
+			obj.name = kind
+		elif kind in ('section', 'endsec', 'eof'):
+			if group:
+				print "Warning: previous %s not closed!" % group.type
+				section.data.append(group)
+				yield section, group
+				group = None
+			if kind != 'endsec':
+				print "Warning: failed to close previous section!"
+			else:
+				yield section, None
+			section = None
+			if kind == 'section':
+				section = Object(kind)
+		else:
+			obj = Object(kind)
+			obj.name = kind
 
 def readDXF(filename):
 	"""Given a file name try to read it as a dxf file.
@@ -352,31 +280,31 @@ def readDXF(filename):
 	is of the form [code, data].
 """
 	infile = open(filename)
-
-	sm = StateMachine()
-	sm.add_state(error, True)
-	sm.add_state(end, True)
-	sm.add_state(start_section)
-	sm.add_state(end_section)
-	sm.add_state(start)
-	sm.set_start(start)
+	drawing = Object('drawing')
 	try:
-		drawing = sm.run(infile)
-		if drawing:
-			drawing.name = filename
-			for obj in drawing.data:
-				item, name = get_name(obj.data)
-				if name:
-					obj.data.remove(item)
-					obj.name = name.lower()
-					setattr(drawing, name.lower(), obj)
-					# Call the objectify function to cast
-					# raw objects into the right types of object
-					obj.data = objectify(obj.data)
-				#print obj.name
+		for section, obj in iterDXF(infile):
+			if obj is None:
+				drawing.data.append(section)
+		if not drawing.data:
+			print "There has been an error:"
+			print "Failed to find any sections!"
+			return False
+		drawing.name = filename
+		for obj in drawing.data:
+			item, name = get_name(obj.data)
+			if name:
+				obj.data.remove(item)
+				obj.name = name.lower()
+				setattr(drawing, name.lower(), obj)
+				# Call the objectify function to cast
+				# raw objects into the right types of object
+				obj.data = objectify(obj.data)
+				obj.index()
+			#print obj.name
 	finally:
 		infile.close()
 	return drawing
+
 if __name__ == "__main__":
 	filename = r".\examples\block-test.dxf"
 	drawing = readDXF(filename)
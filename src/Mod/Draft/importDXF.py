@@ -40,7 +40,7 @@ lines, polylines, lwpolylines, circles, arcs,
 texts, colors,layers (from groups)
 '''
 
-import FreeCAD, os, Part, math, re, string, Mesh, Draft, DraftVecUtils, DraftGeomUtils
+import FreeCAD, os, Part, math, re, string, time, Mesh, Draft, DraftVecUtils, DraftGeomUtils
 from draftlibs import dxfColorMap, dxfLibrary
 from draftlibs.dxfReader import readDXF
 from Draft import _Dimension, _ViewProviderDimension
@@ -55,6 +55,12 @@ except: draftui = None
 if open.__module__ == '__builtin__':
     pythonopen = open # to distinguish python built-in open function from the one declared here
 
+# entity types that are grouped by layer and color in batch mode
+batchTypes = ["line","polyline","arc","circle","solid","spline"]
+batchNames = {"line":"Lines","polyline":"Polylines","arc":"Arcs","circle":"Circles",
+              "solid":"Solids","spline":"Splines","insert":"Blocks"}
+BATCH_CHUNK = 256 # minimum number of entities drawn by each process
+
 def prec():
     "returns the current Draft precision level"
     return Draft.getParam("precision")
@@ -203,6 +209,12 @@ class fcformat:
         self.stdSize = params.GetBool("dxfStdSize")
         self.importDxfHatches = params.GetBool("importDxfHatches")
         self.renderPolylineWidth = params.GetBool("renderPolylineWidth")
+        self.batch = params.GetBool("dxfBatch")
+        if self.batch and ((self.paramstyle >= 4) or self.join or self.makeBlocks):
+            # batch mode only builds plain shapes, grouped by layer and color
+            FreeCAD.Console.PrintMessage("dxf: batch import is disabled by the parametric, sketch, join and layer block options\n")
+            self.batch = False
+        self.processes = params.GetInt("dxfProcesses")
         bparams = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/View")
 
         if self.paramstyle > 1:
@@ -593,11 +605,30 @@ def drawSpline(spline,shapemode=False):
         warn(spline)
     return None
     
+def getBlockDefinition(name):
+    "returns the dxf block definition with the given name (case insensitive), or None"
+    global blockdefs
+    if blockdefs == None:
+        blockdefs = {}
+        for b in drawing.blocks.get_type("block"):
+            blockdefs[b.name.upper()] = b
+    return blockdefs.get(name.upper())
+
 def drawBlock(blockref,num=None):
-    "returns a shape from a dxf block reference"
+    """returns a shape from a dxf block reference. Each block is built only once, then
+    its shape is taken from the blockshapes cache, so the blocks inserted in it (at any
+    nesting level) are only expanded once too. Blocks that fail are not cached, and
+    are tried again at their next insert"""
     if not fmt.paramstarblocks:
         if blockref.name[0] == '*':
             return None
+    if blockref.name in blockshapes:
+        return blockshapes[blockref.name]
+    if blockref.name in blockstack:
+        print "dxf: block ",blockref.name," inserts itself"
+        warn(blockref,num)
+        return None
+    blockstack.append(blockref.name)
     shapes = []
     for line in blockref.entities.get_type('line'):
         s = drawLine(line,shapemode=True)
@@ -634,29 +665,38 @@ def drawBlock(blockref,num=None):
              if fmt.dxflayout or (not rawValue(text,67)):
                 print "adding block text",text.value, " from ",blockref
                 addText(text)
+    blockstack.pop()
+    shape = None
     try: shape = Part.makeCompound(shapes)
     except: warn(blockref)
     if shape:
         blockshapes[blockref.name]=shape
-        return shape
-    return None
+    return shape
 
 def drawInsert(insert,num=None):
-    if blockshapes.has_key(insert):
-        shape = blockshapes[insert.block].copy()
+    """returns a shape from a dxf insert. The shape of the inserted block is shared,
+    not copied, unless the insert is scaled"""
+    if insert.block in blockshapes:
+        shape = blockshapes[insert.block]
     else:
         shape = None
-        for b in drawing.blocks.data:
-            if b.name == insert.block:
-                shape = drawBlock(b,num)
+        block = getBlockDefinition(insert.block)
+        if block:
+            shape = drawBlock(block,num)
     if fmt.paramtext:
         attrs = attribs(insert)
         for a in attrs:
             addText(a,attrib=True)
     if shape:
         pos = vec(insert.loc)
-        rot = math.radians(insert.rotation)
         scale = insert.scale
+        if (scale[0] == 1) and (scale[1] == 1):
+            # placement-only instance, the compound only references the block shape
+            shape = Part.makeCompound([shape])
+            rot = FreeCAD.Rotation(Vector(0,0,1),insert.rotation)
+            shape.Placement = FreeCAD.Placement(pos,rot)
+            return shape
+        rot = math.radians(insert.rotation)
         tsf = FreeCAD.Matrix()
         tsf.scale(scale[0],scale[1],0) # for some reason z must be 0 to work
         tsf.rotateZ(rot)
@@ -684,11 +724,12 @@ def attribs(insert):
     "checks if an insert has attributes, and returns the values if yes"
     atts = []
     if rawValue(insert,66) != 1: return []
-    index = None
-    for i in range(len(drawing.entities.data)):
-        if drawing.entities.data[i] == insert:
-            index = i
-            break
+    global entityindex
+    if entityindex == None:
+        entityindex = {}
+        for i in range(len(drawing.entities.data)):
+            entityindex[id(drawing.entities.data[i])] = i
+    index = entityindex.get(id(insert))
     if index == None: return []
     j = index+1
     while True:
@@ -768,21 +809,206 @@ def addToBlock(obj,layer):
     else:
         layerBlocks[layer] = [obj]
 
+def lap(name,start):
+    "records the time spent in an import phase since start, and returns the current time"
+    now = time.time()
+    timings.append((name,now-start))
+    return now
+
+def getPolylines():
+    "returns the polylines and the polyface meshes of the drawing"
+    pls = drawing.entities.get_type("lwpolyline")
+    pls.extend(drawing.entities.get_type("polyline"))
+    polylines = []
+    meshes = []
+    for p in pls:
+        if hasattr(p,"flags"):
+            if p.flags in [16,64]:
+                meshes.append(p)
+            else:
+                polylines.append(p)
+        else:
+            polylines.append(p)
+    return polylines,meshes
+
+def batchEntities(kind):
+    "returns the entities of the given kind to be drawn in batch mode"
+    if kind == "polyline":
+        entities = getPolylines()[0]
+    else:
+        entities = drawing.entities.get_type(kind)
+    return [e for e in entities if fmt.dxflayout or (not rawValue(e,67))]
+
+def drawBatch(kind,start,end):
+    """draws a range of the batched entities of a kind, grouped by layer and color.
+    Returns a list of [layer,color,index,compound] items, where index is the first
+    entity of the group, and the list of indices of the entities that failed. Failed
+    entities are not added to badobjects, the caller must do it"""
+    groups = {}
+    failed = []
+    entities = batchLists[kind]
+    for i in range(start,end):
+        entity = entities[i]
+        bad = len(badobjects)
+        if kind == "line":
+            shape = drawLine(entity,shapemode=True)
+        elif kind == "polyline":
+            shape = drawPolyline(entity,shapemode=True,num=i)
+        elif kind == "arc":
+            shape = drawArc(entity,shapemode=True)
+        elif kind == "circle":
+            shape = drawCircle(entity,shapemode=True)
+        elif kind == "solid":
+            shape = drawSolid(entity)
+        else:
+            shape = drawSpline(entity,shapemode=True)
+        if len(badobjects) > bad:
+            del badobjects[bad:]
+            failed.append(i)
+        if shape:
+            key = batchKey(entity)
+            if key in groups:
+                groups[key][1].append(shape)
+            else:
+                groups[key] = [i,[shape]]
+    result = []
+    for key,group in groups.iteritems():
+        result.append([key[0],key[1],group[0],Part.makeCompound(group[1])])
+    return result,failed
+
+def _drawBatch(args):
+    "process pool worker: draws a range of entities, and returns its shapes as brep strings"
+    kind,start,end = args
+    groups,failed = drawBatch(kind,start,end)
+    for g in groups:
+        g[3] = g[3].exportBrepToString()
+    return kind,groups,failed
+
+def batchKey(entity):
+    "returns the (layer,color) key a batched entity is grouped with"
+    layer = getattr(entity,"layer",None)
+    if layer == None: layer = rawValue(entity,8)
+    color = getattr(entity,"color_index",None)
+    if color == None: color = rawValue(entity,62)
+    if color == None: color = 256
+    return layer,color
+
+def addToBatch(kind,shape,entity):
+    "adds given shape to the batch of its kind, layer and color"
+    layer,color = batchKey(entity)
+    key = (kind,layer,color)
+    if key in batchGroups:
+        batchGroups[key][1].append(shape)
+    else:
+        batchGroups[key] = [entity,[shape]]
+
+def drawBatches():
+    """draws all the batched entities, in a pool of processes if there are enough
+    of them, and stores the resulting shapes in the batchGroups dict"""
+    global batchLists
+    batchLists = {}
+    tasks = []
+    for kind in batchTypes:
+        entities = batchEntities(kind)
+        if entities:
+            FreeCAD.Console.PrintMessage("drawing "+str(len(entities))+" "+batchNames[kind].lower()+"...\n")
+        batchLists[kind] = entities
+    total = sum([len(l) for l in batchLists.values()])
+    results = None
+    pool = None
+    processes = fmt.processes
+    if (os.name == "posix") and (processes != 1) and (total > 2*BATCH_CHUNK):
+        # workers are forked, so they share the dxf data and don't need FreeCAD to be importable
+        try:
+            import multiprocessing
+            if not processes: processes = multiprocessing.cpu_count()
+            size = max(BATCH_CHUNK,total/(4*processes)+1)
+            for kind in batchTypes:
+                for start in range(0,len(batchLists[kind]),size):
+                    tasks.append((kind,start,min(start+size,len(batchLists[kind]))))
+            pool = multiprocessing.Pool(processes)
+            results = []
+            for kind,groups,failed in pool.imap_unordered(_drawBatch,tasks):
+                for g in groups:
+                    sh = Part.Shape()
+                    sh.importBrepFromString(g[3])
+                    g[3] = sh
+                results.append((kind,groups,failed))
+            pool.close()
+            pool.join()
+        except:
+            print "dxf: couldn't use a process pool, drawing geometry serially"
+            if pool: pool.terminate()
+            results = None
+    if results == None:
+        results = []
+        for kind in batchTypes:
+            groups,failed = drawBatch(kind,0,len(batchLists[kind]))
+            results.append((kind,groups,failed))
+    first = {}
+    for kind,groups,failed in results:
+        for i in failed:
+            badobjects.append(batchLists[kind][i])
+        for layer,color,index,shape in groups:
+            key = (kind,layer,color)
+            if key in batchGroups:
+                batchGroups[key][1].append(shape)
+                first[key] = min(first[key],index)
+            else:
+                batchGroups[key] = [None,[shape]]
+                first[key] = index
+    for key,index in first.iteritems():
+        # the first entity of the group is used for formatting
+        batchGroups[key][0] = batchLists[key[0]][index]
+    del batchLists
+
+def insertBatches():
+    "adds the batched shapes to the document, one object by kind, layer and color"
+    undo = None
+    if hasattr(doc,"UndoMode"):
+        undo = doc.UndoMode
+        doc.UndoMode = 0
+    try:
+        for key in sorted(batchGroups.keys()):
+            kind,layer,color = key
+            entity,shapes = batchGroups[key]
+            if len(shapes) == 1:
+                shape = shapes[0]
+            else:
+                shape = Part.makeCompound(shapes)
+            newob = addObject(shape,batchNames[kind],layer)
+            if gui: fmt.formatObject(newob,entity)
+    finally:
+        if undo != None:
+            doc.UndoMode = undo
+
 def processdxf(document,filename):
     "this does the translation of the dxf contents into FreeCAD Part objects"
     global drawing # for debugging - so drawing is still accessible to python after the script
+    global timings
+    timings = []
+    t = time.time()
     FreeCAD.Console.PrintMessage("opening "+filename+"...\n")
     drawing = readDXF(filename)
+    t = lap("reading",t)
     global layers
     layers = []
     global doc
     doc = document
     global blockshapes
     blockshapes = {}
+    global blockdefs
+    blockdefs = None
+    global blockstack
+    blockstack = []
+    global entityindex
+    entityindex = None
     global badobjects
     badobjects = []
     global layerBlocks
     layerBlocks = {}
+    global batchGroups
+    batchGroups = {}
     sketch = None
     
     # getting config parameters
@@ -791,9 +1017,16 @@ def processdxf(document,filename):
     fmt = fcformat(drawing)
     shapes = []
 
+    # drawing lines, polylines, arcs, circles, solids and splines at once
+
+    if fmt.batch:
+        drawBatches()
+        t = lap("geometry",t)
+
     # drawing lines
 
     lines = drawing.entities.get_type("line")
+    if fmt.batch: lines = []
     if lines: FreeCAD.Console.PrintMessage("drawing "+str(len(lines))+" lines...\n")
     for line in lines:
         if fmt.dxflayout or (not rawValue(line,67)):
@@ -821,18 +1054,8 @@ def processdxf(document,filename):
 						
     # drawing polylines
 
-    pls = drawing.entities.get_type("lwpolyline")
-    pls.extend(drawing.entities.get_type("polyline"))
-    polylines = []
-    meshes = []
-    for p in pls:
-        if hasattr(p,"flags"):
-            if p.flags in [16,64]:
-                meshes.append(p)
-            else:
-                polylines.append(p)
-        else:
-            polylines.append(p)
+    polylines,meshes = getPolylines()
+    if fmt.batch: polylines = []
     if polylines:
         FreeCAD.Console.PrintMessage("drawing "+str(len(polylines))+" polylines...\n")
     num = 0
@@ -868,6 +1091,7 @@ def processdxf(document,filename):
     # drawing arcs
 
     arcs = drawing.entities.get_type("arc")
+    if fmt.batch: arcs = []
     if arcs: FreeCAD.Console.PrintMessage("drawing "+str(len(arcs))+" arcs...\n")
     for arc in arcs:
         if fmt.dxflayout or (not rawValue(arc,67)):
@@ -907,6 +1131,7 @@ def processdxf(document,filename):
     # drawing circles
 
     circles = drawing.entities.get_type("circle")
+    if fmt.batch: circles = []
     if circles: FreeCAD.Console.PrintMessage("drawing "+str(len(circles))+" circles...\n")
     for circle in circles:
         if fmt.dxflayout or (not rawValue(circle,67)):
@@ -930,6 +1155,7 @@ def processdxf(document,filename):
     # drawing solids
 
     solids = drawing.entities.get_type("solid")
+    if fmt.batch: solids = []
     if solids: FreeCAD.Console.PrintMessage("drawing "+str(len(circles))+" solids...\n")
     for solid in solids:
         lay = rawValue(solid,8)
@@ -945,6 +1171,7 @@ def processdxf(document,filename):
     # drawing splines
 
     splines = drawing.entities.get_type("spline")
+    if fmt.batch: splines = []
     if splines: FreeCAD.Console.PrintMessage("drawing "+str(len(splines))+" splines...\n")
     for spline in splines:
         lay = rawValue(spline,8)
@@ -1112,6 +1339,8 @@ def processdxf(document,filename):
     else: 
         FreeCAD.Console.PrintMessage("skipping hatches...\n")
 
+    t = lap("entities",t)
+
     # drawing blocks
     
     inserts = drawing.entities.get_type("insert")
@@ -1125,19 +1354,31 @@ def processdxf(document,filename):
         inserts = newinserts
     if inserts:
         FreeCAD.Console.PrintMessage("drawing "+str(len(inserts))+" blocks...\n")
-        blockrefs = drawing.blocks.data
-        for ref in blockrefs:
-            drawBlock(ref)
+        if fmt.paramtext:
+            # the texts of all block definitions are added before the inserts
+            for ref in drawing.blocks.get_type("block"):
+                drawBlock(ref)
         num = 0
         for insert in inserts:
             shape = drawInsert(insert,num)
             if shape:
-                if fmt.makeBlocks:
+                if fmt.batch:
+                    addToBatch("insert",shape,insert)
+                elif fmt.makeBlocks:
                     addToBlock(shape,insert.layer)
                 else:
                     newob = addObject(shape,"Block."+insert.block,insert.layer)
                     if gui: fmt.formatObject(newob,insert)
             num += 1
+    t = lap("blocks",t)
+
+    # adding batched shapes, if any
+
+    if batchGroups:
+        FreeCAD.Console.PrintMessage("adding "+str(len(batchGroups))+" batched objects...\n")
+        insertBatches()
+        t = lap("insertion",t)
+    del batchGroups
 
     # make blocks, if any
 
@@ -1154,11 +1395,16 @@ def processdxf(document,filename):
     print "done processing"
 
     doc.recompute()
+    t = lap("recompute",t)
     FreeCAD.Console.PrintMessage("successfully imported "+filename+"\n")
     if badobjects: print "dxf: ",len(badobjects)," objects were not imported"
+    FreeCAD.Console.PrintMessage("timings: "+", ".join(["%s %.2fs" % (n,d) for n,d in timings])+"\n")
     del fmt
     del doc
     del blockshapes
+    del blockdefs
+    del entityindex
+    del blockstack
 
 def warn(dxfobject,num=None):
     "outputs a warning if a dxf object couldn't be imported"
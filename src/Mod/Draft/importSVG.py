@@ -50,6 +50,10 @@ except: draftui = None
 if open.__module__ == '__builtin__':
   pythonopen = open
 
+# regular expressions are compiled once, not for each element
+pathdatare = re.compile('([mMlLhHvVaAcCqQsStTzZ])|([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)')
+transformre = re.compile('(matrix|translate|scale|rotate|skewX|skewY)\s*?\((.*?)\)',re.DOTALL)
+
 svgcolors = {
           'Pink': (255, 192, 203),
           'Blue': (0, 0, 255),
@@ -295,6 +299,97 @@ def makewire(path,checkclosed=False,donttry=False):
                         sh = comp.connectEdgesToWires(False,10**(-1*(Draft.precision()-2))).Wires[0]
         return sh
 
+def getPathData(d):
+        '''returns the commands of svg path data as a list of (command,numbers) tuples,
+        where numbers is the list of floats following the command'''
+        commands = []
+        numbers = None
+        for command,number in pathdatare.findall(d):
+                if command:
+                        numbers = []
+                        commands.append((command,numbers))
+                elif numbers is not None:
+                        numbers.append(float(number))
+        return commands
+
+def getPolygons(commands):
+        '''returns the subpaths of svg path commands as a list of (points,closed) tuples,
+        where points is a list of (x,y) tuples, with the y axis already flipped. Returns
+        None if the path contains curves'''
+        p = Draft.precision()
+        polygons = []
+        points = []
+        x = y = 0.0
+        fx = fy = 0.0
+        for d,numbers in commands:
+                c = d.upper()
+                relative = d.islower()
+                if c == 'M':
+                        if len(points) > 1:
+                                polygons.append((points,False))
+                        if len(numbers) < 2:
+                                return None
+                        if relative:
+                                x,y = x+numbers[0],y-numbers[1]
+                        else:
+                                x,y = numbers[0],-numbers[1]
+                        fx,fy = x,y
+                        points = [(x,y)]
+                        numbers = numbers[2:]
+                        c = 'L'
+                if c == 'L':
+                        for nx,ny in zip(numbers[0::2],numbers[1::2]):
+                                if relative:
+                                        nx,ny = x+nx,y-ny
+                                else:
+                                        ny = -ny
+                                if round(nx-x,p) or round(ny-y,p):
+                                        x,y = nx,ny
+                                        points.append((x,y))
+                elif c == 'H' or c == 'V':
+                        for n in numbers:
+                                nx,ny = x,y
+                                if c == 'H':
+                                        if relative: nx = x+n
+                                        else: nx = n
+                                else:
+                                        if relative: ny = y-n
+                                        else: ny = -n
+                                if round(nx-x,p) or round(ny-y,p):
+                                        x,y = nx,ny
+                                        points.append((x,y))
+                elif c == 'Z':
+                        if round(fx-x,p) or round(fy-y,p):
+                                points.append((fx,fy))
+                        if len(points) > 1:
+                                polygons.append((points,True))
+                        x,y = fx,fy
+                        points = [(x,y)]
+                else:
+                        return None
+        if len(points) > 1:
+                polygons.append((points,False))
+        return polygons
+
+def transformCopyShape(sh,m):
+        '''returns a transformed copy of the given shape. If the matrix is a similarity
+        (rotation, translation, uniform scale in the XY plane), the geometry is kept,
+        otherwise it is converted by transformGeometry'''
+        a,b,c,d = m.A11,m.A12,m.A21,m.A22
+        if abs(a*a+c*c-b*b-d*d) < 1e-8 and abs(a*b+c*d) < 1e-8 and \
+           not (m.A13 or m.A23 or m.A31 or m.A32):
+                s = math.sqrt(a*a+c*c)
+                if a*d-b*c < 0: s = -s
+                # the z scale is irrelevant to planar shapes, but must be uniform
+                ms = FreeCAD.Matrix(a,b,0,m.A14,c,d,0,m.A24,0,0,s,m.A34)
+                try:
+                        sh = sh.copy()
+                        sh.transformShape(ms)
+                        return sh
+                except:
+                        pass
+        return sh.transformGeometry(m)
+
 def arccenter2end(center,rx,ry,angle1,angledelta,xrotation=0.0):
         '''calculate start and end vector and flags of an arc given in center parametrization
         see http://www.w3.org/TR/SVG/implnote.html#ArcImplementationNotes
@@ -372,8 +467,10 @@ class svgHandler(xml.sax.ContentHandler):
 		params = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Draft")
 		self.style = params.GetInt("svgstyle")
                 self.count = 0
+                self.verbose = params.GetBool("svgVerbose")
                 self.transform = None
                 self.grouptransform = []
+                self.groupcache = ([],FreeCAD.Matrix())
                 self.lastdim = None
                 self.viewbox = None
 
@@ -407,11 +504,16 @@ class svgHandler(xml.sax.ContentHandler):
 
                 self.count += 1
 
-                FreeCAD.Console.PrintMessage('processing element %d: %s\n'%(self.count,name))
-                FreeCAD.Console.PrintMessage('existing group transform: %s\n'%(str(self.grouptransform)))
+                if self.verbose:
+                        FreeCAD.Console.PrintMessage('processing element %d: %s\n'%(self.count,name))
+                        FreeCAD.Console.PrintMessage('existing group transform: %s\n'%(str(self.grouptransform)))
 		
 		data = {}
 		for (keyword,content) in attrs.items():
+                        if keyword == 'd':
+                                # path data is tokenized later
+                                data[keyword]=[content]
+                                continue
 			content = content.replace(',',' ')
 			content = content.split()
 			data[keyword]=content
@@ -506,12 +608,12 @@ class svgHandler(xml.sax.ContentHandler):
                 pathname = None
                 if 'id' in data:
                         pathname = data['id'][0]
-                        FreeCAD.Console.PrintMessage('name: %s\n'%pathname)
+                        if self.verbose: FreeCAD.Console.PrintMessage('name: %s\n'%pathname)
                         
 		# processing paths
                         
 		if name == "path":
-                        FreeCAD.Console.PrintMessage('data: %s\n'%str(data))
+                        if self.verbose: FreeCAD.Console.PrintMessage('data: %s\n'%str(data))
                         
                         if not pathname: pathname = 'Path'
 
@@ -535,11 +637,21 @@ class svgHandler(xml.sax.ContentHandler):
                                 self.format(obj)
                                 self.lastdim = obj
                                 data['d']=[]
-                        pathcommandsre=re.compile('\s*?([mMlLhHvVaAcCqQsStTzZ])\s*?([^mMlLhHvVaAcCqQsStTzZ]*)\s*?',re.DOTALL)
-                        pointsre=re.compile('([-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?)',re.DOTALL)
-                        for d,pointsstr in pathcommandsre.findall(' '.join(data['d'])):
+                        commands = getPathData(' '.join(data['d']))
+                        polygons = getPolygons(commands)
+                        if polygons is not None:
+                                # only straight segments, wires are built at once
+                                for points,closed in polygons:
+                                        sh = Part.makePolygon([Vector(x,y,0) for x,y in points])
+                                        if self.fill and (closed or sh.isClosed()):
+                                                sh = Part.Face(sh)
+                                        sh = self.applyTrans(sh)
+                                        obj = self.doc.addObject("Part::Feature",pathname)
+                                        obj.Shape = sh
+                                        self.format(obj)
+                                commands = []
+                        for d,pointlist in commands:
                                 relative = d.islower()
-                                pointlist = [float(number) for number,exponent in pointsre.findall(pointsstr.replace(',',' '))]
 
                                 if (d == "M" or d == "m"):
                                         x = pointlist.pop(0)
@@ -561,7 +673,7 @@ class svgHandler(xml.sax.ContentHandler):
                                         else:
                                                 lastvec = Vector(x,-y,0)
                                         firstvec = lastvec
-                                        FreeCAD.Console.PrintMessage('move %s\n'%str(lastvec))
+                                        if self.verbose: FreeCAD.Console.PrintMessage('move %s\n'%str(lastvec))
                                         lastpole = None
                                 if (d == "L" or d == "l") or \
                                         ((d == 'm' or d == 'M') and pointlist) :
@@ -572,7 +684,7 @@ class svgHandler(xml.sax.ContentHandler):
                                                         currentvec = Vector(x,-y,0)
                                                 if not DraftVecUtils.equals(lastvec,currentvec):
                                                         seg = Part.Line(lastvec,currentvec).toShape()
-                                                        FreeCAD.Console.PrintMessage("line %s %s\n" %(lastvec,currentvec))
+                                                        if self.verbose: FreeCAD.Console.PrintMessage("line %s %s\n" %(lastvec,currentvec))
                                                         lastvec = currentvec
                                                         path.append(seg)
                                                 lastpole = None
@@ -863,7 +975,7 @@ class svgHandler(xml.sax.ContentHandler):
 			but there would be more difficlult to search for duplicate points beforehand.'''
 			if not pathname: pathname = 'Polyline'
 			points=[float(d) for d in data['points']]
-                        FreeCAD.Console.PrintMessage('points %s\n'%str(points))
+                        if self.verbose: FreeCAD.Console.PrintMessage('points %s\n'%str(points))
 			lenpoints=len(points)
 			if lenpoints>=4 and lenpoints % 2 == 0:
 				lastvec = Vector(points[0],-points[1],0)
@@ -932,7 +1044,7 @@ class svgHandler(xml.sax.ContentHandler):
 
 		if name in ["text","tspan"]:
                         if not("freecad:skip" in data):
-                                FreeCAD.Console.PrintMessage("processing a text\n")
+                                if self.verbose: FreeCAD.Console.PrintMessage("processing a text\n")
                                 if 'x' in data:
                                         self.x = data['x']
                                 else:
@@ -950,11 +1062,11 @@ class svgHandler(xml.sax.ContentHandler):
                                 if self.lastdim:
                                         self.lastdim.ViewObject.FontSize = int(getsize(data['font-size']))
 
-                FreeCAD.Console.PrintMessage("done processing element %d\n"%self.count)
+                if self.verbose: FreeCAD.Console.PrintMessage("done processing element %d\n"%self.count)
                 
 	def characters(self,content):
 		if self.text:
-                        FreeCAD.Console.PrintMessage("reading characters %s\n" % str(content))
+                        if self.verbose: FreeCAD.Console.PrintMessage("reading characters %s\n" % str(content))
 			obj=self.doc.addObject("App::Annotation",'Text')
 			obj.LabelText = content.encode('latin1')
 			vec = Vector(self.x,-self.y,0)
@@ -976,28 +1088,34 @@ class svgHandler(xml.sax.ContentHandler):
                         self.transform = None
                         self.text = None
                 if name == "g" or name == "svg":
-                        FreeCAD.Console.PrintMessage("closing group\n")
+                        if self.verbose: FreeCAD.Console.PrintMessage("closing group\n")
                         self.grouptransform.pop()
 
+        def getTransform(self):
+                "returns the group and object transforms composed in a single matrix"
+                if self.groupcache[0] != self.grouptransform:
+                        # the groups transform is only composed again when groups change
+                        m = FreeCAD.Matrix()
+                        for transform in self.grouptransform:
+                                m = m.multiply(transform)
+                        self.groupcache = (list(self.grouptransform),m)
+                m = self.groupcache[1]
+                if self.transform:
+                        m = m.multiply(self.transform)
+                if self.verbose: FreeCAD.Console.PrintMessage("applying transform: %s\n" % m)
+                return m
+
         def applyTrans(self,sh):
                 if isinstance(sh,Part.Shape):
-                        if self.transform:
-                                FreeCAD.Console.PrintMessage("applying object transform: %s\n" % self.transform)
-                                sh = sh.transformGeometry(self.transform)
-                        for transform in self.grouptransform[::-1]:
-                                FreeCAD.Console.PrintMessage("applying group transform: %s\n" % transform)
-                                sh = sh.transformGeometry(transform)
-                        return sh
+                        m = self.getTransform()
+                        if m == FreeCAD.Matrix():
+                                return sh
+                        return transformCopyShape(sh,m)
                 elif Draft.getType(sh) == "Dimension":
                         pts = []
+                        m = self.getTransform()
                         for p in [sh.Start,sh.End,sh.Dimline]:
-                                cp = Vector(p)
-                                if self.transform:
-                                        FreeCAD.Console.PrintMessage("applying object transform: %s\n" % self.transform)
-                                        cp = self.transform.multiply(cp)
-                                for transform in self.grouptransform[::-1]:
-                                        FreeCAD.Console.PrintMessage("applying group transform: %s\n" % transform)
-                                        cp = transform.multiply(cp)
+                                cp = m.multiply(Vector(p))
                                 pts.append(cp)
                         sh.Start = pts[0]
                         sh.End = pts[1]
@@ -1009,7 +1127,6 @@ class svgHandler(xml.sax.ContentHandler):
 
         def getMatrix(self,tr):
                 "returns a FreeCAD matrix from a svg transform attribute"
-		transformre=re.compile('(matrix|translate|scale|rotate|skewX|skewY)\s*?\((.*?)\)',re.DOTALL)
                 m = FreeCAD.Matrix()
                 for transformation, arguments in transformre.findall(tr):
 			argsplit=[float(arg) for arg in arguments.replace(',',' ').split()]
@@ -0,0 +1,185 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import FreeCAD, os, tempfile, unittest
+from FreeCAD import Vector
+import importCSG
+
+#---------------------------------------------------------------------------
+# fixtures
+#---------------------------------------------------------------------------
+
+# nested unions and intersections. The inner union is placed by a rotation
+# and a translation, and its sphere by a chain of two translations
+NESTED = """group() {
+	union() {
+		cube(size = [1, 1, 1], center = false);
+		multmatrix([[0, -1, 0, 5], [1, 0, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]) {
+			union() {
+				cube(size = [1, 1, 1], center = false);
+				multmatrix([[1, 0, 0, 0], [0, 1, 0, 3], [0, 0, 1, 0], [0, 0, 0, 1]]) {
+					multmatrix([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 2], [0, 0, 0, 1]]) {
+						sphere($fn = 0, $fa = 12, $fs = 2, r = 1);
+					}
+				}
+			}
+		}
+		cube(size = [1, 1, 1], center = false);
+	}
+	intersection() {
+		cube(size = [4, 4, 4], center = true);
+		intersection() {
+			sphere($fn = 0, $fa = 12, $fs = 2, r = 2.5);
+			cylinder($fn = 0, $fa = 12, $fs = 2, h = 10, r1 = 1.5, r2 = 1.5, center = true);
+		}
+	}
+}
+"""
+
+# a difference whose tools contain a union and the same cylinder twice
+DIFFERENCE = """difference() {
+	cube(size = [4, 4, 4], center = true);
+	cylinder($fn = 0, $fa = 12, $fs = 2, h = 10, r1 = 1, r2 = 1, center = true);
+	union() {
+		multmatrix([[1, 0, 0, 1.5], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]) {
+			cube(size = [1, 1, 1], center = true);
+		}
+		cylinder($fn = 0, $fa = 12, $fs = 2, h = 10, r1 = 1, r2 = 1, center = true);
+	}
+}
+"""
+
+CSGPARAMS = ("useFlatBooleans","useSingleShape")
+
+def samePlacement(pl1,pl2):
+    "tells if two placements are equal, up to rounding errors"
+    q1 = pl1.Rotation.Q
+    q2 = pl2.Rotation.Q
+    # opposite quaternions are the same rotation
+    sign = 1
+    if sum([a*b for a,b in zip(q1,q2)]) < 0:
+        sign = -1
+    return (pl1.Base.sub(pl2.Base).Length < 1e-7) and \
+        max([abs(a-sign*b) for a,b in zip(q1,q2)]) < 1e-7
+
+def topObjects(doc):
+    "the objects of a document that are not used by another one"
+    return [obj for obj in doc.Objects if not obj.InList]
+
+def typesOf(doc):
+    "the number of objects of each type in a document"
+    types = {}
+    for obj in doc.Objects:
+        types[obj.TypeId] = types.get(obj.TypeId,0) + 1
+    return types
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD OpenSCAD module
+#---------------------------------------------------------------------------
+
+class CsgImportTestCases(unittest.TestCase):
+
+    def setUp(self):
+        f,self.path = tempfile.mkstemp(suffix=".csg")
+        os.close(f)
+        self.params = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/OpenSCAD")
+        self.saved = [(name,self.params.GetBool(name)) for name in CSGPARAMS]
+        self.docs = []
+
+    def tearDown(self):
+        for name,value in self.saved:
+            self.params.SetBool(name,value)
+        for doc in self.docs:
+            FreeCAD.closeDocument(doc.Name)
+        os.remove(self.path)
+
+    def load(self,data,flat,single=False):
+        "imports the given csg text in a new document"
+        f = open(self.path,"wb")
+        f.write(data)
+        f.close()
+        self.params.SetBool("useFlatBooleans",flat)
+        self.params.SetBool("useSingleShape",single)
+        doc = importCSG.open(self.path)
+        self.docs.append(doc)
+        return doc
+
+    def checkSameShape(self,doc1,doc2):
+        "checks that the two documents have a single result of the same shape"
+        top1 = topObjects(doc1)
+        top2 = topObjects(doc2)
+        self.assertEqual(len(top1),1)
+        self.assertEqual(len(top2),1)
+        shape1 = top1[0].Shape
+        shape2 = top2[0].Shape
+        self.failUnless(shape1.isValid())
+        self.assertAlmostEqual(shape1.Volume,shape2.Volume,3)
+        b1 = shape1.BoundBox
+        b2 = shape2.BoundBox
+        for v1,v2 in ((b1.XMin,b2.XMin),(b1.YMin,b2.YMin),(b1.ZMin,b2.ZMin),
+                      (b1.XMax,b2.XMax),(b1.YMax,b2.YMax),(b1.ZMax,b2.ZMax)):
+            self.assertAlmostEqual(v1,v2,3)
+
+    def testNestedBooleans(self):
+        doc = self.load(NESTED,True)
+        # the unions and intersections are merged, and the first and last
+        # cubes are the same object
+        self.assertEqual(typesOf(doc),{"Part::Box":3,"Part::Sphere":2,"Part::Cylinder":1,
+                                       "Part::MultiCommon":1,"Part::MultiFuse":1})
+        union = topObjects(doc)[0]
+        self.assertEqual(union.TypeId,"Part::MultiFuse")
+        common = [obj for obj in union.Shapes if obj.TypeId == "Part::MultiCommon"][0]
+        self.assertEqual(len(union.Shapes),4)
+        self.assertEqual(sorted([obj.TypeId for obj in common.Shapes]),
+                         ["Part::Box","Part::Cylinder","Part::Sphere"])
+        self.checkSameShape(doc,self.load(NESTED,False))
+
+    def testPlacedUnion(self):
+        doc = self.load(NESTED,True)
+        # the placement of the inner union is moved to its operands, after
+        # their own placement
+        pl = FreeCAD.Placement(Vector(5,0,0),FreeCAD.Rotation(Vector(0,0,1),90))
+        boxes = [obj for obj in doc.Objects if obj.TypeId == "Part::Box" and obj.Length == 1]
+        self.assertEqual(len(boxes),2)
+        self.assertEqual(len([obj for obj in boxes if samePlacement(obj.Placement,pl)]),1)
+        self.assertEqual(len([obj for obj in boxes if obj.Placement.isNull()]),1)
+        sphere = [obj for obj in doc.Objects if obj.TypeId == "Part::Sphere" and obj.Radius == 1][0]
+        # the multmatrix chain of the sphere is a single placement
+        inner = FreeCAD.Placement(Vector(0,3,2),FreeCAD.Rotation())
+        self.failUnless(samePlacement(sphere.Placement,pl.multiply(inner)))
+        self.failUnless(sphere.Placement.Base.sub(Vector(2,0,2)).Length < 1e-7)
+
+    def testDifference(self):
+        doc = self.load(DIFFERENCE,True)
+        # the repeated cylinder is only created and used once
+        self.assertEqual(typesOf(doc),{"Part::Box":2,"Part::Cylinder":1,"Part::Fuse":1,"Part::Cut":1})
+        cut = topObjects(doc)[0]
+        self.assertEqual(cut.TypeId,"Part::Cut")
+        self.assertEqual(cut.Base.TypeId,"Part::Box")
+        self.assertEqual(sorted([cut.Tool.Base.TypeId,cut.Tool.Tool.TypeId]),["Part::Box","Part::Cylinder"])
+        self.checkSameShape(doc,self.load(DIFFERENCE,False))
+
+    def testSingleShape(self):
+        for data in (NESTED,DIFFERENCE):
+            doc = self.load(data,False,True)
+            self.assertEqual([(obj.Name,obj.TypeId) for obj in doc.Objects],[("CSG","Part::Feature")])
+            self.checkSameShape(doc,self.load(data,False))
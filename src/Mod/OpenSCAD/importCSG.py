@@ -31,7 +31,7 @@ __title__="FreeCAD OpenSCAD Workbench - CSG importer Version 0.05d"
 __author__ = "Keith Sloan <keith@sloan-home.co.uk>"
 __url__ = ["http://www.sloan-home.co.uk/ImportCSG"]
 
-import FreeCAD, os, sys
+import FreeCAD, os, sys, mmap
 if FreeCAD.GuiUp:
     import FreeCADGui
     gui = True
@@ -59,6 +59,24 @@ from tokrules import tokens
 
 #Globals
 dxfcache = {}
+flatbooleans = False
+singleshape = False
+csgprimitives = {} # objects or shapes of the primitives of the current import, by geometry
+lexer = None
+parser = None
+
+def getParser():
+    '''returns the csg lexer and parser. They are built only once per
+    session, and the parser tables are pickled into the user data directory,
+    so they are generated again only when the grammar has changed. The table
+    file is read by its path, so sys.path is left untouched'''
+    global lexer, parser
+    if parser is None:
+        tabfile = os.path.join(FreeCAD.ConfigGet("UserAppData"),"csgparsetab.pickle")
+        lexer = lex.lex(module=tokrules)
+        # No debug out otherwise Linux has protection exception
+        parser = yacc.yacc(debug=0,picklefile=tabfile)
+    return lexer,parser
 def translate(context,text):
     "convenience function for Qt translator"
     from PyQt4 import QtGui
@@ -104,29 +122,43 @@ def insert(filename,docname):
 
 def processcsg(filename):
     global doc
+    global flatbooleans
+    global singleshape
+    global csgprimitives
     
     print 'ImportCSG Version 0.5d'
-    # Build the lexer
-    print 'Start Lex'
-    lex.lex(module=tokrules)
-    print 'End Lex'
-
-    # Build the parser   
-    print 'Load Parser'
-    # No debug out otherwise Linux has protection exception
-    parser = yacc.yacc(debug=0)
-    print 'Parser Loaded'
-    # Give the lexer some input
-    #f=open('test.scad', 'r')
+    params = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/OpenSCAD")
+    singleshape = params.GetBool('useSingleShape')
+    flatbooleans = singleshape or params.GetBool('useFlatBooleans')
+    csgprimitives = {}
+    lexer,parser = getParser()
+    lexer.lineno = 1
     f = pythonopen(filename, 'r')
-    #lexer.input(f.read())
+    # the lexer works directly on the mapped file instead of a copy of
+    # its contents. Empty files can't be mapped, so they are read
+    try:
+        data = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    except (ValueError,EnvironmentError):
+        data = f.read()
 
     print 'Start Parser'
-    # Swap statements to enable Parser debugging
-    #result = parser.parse(f.read(),debug=1)
-    result = parser.parse(f.read())
+    try:
+        # Swap statements to enable Parser debugging
+        #result = parser.parse(data,lexer=lexer,debug=1)
+        result = parser.parse(data,lexer=lexer)
+    finally:
+        if isinstance(data,mmap.mmap):
+            data.close()
+        f.close()
     print 'End Parser'
-    print result  
+    if flatbooleans and result:
+        # the csg tree is turned into document objects, or a shape, at once
+        if singleshape:
+            makeSingleShape(result)
+        else:
+            for item in result:
+                emit(item)
+    csgprimitives = {}
     FreeCAD.Console.PrintMessage('End processing CSG file')
     doc.recompute()
 
@@ -369,8 +401,11 @@ def p_color_action(p):
     transp = 100 - int(math.floor(100*float(p[3][3]))) #Alpha
     if gui:
         for obj in p[6]:
-            obj.ViewObject.ShapeColor =color
-            obj.ViewObject.Transparency = transp
+            if isinstance(obj,CsgNode):
+                obj.color = (color,transp)
+            else:
+                obj.ViewObject.ShapeColor =color
+                obj.ViewObject.Transparency = transp
     p[0] = p[6]
 
 # Error rule for syntax errors
@@ -378,10 +413,176 @@ def p_error(p):
     print "Syntax error in input!"
     print p    
 
+class CsgNode:
+    '''A node of the csg tree built when the useFlatBooleans preference is
+    set, and turned into document objects, or a single shape, at the end of
+    the import. A boolean node ('fuse', 'common' or 'cut') has a list of
+    operands, which are nodes or document objects. A primitive node has the
+    type and the (property,value) pairs of the document object it stands
+    for. Like a document object, a node has a Placement, the combined
+    placement of all the multmatrix around it'''
+    def __init__(self,kind,name,operands=None,props=None):
+        self.kind = kind
+        self.name = name
+        self.operands = operands
+        self.props = props
+        self.Placement = FreeCAD.Placement()
+        self.color = None
+
+def primitive(doctype,name,props):
+    '''returns a new document object of the given type, with the given
+    (property,value) pairs, or the primitive node standing for it when the
+    csg tree is built first'''
+    if flatbooleans:
+        return CsgNode(doctype,name,props=props)
+    obj = doc.addObject(doctype,name)
+    for prop,value in props:
+        setattr(obj,prop,value)
+    return obj
+
+def pushPlacement(node):
+    "moves the placement of a boolean node down to its operands"
+    pl = node.Placement
+    if not pl.isNull():
+        for subobj in node.operands:
+            subobj.Placement = pl.multiply(subobj.Placement)
+        node.Placement = FreeCAD.Placement()
+
+def flatten(lst,kind):
+    '''returns the operands of a new boolean node of the given kind: the
+    uncolored nodes of the same kind among the given items are replaced by
+    their operands, which take their placement'''
+    result = []
+    for item in lst:
+        if isinstance(item,CsgNode) and (item.kind == kind) and (item.color is None):
+            pushPlacement(item)
+            result.extend(item.operands)
+        else:
+            result.append(item)
+    return result
+
+def unique(lst):
+    "returns the given list without the items it already contains"
+    result = []
+    ids = set()
+    for item in lst:
+        if not id(item) in ids:
+            ids.add(id(item))
+            result.append(item)
+    return result
+
+def primitiveKey(node):
+    '''returns a key identifying the geometry of a primitive node, or None
+    if the node holds a shape'''
+    if node.kind == 'Part::Feature':
+        return None
+    pl = node.Placement
+    return (node.kind,tuple(node.props),(pl.Base.x,pl.Base.y,pl.Base.z),pl.Rotation.Q)
+
+def emit(item):
+    '''returns the document object of an item of the csg tree, creating the
+    objects of a node and of its operands. Identical primitives share the
+    same object, and are only used once by each operation'''
+    if not isinstance(item,CsgNode):
+        return item
+    if item.operands is None:
+        key = primitiveKey(item)
+        obj = csgprimitives.get(key)
+        if obj is None:
+            obj = doc.addObject(item.kind,item.name)
+            for prop,value in item.props:
+                setattr(obj,prop,value)
+            obj.Placement = item.Placement
+            if key is not None:
+                csgprimitives[key] = obj
+    else:
+        pushPlacement(item)
+        operands = [emit(subobj) for subobj in item.operands]
+        if item.kind == 'cut':
+            obj = doc.addObject('Part::Cut',item.name)
+            obj.Base = operands[0]
+            obj.Tool = operands[1]
+        else:
+            operands = unique(operands)
+            if len(operands) == 1:
+                return operands[0]
+            elif len(operands) > 2:
+                obj = doc.addObject({'fuse':'Part::MultiFuse','common':'Part::MultiCommon'}[item.kind],item.name)
+                obj.Shapes = operands
+            else:
+                obj = doc.addObject({'fuse':'Part::Fuse','common':'Part::Common'}[item.kind],item.name)
+                obj.Base = operands[0]
+                obj.Tool = operands[1]
+        if gui:
+            for subobj in operands:
+                subobj.ViewObject.hide()
+    if gui and item.color:
+        obj.ViewObject.ShapeColor,obj.ViewObject.Transparency = item.color
+    return obj
+
+def primitiveShape(node):
+    "returns the shape of a primitive node, without its placement"
+    props = dict(node.props)
+    if node.kind == 'Part::Box':
+        return Part.makeBox(props['Length'],props['Width'],props['Height'])
+    elif node.kind == 'Part::Sphere':
+        return Part.makeSphere(props['Radius'])
+    elif node.kind == 'Part::Cylinder':
+        return Part.makeCylinder(props['Radius'],props['Height'])
+    elif node.kind == 'Part::Cone':
+        return Part.makeCone(props['Radius1'],props['Radius2'],props['Height'])
+    elif node.kind == 'Part::Plane':
+        return Part.makePlane(props['Length'],props['Width'])
+    return props['Shape']
+
+def getShape(item):
+    '''returns the shape of an item of the csg tree. Identical primitives
+    share the same shape, and are only used once by each operation. The
+    document objects of the tree are hidden'''
+    if not isinstance(item,CsgNode):
+        if gui:
+            item.ViewObject.hide()
+        return item.Shape
+    if item.operands is None:
+        key = primitiveKey(item)
+        shape = csgprimitives.get(key)
+        if shape is None:
+            shape = primitiveShape(item)
+            shape.Placement = item.Placement
+            if key is not None:
+                csgprimitives[key] = shape
+        return shape
+    pushPlacement(item)
+    shapes = [getShape(subobj) for subobj in item.operands]
+    if item.kind == 'cut':
+        return shapes[0].cut(shapes[1])
+    shapes = unique(shapes)
+    shape = shapes[0]
+    for other in shapes[1:]:
+        if item.kind == 'fuse':
+            shape = shape.fuse(other)
+        else:
+            shape = shape.common(other)
+    return shape
+
+def makeSingleShape(lst):
+    '''adds a single object to the document, with the union of the shapes
+    of the given items of the csg tree'''
+    # the objects used by the tree need their shapes
+    doc.recompute()
+    obj = doc.addObject('Part::Feature','CSG')
+    obj.Shape = getShape(fuse(lst,'CSG'))
+    return obj
+
 def fuse(lst,name):
     global doc
     print "Fuse"
     print lst
+    if flatbooleans:
+        lst = flatten(lst,'fuse')
+        if len(lst) == 1:
+            return lst[0]
+        return CsgNode('fuse',name,operands=lst)
     if len(lst) == 1:
        return lst[0]
     # Is this Multi Fuse
@@ -418,6 +619,8 @@ def p_difference_action(p):
     print p[5]
     if (len(p[5]) == 1 ): #single object
         p[0] = p[5]
+    elif flatbooleans:
+        p[0] = [CsgNode('cut',p[1],operands=[p[5][0],fuse(p[5][1:],'union')])]
     else:
 # Cut using Fuse    
         mycut = doc.addObject('Part::Cut',p[1])
@@ -439,8 +642,14 @@ def p_intersection_action(p):
     'intersection_action : intersection LPAREN RPAREN OBRACE block_list EBRACE'
 
     print "intersection"
+    if flatbooleans:
+        shapes = flatten(p[5],'common')
+        if len(shapes) == 1:
+            mycommon = shapes[0]
+        else:
+            mycommon = CsgNode('common',p[1],operands=shapes)
     # Is this Multi Common
-    if (len(p[5]) > 2):
+    elif (len(p[5]) > 2):
        print "Multi Common"
        mycommon = doc.addObject('Part::MultiCommon',p[1])
        mycommon.Shapes = p[5]
@@ -487,7 +696,7 @@ def p_rotate_extrude_action(p):
         part = fuse(p[6],"Rotate Extrude Union")
     else :
         part = p[6][0]
-    p[0] = [process_rotate_extrude(part)]
+    p[0] = [process_rotate_extrude(emit(part))]
     print "End Rotate Extrude"
 
 def p_rotate_extrude_file(p):
@@ -548,12 +757,13 @@ def p_linear_extrude_with_twist(p):
         obj = fuse(p[6],"Linear Extrude Union")
     else :
         obj = p[6][0]
+    if p[3]['center']=='true' :
+       center(obj,0,0,h)
+    obj = emit(obj)
     if t:
         p[0] = [process_linear_extrude_with_twist(obj,h,t)]
     else:
         p[0] = [process_linear_extrude(obj,h)]
-    if p[3]['center']=='true' :
-       center(obj,0,0,h)
     print "End Linear Extrude with twist"
 
 def p_import_file1(p):
@@ -686,6 +896,7 @@ def p_multmatrix_action(p):
        new_part = part
     elif FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/OpenSCAD").\
         GetBool('useMultmatrixFeature'):
+        part = emit(part)
         from OpenSCADFeatures import MatrixTransform
         new_part=doc.addObject("Part::FeaturePython",'Matrix Deformation')
         MatrixTransform(new_part,transform_matrix,part)
@@ -699,6 +910,7 @@ def p_multmatrix_action(p):
             part.ViewObject.hide()
     else :
         print "Transform Geometry"
+        part = emit(part)
 #       Need to recompute to stop transformGeometry causing a crash        
         doc.recompute()
         new_part = doc.addObject("Part::Feature","Matrix Deformation")
@@ -737,8 +949,7 @@ def p_sphere_action(p):
     'sphere_action : sphere LPAREN keywordargument_list RPAREN SEMICOL'
     print "Sphere : ",p[3]
     r = float(p[3]['r'])
-    mysphere = doc.addObject("Part::Sphere",p[1])
-    mysphere.Radius = r
+    mysphere = primitive("Part::Sphere",p[1],[('Radius',r)])
     print "Push Sphere"
     p[0] = [mysphere]
     print "End Sphere"
@@ -774,9 +985,7 @@ def p_cylinder_action(p):
             "User parameter:BaseApp/Preferences/Mod/OpenSCAD").\
             GetInt('useMaxFN')
         if n < 3 or fnmax != 0 and n >= fnmax:
-            mycyl=doc.addObject("Part::Cylinder",p[1])
-            mycyl.Height = h
-            mycyl.Radius = r1
+            mycyl = primitive("Part::Cylinder",p[1],[('Height',h),('Radius',r1)])
         else :
             print "Make Prism"
             mycyl=doc.addObject("Part::Extrusion","prism")
@@ -799,10 +1008,7 @@ def p_cylinder_action(p):
 
     else:
         print "Make Cone"
-        mycyl=doc.addObject("Part::Cone",p[1])
-        mycyl.Height = h
-        mycyl.Radius1 = r1
-        mycyl.Radius2 = r2
+        mycyl = primitive("Part::Cone",p[1],[('Height',h),('Radius1',r1),('Radius2',r2)])
     print "Center = ",tocenter
     if tocenter=='true' :
        center(mycyl,0,0,h)
@@ -828,10 +1034,7 @@ def p_cube_action(p):
     global doc
     l,w,h = [float(str1) for str1 in p[3]['size']]
     print "cube : ",p[3]
-    mycube=doc.addObject('Part::Box',p[1])
-    mycube.Length=l
-    mycube.Width=w
-    mycube.Height=h
+    mycube = primitive('Part::Box',p[1],[('Length',l),('Width',w),('Height',h)])
     if p[3]['center']=='true' :
        center(mycube,l,w,h);
     p[0] = [mycube]
@@ -863,9 +1066,7 @@ def p_square_action(p) :
     size = p[3]['size']
     x = float(size[0])
     y = float(size[1])
-    mysquare = doc.addObject('Part::Plane',p[1])
-    mysquare.Length=x
-    mysquare.Width=y
+    mysquare = primitive('Part::Plane',p[1],[('Length',x),('Width',y)])
     if p[3]['center']=='true' :
        center(mysquare,x,y,0)
     p[0] = [mysquare]
@@ -884,13 +1085,12 @@ def p_polygon_action_nopath(p) :
     print "Polygon"
     print p[6]
     v = convert_points_list_to_vector(p[6])
-    mypolygon = doc.addObject('Part::Feature',p[1])
     print "Make Parts"
     # Close Polygon
     v.append(v[0])
     parts = Part.makePolygon(v)
     print "update object"
-    mypolygon.Shape = Part.Face(parts)
+    mypolygon = primitive('Part::Feature',p[1],[('Shape',Part.Face(parts))])
     p[0] = [mypolygon]
 
 def p_polygon_action_plus_path(p) :
@@ -902,7 +1102,6 @@ def p_polygon_action_plus_path(p) :
     print p[12]
     for i in p[12] :
          print i
-         mypolygon = doc.addObject('Part::Feature','wire')
          path_list = []
          for j in i :
              j = int(j)
@@ -913,7 +1112,7 @@ def p_polygon_action_plus_path(p) :
          print 'Path List'
          print path_list
          wire = Part.makePolygon(path_list)
-         mypolygon.Shape = Part.Face(wire)
+         mypolygon = primitive('Part::Feature','wire',[('Shape',Part.Face(wire))])
          p[0] = [mypolygon]
 #        This only pushes last polygon
 
@@ -933,7 +1132,6 @@ def p_polyhedron_action(p) :
     print "Polyhedron triangles"
     print p[12]
     faces_list = []    
-    mypolyhed = doc.addObject('Part::Feature',p[1])
     for i in p[12] :
         print i
         f = make_face(v[int(i[0])],v[int(i[1])],v[int(i[2])])
@@ -942,7 +1140,7 @@ def p_polyhedron_action(p) :
     solid=Part.Solid(shell).removeSplitter()
     if solid.Volume < 0:
         solid.reverse()
-    mypolyhed.Shape=solid
+    mypolyhed = primitive('Part::Feature',p[1],[('Shape',solid)])
     p[0] = [mypolyhed]
 
 def p_projection_action(p) :
@@ -0,0 +1,180 @@
+#***************************************************************************
+#*																		 *
+#*   Copyright (c) 2011, 2012											  *  
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>							*  
+#*																		 *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)	*
+#*   as published by the Free Software Foundation; either version 2 of	 *
+#*   the License, or (at your option) any later version.				   *
+#*   for detail see the LICENCE text file.								 *
+#*																		 *
+#*   This program is distributed in the hope that it will be useful,	   *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of		*
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the		 *
+#*   GNU Library General Public License for more details.				  *
+#*																		 *
+#*   You should have received a copy of the GNU Library General Public	 *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA																   *
+#*																		 *
+#***************************************************************************
+
+# numpy
+import numpy as np
+
+# FreeCAD
+from FreeCAD import Vector
+
+grav = 9.81
+
+class Face:
+	def __init__(self, pos, normal, area):
+		""" Free surface face view, compatible with the faces matrix 
+		returned by SimInstance.FSMesh.
+		@param pos Face position.
+		@param normal Face normal.
+		@param area Element area
+		"""
+		self.pos	= pos
+		self.normal = normal
+		self.area   = area
+
+class FreeSurface:
+	def __init__(self, nx, ny, pos=None, normal=None, area=None):
+		""" Free surface mesh, kept as double precision numpy arrays, so
+		it is saved in the simulation instance without any loss. It can
+		be used as a faces matrix too (FS[i][j].pos, FS[i][j].normal and 
+		FS[i][j].area).
+		@param nx Number of elements at x direction.
+		@param ny Number of elements at y direction.
+		@param pos Elements position, as a (nx,ny,3) array.
+		@param normal Elements normal, as a (nx,ny,3) array.
+		@param area Elements area, as a (nx,ny) array.
+		"""
+		self.nx	 = nx
+		self.ny	 = ny
+		self.pos	= np.zeros((nx,ny,3), dtype=np.float64)
+		self.normal = np.zeros((nx,ny,3), dtype=np.float64)
+		self.area   = np.zeros((nx,ny), dtype=np.float64)
+		self.normal[:,:,2] = 1.0
+		if pos is not None:
+			self.pos[...] = np.reshape(pos, (nx,ny,3))
+		if normal is not None:
+			self.normal[...] = np.reshape(normal, (nx,ny,3))
+		if area is not None:
+			self.area[...] = np.reshape(area, (nx,ny))
+
+	@staticmethod
+	def plane(L, B, N):
+		""" Create a plane free surface mesh, centered at the origin.
+		@param L Length (x).
+		@param B Beam (y).
+		@param N Desired number of points.
+		@return Free surface mesh.
+		"""
+		area = L*B/N
+		l	= np.sqrt(area)
+		b	= np.sqrt(area)
+		nx   = int(round(L / l))
+		ny   = int(round(B / b))
+		fs   = FreeSurface(nx, ny)
+		x	= -0.5*L + (np.arange(nx) + 0.5)*l
+		y	= -0.5*B + (np.arange(ny) + 0.5)*b
+		fs.pos[:,:,0] = x[:,np.newaxis]
+		fs.pos[:,:,1] = y[np.newaxis,:]
+		fs.area[...]  = l*b
+		return fs
+
+	@staticmethod
+	def fromObject(obj):
+		""" Load the free surface mesh of a simulation instance.
+		@param obj Ship simulation instance.
+		@return Free surface mesh.
+		"""
+		pos	= [(p.x, p.y, p.z) for p in obj.FS_Position]
+		normal = [(n.x, n.y, n.z) for n in obj.FS_Normal]
+		return FreeSurface(obj.FS_Nx, obj.FS_Ny, pos, normal, obj.FS_Area)
+
+	def toObject(self, obj):
+		""" Store the free surface mesh in a simulation instance.
+		@param obj Ship simulation instance.
+		"""
+		obj.FS_Nx	   = self.nx
+		obj.FS_Ny	   = self.ny
+		obj.FS_Position = [Vector(*p) for p in self.pos.reshape(-1,3).tolist()]
+		obj.FS_Normal   = [Vector(*n) for n in self.normal.reshape(-1,3).tolist()]
+		obj.FS_Area	 = self.area.reshape(-1).tolist()
+
+	def addWaves(self, waves, t=0.0):
+		""" Add waves effect to free surface mesh positions.
+		@param waves waves data [A,T,phase, heading].
+		@param t Time.
+		"""
+		if not len(waves):
+			return
+		w	   = np.array(waves, dtype=np.float64)
+		A	   = w[:,0]
+		T	   = w[:,1]
+		phase   = w[:,2]
+		heading = np.pi*w[:,3]/180.0
+		wl	  = 0.5 * grav / np.pi * T*T
+		k	   = 2.0*np.pi/wl
+		frec	= 2.0*np.pi/T
+		l	   = self.pos[:,:,0,np.newaxis]*np.cos(heading) + \
+				  self.pos[:,:,1,np.newaxis]*np.sin(heading)
+		amp	 = np.sum(A*np.sin(k*l - frec*t + phase), axis=2)
+		self.pos[:,:,2] = self.pos[:,:,2] + amp
+
+	def computeNormals(self):
+		""" Recompute normals and areas from the elements position, 
+		using centered differences (one sided at the mesh bounds).
+		"""
+		nx = self.nx
+		ny = self.ny
+		def neighbours(n):
+			i0 = np.maximum(np.arange(n) - 1, 0)
+			i1 = np.minimum(np.arange(n) + 1, n - 1)
+			f  = np.ones(n)
+			f[0]  = 2.0
+			f[-1] = 2.0
+			return i0, i1, f
+		i0, i1, fi = neighbours(nx)
+		j0, j1, fj = neighbours(ny)
+		xvec = self.pos[i1,:,:] - self.pos[i0,:,:]
+		yvec = self.pos[:,j1,:] - self.pos[:,j0,:]
+		# Distance between elements
+		l = 0.5*fi[:,np.newaxis]*xvec[:,:,0]
+		b = 0.5*fj[np.newaxis,:]*yvec[:,:,1]
+		n = np.cross(xvec, yvec)	# Z positive
+		n = n / np.sqrt(np.sum(n*n, axis=2))[:,:,np.newaxis]
+		self.normal[...] = n
+		self.area[...]   = l*b
+
+	def fs(self):
+		""" Build the simulation free surface instance. Mesh arrays are
+		copied in the single precision used by the simulation.
+		@return Free surface instance.
+		"""
+		nx = self.nx
+		ny = self.ny
+		return {'Nx':nx, 'Ny':ny, 'pos':self.pos.astype(np.float32),
+				'normal':self.normal.astype(np.float32),
+				'area':self.area.astype(np.float32),
+				'velPot':np.zeros((nx,ny), dtype=np.float32),
+				'accPot':np.zeros((nx,ny), dtype=np.float32),
+				'velSrc':np.zeros((nx,ny), dtype=np.float32),
+				'accSrc':np.zeros((nx,ny), dtype=np.float32)}
+
+	def __len__(self):
+		return self.nx
+
+	def __getitem__(self, i):
+		""" Faces row, for faces matrix compatibility.
+		@param i Row index.
+		@return List of faces.
+		"""
+		return [Face(Vector(*self.pos[i,j].tolist()),
+					 Vector(*self.normal[i,j].tolist()),
+					 float(self.area[i,j])) for j in range(0,self.ny)]
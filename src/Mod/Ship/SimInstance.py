@@ -38,6 +38,7 @@ import Part
 
 # Ship design module
 from shipUtils import Paths, Math
+from FreeSurface import FreeSurface
 
 class FreeSurfaceFace:
 	def __init__(self, pos, normal, l, b):
@@ -129,16 +130,6 @@ class ShipSimulation:
 									   None,QtGui.QApplication.UnicodeUTF8)
 			FreeCAD.Console.PrintError(msg + '\n')
 			return
-		# Get areas and number of elements per direction
-		L = fsMeshData[0]
-		B = fsMeshData[1]
-		N = fsMeshData[2]
-		A	= L*B
-		area = A/N
-		l	= sqrt(area)
-		b	= sqrt(area)
-		nx   = int(round(L / l))
-		ny   = int(round(B / b))
 		# Start data fields if not already exist
 		props = obj.PropertiesList
 		try:
@@ -172,41 +163,17 @@ class ShipSimulation:
 													   None,QtGui.QApplication.UnicodeUTF8))
 			obj.addProperty("App::PropertyVectorList","FS_Normal","ShipSimulation", tooltip).FS_Normal=[]
 		# Fill data
-		obj.FS_Nx = nx
-		obj.FS_Ny = ny
-		pos	= []
-		areas  = []
-		normal = []
-		for i in range(0,nx):
-			for j in range(0,ny):
-				pos.append(Vector(-0.5*L + (i+0.5)*l,-0.5*B + (j+0.5)*b,0.0))
-				areas.append(l*b)
-				normal.append(Vector(0.0,0.0,1.0))
-		obj.FS_Position = pos[:]
-		obj.FS_Area	 = areas[:]
-		obj.FS_Normal   = normal[:]
+		fs = FreeSurface.plane(fsMeshData[0], fsMeshData[1], fsMeshData[2])
+		fs.toObject(obj)
 
 	def computeWaves(self, obj, waves):
 		""" Add waves effect to free surface mesh positions.
 		@param obj Created Part::FeaturePython object.
 		@param waves waves data [A,T,phase, heading].
 		"""
-		grav = 9.81
-		positions = obj.FS_Position[:]
-		for i in range(0, len(positions)):
-			for w in waves:
-				A	   = w[0]
-				T	   = w[1]
-				phase   = w[2]
-				heading = pi*w[3]/180.0
-				wl	  = 0.5 * grav / pi * T*T
-				k	   = 2.0*pi/wl
-				frec	= 2.0*pi/T
-				pos	 = obj.FS_Position[i]
-				l	   = pos.x*cos(heading) + pos.y*sin(heading)
-				amp	 = A*sin(k*l + phase)
-				positions[i].z = positions[i].z + amp
-		obj.FS_Position = positions[:]
+		fs = FreeSurface.fromObject(obj)
+		fs.addWaves(waves)
+		obj.FS_Position = [Vector(*p) for p in fs.pos.reshape(-1,3).tolist()]
 
 	def computeShape(self, obj):
 		""" Computes simulation involved shapes.
@@ -215,7 +182,7 @@ class ShipSimulation:
 		"""
 		nx	 = obj.FS_Nx
 		ny	 = obj.FS_Ny
-		mesh   = FSMesh(obj)
+		mesh   = FreeSurface.fromObject(obj)
 		# Create BSpline surface
 		surf   = Part.BSplineSurface()
 		for i in range(1,nx-1):
@@ -228,7 +195,7 @@ class ShipSimulation:
 			for j in range(0,ny):
 				u	 = i / float(nx-1)
 				v	 = j / float(ny-1)
-				point = mesh[i][j].pos
+				point = Vector(*mesh.pos[i,j].tolist())
 				surf.movePoint(u,v,point,i+1,i+1,j+1,j+1)
 		return surf.toShape()
 
@@ -621,76 +588,13 @@ def FSMesh(obj, recompute=False):
 	""" Get free surface mesh in matrix mode.
 	@param obj Created Part::FeaturePython object.
 	@param recompute True if mesh must be recomputed, False otherwise.
-	@return Faces matrix
+	@return Faces matrix, as a FreeSurface instance
 	"""
-	nx = obj.FS_Nx
-	ny = obj.FS_Ny
+	fs = FreeSurface.fromObject(obj)
 	if not recompute:
-		faces = []
-		for i in range(0,nx):
-			faces.append([])
-			for j in range(0,ny):
-				faces[i].append(FreeSurfaceFace(obj.FS_Position[j + i*ny],
-												obj.FS_Normal[j + i*ny],
-												obj.FS_Area[j + i*ny]))
-		return faces
-	# Transform positions into a mesh
-	pos = []
-	for i in range(0,nx):
-		pos.append([])
-		for j in range(0,ny):
-			pos[i].append(obj.FS_Position[j + i*ny])
+		return fs
 	# Recompute normals and dimensions
-	normal = []
-	l	  = []
-	b	  = []
-	for i in range(0,nx):
-		normal.append([])
-		l.append([])
-		b.append([])
-		for j in range(0,ny):
-			i0 = i-1
-			i1 = i+1
-			fi = 1.0
-			j0 = j-1
-			j1 = j+1
-			fj = 1.0
-			if i == 0:
-				i0 = i
-				i1 = i+1
-				fi = 2.0
-			if i == nx-1:
-				i0 = i-1
-				i1 = i
-				fi = 2.0
-			if j == 0:
-				j0 = j
-				j1 = j+1
-				fj = 2.0
-			if j == ny-1:
-				j0 = j-1
-				j1 = j
-				fj = 2.0
-			l[i].append(fi*(obj.FS_Position[j + i1*ny].x - obj.FS_Position[j + i0*ny].x))
-			b[i].append(fj*(obj.FS_Position[j1 + i*ny].y - obj.FS_Position[j0 + i*ny].y))
-			xvec = Vector(obj.FS_Position[j + i1*ny].x - obj.FS_Position[j + i0*ny].x,
-						  obj.FS_Position[j + i1*ny].y - obj.FS_Position[j + i0*ny].y,
-						  obj.FS_Position[j + i1*ny].z - obj.FS_Position[j + i0*ny].z)
-			yvec = Vector(obj.FS_Position[j1 + i*ny].x - obj.FS_Position[j0 + i*ny].x,
-						  obj.FS_Position[j1 + i*ny].y - obj.FS_Position[j0 + i*ny].y,
-						  obj.FS_Position[j1 + i*ny].z - obj.FS_Position[j0 + i*ny].z)
-			n = Vector(xvec.cross(yvec))	# Z positive
-			normal[i].append(n.normalize())
-	# Create faces
-	faces = []
-	for i in range(0,nx):
-		faces.append([])
-		for j in range(0,ny):
-			faces[i].append(FreeSurfaceFace(pos[i][j], normal[i][j], l[i][j], b[i][j]))
+	fs.computeNormals()
 	# Reconstruct mesh data
-	for i in range(0,nx):
-		for j in range(0,ny):
-			obj.FS_Position[j + i*ny] = faces[i][j].pos
-			obj.FS_Normal[j + i*ny]   = faces[i][j].normal
-			obj.FS_Area[j + i*ny]	 = faces[i][j].area
-	return faces
+	fs.toObject(obj)
+	return fs
@@ -723,6 +723,10 @@ def tankWeight(obj, angles=Vector(0.0,0.0,0.0), cor=Vector(0.0,0.0,0.0)):
 		return None
 	if not obj.IsShipTank:
 		return None
+	# Try to use the free surface tables
+	W = tankTableWeight(obj, angles, cor)
+	if W:
+		return W
 	# Get object solids
 	Solids = obj.Shape.Solids
 	W = [0.0, 0.0, 0.0, 0.0]
@@ -767,3 +771,47 @@ def tankWeight(obj, angles=Vector(0.0,0.0,0.0), cor=Vector(0.0,0.0,0.0)):
 			W[2] = W[2] + f.Volume*obj.Density*cog.y
 			W[3] = W[3] + f.Volume*obj.Density*cog.z
 	return [W[0], W[1]/W[0], W[2]/W[0], W[3]/W[0]]
+
+def tankTableWeight(obj, angles=Vector(0.0,0.0,0.0), cor=Vector(0.0,0.0,0.0)):
+	""" Compute tank fluid weight and their center of gravity using the
+	sliced tank solids. The fluid free surface is interpolated from 
+	volume tables, that are computed just once per set of angles.
+	@param obj Tank object.
+	@param angles Tank angles, Roll, Pitch and Yaw.
+	@param cor Center or rotation.
+	@return Weight and center of gravity. None if the tables can't be
+	used.
+	"""
+	try:
+		import numpy as np
+		from shipHydrostatics import Slices
+	except ImportError:
+		return None
+	# Rotations composition is Roll->Pitch->Yaw
+	R = Slices.transform(angles.x, -angles.y, angles.z)
+	c = np.array([cor.x, cor.y, cor.z])
+	W = [0.0, 0.0, 0.0, 0.0]
+	Solids = obj.Shape.Solids
+	for i in range(0,len(Solids)):
+		s = Solids[i]
+		sliced = Slices.cached("%s_%d" % (obj.Name, i), s)
+		if not sliced:
+			return None
+		# Get fluid volume
+		bbox = s.BoundBox
+		z	= bbox.ZMin + obj.Level/100.0 * (bbox.ZMax-bbox.ZMin)
+		vol  = sliced.volume(np.array([0.0, 0.0, 1.0]), z)[0]
+		if vol <= 0.0:
+			continue
+		# Interpolate the fluid center in rotated position
+		table = sliced.levelTable(angles.x, -angles.y, angles.z)
+		vols  = table[1]
+		cog   = np.array([np.interp(vol, vols, table[2][:,j]) for j in range(0,3)])
+		cog   = np.dot(R, cog - c) + c
+		W[0]  = W[0] + vol*obj.Density
+		W[1]  = W[1] + vol*obj.Density*cog[0]
+		W[2]  = W[2] + vol*obj.Density*cog[1]
+		W[3]  = W[3] + vol*obj.Density*cog[2]
+	if W[0] <= 0.0:
+		return [0.0, 0.0, 0.0, 0.0]
+	return [W[0], W[1]/W[0], W[2]/W[0], W[3]/W[0]]
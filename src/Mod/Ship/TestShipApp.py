@@ -0,0 +1,320 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import os, imp, shutil, tempfile, unittest
+import FreeCAD, Part
+from FreeCAD import Vector
+try:
+	import numpy as np
+	# The tools packages need the GUI, so the tested modules are loaded alone
+	path = os.path.dirname(__file__)
+	Slices = imp.load_source("Slices", os.path.join(path, "shipHydrostatics", "Slices.py"))
+	fsEvolution = imp.load_source("fsEvolution", os.path.join(path, "simRun", "Sim", "fsEvolution.py"))
+	# The simulation packages don't need it
+	from simRun import Sim, mpSim, Results
+	from FreeSurface import FreeSurface
+except ImportError:
+	Slices = None
+	fsEvolution = None
+	Sim = None
+	mpSim = None
+	Results = None
+	FreeSurface = None
+
+#---------------------------------------------------------------------------
+# helpers and fixtures
+#---------------------------------------------------------------------------
+
+def freeSurface(nx, ny):
+	""" Builds a small, randomly perturbed, free surface.
+	@param nx Number of points in x direction.
+	@param ny Number of points in y direction.
+	@return Free surface instance.
+	"""
+	rand = np.random.RandomState(0)
+	p = np.zeros((nx,ny,3), dtype=np.float32)
+	p[:,:,0] = np.linspace(-5.0, 5.0, nx)[:,np.newaxis]
+	p[:,:,1] = np.linspace(-3.0, 3.0, ny)[np.newaxis,:]
+	p[:,:,2] = 0.05*rand.standard_normal((nx,ny))
+	a = np.ones((nx,ny), dtype=np.float32)
+	phi = 0.1*rand.standard_normal((nx,ny)).astype(np.float32)
+	Phi = 0.1*rand.standard_normal((nx,ny)).astype(np.float32)
+	s = rand.standard_normal((nx,ny)).astype(np.float32)
+	n = np.zeros((nx,ny,3), dtype=np.float32)
+	n[:,:,2] = 1.0
+	ss = np.zeros((nx,ny), dtype=np.float32)
+	return {'Nx':nx, 'Ny':ny, 'pos':p, 'normal':n, 'area':a,
+	        'velPot':phi, 'accPot':Phi, 'velSrc':s, 'accSrc':ss}
+
+class FreeSurfaceMesh:
+	""" Stands for a free surface mesh, giving its arrays directly to
+	the simulation initialization.
+	"""
+	def __init__(self, fs):
+		self.data = fs
+
+	def fs(self):
+		return dict([(k, np.copy(v)) for k,v in self.data.items()])
+
+class FakeSimulation:
+	""" Stands for a ship simulation instance, with just the free
+	surface properties.
+	"""
+	def __init__(self):
+		self.FS_Nx = 0
+		self.FS_Ny = 0
+		self.FS_Position = []
+		self.FS_Normal = []
+		self.FS_Area = []
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD Ship module
+#---------------------------------------------------------------------------
+
+class ShipTestCases(unittest.TestCase):
+
+	def setUp(self):
+		# Box hull with a tunnel along its whole length, so every
+		# section has an inner polyline
+		hull = Part.makeBox(10.0, 4.0, 3.0, Vector(0.0, -2.0, 0.0))
+		tunnel = Part.makeBox(12.0, 2.0, 1.0, Vector(-1.0, -1.0, 0.5))
+		self.shape = hull.cut(tunnel)
+
+	def testTunnelDisplacement(self):
+		if not Slices:
+			return
+		sliced = Slices.Slices(self.shape)
+		# Below, across and above the tunnel, which is 2 wide and 1 high
+		for draft, vol, zB in ((0.4, 16.0, 0.2), (1.0, 30.0, 12.5/30.0), (2.0, 60.0, 1.0)):
+			center = Vector(5.0, 0.0, zB)
+			disp, B, Cb = sliced.displacement(draft)
+			self.failUnless(abs(disp/Slices.DENS - vol) < 0.02*vol)
+			self.failUnless((B - center).Length < 0.02)
+
+	def testTunnelFloatingArea(self):
+		if not Slices:
+			return
+		sliced = Slices.Slices(self.shape)
+		# The waterplane crosses the tunnel, whose width must be subtracted
+		area, cf = sliced.floatingArea(1.0)
+		self.failUnless(abs(area - 20.0) < 0.2)
+
+	def testCachedFailure(self):
+		if not Slices:
+			return
+		shape = Part.Shape()
+		self.failUnless(Slices.cached("TestShipApp", shape) == None)
+		self.failUnless("TestShipApp" in Slices._cache)
+		self.failUnless(Slices.cached("TestShipApp", shape) == None)
+		del Slices._cache["TestShipApp"]
+
+	def testFSGradient(self):
+		if not fsEvolution:
+			return
+		# A single unit source at the origin, desingularized 1 above it
+		sim = fsEvolution.simFSEvolution()
+		sim.fs = freeSurface(2, 2)
+		sim.fs['pos'][:,:,0] = [[0.0], [3.0]]
+		sim.fs['pos'][:,:,1] = [[0.0, 4.0]]
+		sim.fs['pos'][:,:,2] = 0.0
+		sim.fs['velSrc'][:,:] = 0.0
+		sim.fs['velSrc'][0,0] = 1.0
+		grad = [[0.0, 0.0, 0.0], [0.0, 4.0/17.0, 0.0], [0.3, 0.0, 0.0], [3.0/26.0, 4.0/26.0, 0.0]]
+		self.failUnless(np.allclose(sim.evaluateGradient(), grad, atol=1.0e-6))
+		# Gradients computed in tiles must match the ones computed at once
+		sim.fs = freeSurface(7, 5)
+		self.failUnless(np.allclose(sim.evaluateGradient(tile=4), sim.evaluateGradient(), rtol=1.0e-5))
+
+	def testFSEvolution(self):
+		if not fsEvolution:
+			return
+		# A wave of period 4*dt, with the points a quarter of a wave
+		# length apart, so it moves by a quarter of a period along the
+		# points in a time step
+		dt = 0.5
+		A = 0.1
+		wl = 0.5 * fsEvolution.grav / np.pi * 4.0*dt*4.0*dt
+		waves = {'data':np.array([[A, 4.0*dt, 0.0, 0.0]], dtype=np.float32)}
+		fs = freeSurface(3, 3)
+		fs['pos'][:,:,0] = np.array([0.0, 0.25, 0.5])[:,np.newaxis]*wl
+		fs['velSrc'][:,:] = 0.0
+		fs['pos'][1,1,2] = 0.05
+		fs['velPot'][1,1] = 0.2
+		fs['accPot'][1,1] = 0.4
+		fsEvolution.simFSEvolution().execute(fs, waves, dt, 0.0)
+		vel = fsEvolution.grav*A/np.pi
+		acc = fsEvolution.grav*A
+		# Inner point: the potentials are moved from the wave at t to the
+		# wave at t+dt, and integrated in time
+		self.failUnless(abs(fs['pos'][1,1,2] - 0.05) < 1.0e-6)
+		self.failUnless(abs(fs['velPot'][1,1] - (0.2 + vel + dt*0.4)) < 1.0e-5)
+		self.failUnless(abs(fs['accPot'][1,1] - (0.4 + acc)) < 1.0e-5)
+		# Beach points only follow the wave at t+dt
+		mask = np.ones((3,3), dtype=np.bool_)
+		mask[1,1] = False
+		for k, values in (('pos', [-A, 0.0, A]), ('velPot', [vel, 0.0, -vel]), ('accPot', [0.0, acc, 0.0])):
+			f = fs[k][:,:,2] if k == 'pos' else fs[k]
+			expected = np.array(values)[:,np.newaxis]*np.ones((3,3))
+			self.failUnless(np.allclose(f[mask], expected[mask], atol=1.0e-5), k)
+
+	def testMPSim(self):
+		if not mpSim:
+			return
+		waves = [[0.1, 2.0, 0.0, 0.0], [0.05, 3.0, 0.5, 30.0]]
+		mesh = FreeSurfaceMesh(freeSurface(7, 5))
+		ref = Sim.simInitialization(mesh, waves)
+		init = mpSim.simInitialization(mesh, waves)
+		try:
+			# The process parallel backend works on shared arrays
+			self.failUnless(init.A is mpSim.Utils.array('A'))
+			Sim.simMatrixGen().execute(ref.fs, ref.A)
+			mpSim.simMatrixGen().execute(init.fs, init.A)
+			self.failUnless(np.allclose(init.A, ref.A, rtol=1.0e-5, atol=1.0e-6))
+			for fs in (ref.fs, init.fs):
+				fs['velSrc'][:,:] = mesh.data['velSrc']
+			evol = Sim.simFSEvolution()
+			evol.fs = ref.fs
+			mpEvol = mpSim.simFSEvolution()
+			mpEvol.fs = init.fs
+			self.failUnless(np.allclose(mpEvol.evaluateGradient(), evol.evaluateGradient(), rtol=1.0e-5, atol=1.0e-6))
+		finally:
+			init.close()
+
+	def testFreeSurfaceObject(self):
+		if not FreeSurface:
+			return
+		fs = FreeSurface.plane(10.0, 6.0, 60)
+		self.assertEqual((fs.nx, fs.ny), (10, 6))
+		fs.addWaves([[0.1, 2.0, 0.3, 30.0]])
+		fs.pos[0,0,2] = 0.1
+		sim = FakeSimulation()
+		fs.toObject(sim)
+		self.assertEqual(len(sim.FS_Position), 60)
+		# Values are stored without any loss
+		loaded = FreeSurface.fromObject(sim)
+		self.assertEqual((loaded.nx, loaded.ny), (10, 6))
+		for k in ('pos', 'normal', 'area'):
+			self.assertEqual(getattr(loaded, k).dtype, np.float64)
+			self.failUnless(np.array_equal(getattr(loaded, k), getattr(fs, k)))
+		self.assertEqual(loaded.pos[0,0,2], 0.1)
+		self.assertEqual(loaded[3][2].pos.z, fs.pos[3,2,2])
+		# The simulation gets single precision copies
+		data = loaded.fs()
+		self.assertEqual(data['pos'].dtype, np.float32)
+		data['pos'][0,0,2] = 1.0
+		self.assertEqual(loaded.pos[0,0,2], 0.1)
+
+	def testFreeSurfaceNormals(self):
+		if not FreeSurface:
+			return
+		fs = FreeSurface(4, 3)
+		fs.pos[:,:,0] = 0.5*np.arange(4)[:,np.newaxis]
+		fs.pos[:,:,1] = 0.25*np.arange(3)[np.newaxis,:]
+		fs.normal[...] = 0.0
+		fs.computeNormals()
+		self.failUnless(np.allclose(fs.area, 0.125))
+		self.failUnless(np.allclose(fs.normal, [0.0, 0.0, 1.0]))
+		# A sloped plane, the areas are still the projected ones
+		fs.pos[:,:,2] = 0.1*fs.pos[:,:,0]
+		fs.computeNormals()
+		self.failUnless(np.allclose(fs.area, 0.125))
+		self.failUnless(np.allclose(fs.normal, np.array([-0.1, 0.0, 1.0])/np.sqrt(1.01)))
+
+class ResultsTestCases(unittest.TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, "test.fsr")
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def frames(self, n):
+		""" Builds a list of free surface instances, with different
+		values for each time instant.
+		@param n Number of instants.
+		@return Free surface instances list.
+		"""
+		result = []
+		for i in range(0,n):
+			fs = freeSurface(3, 2)
+			fs['pos'][:,:,2] = i
+			fs['velPot'][:,:] = 10.0*i
+			fs['accPot'][:,:] = -10.0*i
+			result.append(fs)
+		return result
+
+	def write(self, frames):
+		writer = Results.Writer(self.path, 3, 2, chunk=2)
+		for i in range(0,len(frames)):
+			writer.write(0.5*i, frames[i])
+		return writer
+
+	def testRoundTrip(self):
+		if not Results:
+			return
+		frames = self.frames(5)
+		writer = self.write(frames[:3])
+		# Frames can be read while they are written
+		reader = Results.Reader(self.path)
+		self.assertEqual(len(reader), 3)
+		for fs in frames[3:]:
+			writer.write(0.5*len(reader), fs)
+			self.assertEqual(reader.refresh(), len(reader))
+		self.assertEqual(len(reader), 5)
+		# The file grows by chunks of 2 frames
+		size = Results.HEADER_SIZE + 6*reader.dtype.itemsize
+		self.assertEqual(os.path.getsize(self.path), size)
+		writer.close()
+		size = Results.HEADER_SIZE + 5*reader.dtype.itemsize
+		self.assertEqual(os.path.getsize(self.path), size)
+		f = open(self.path, 'rb')
+		header = f.read(Results.HEADER_SIZE)
+		f.close()
+		self.assertEqual(Results.HEADER.unpack(header[:Results.HEADER.size]), ('FSSR', 1, 3, 2, 2, 5))
+		self.assertEqual(header[Results.HEADER.size:], '\0'*(Results.HEADER_SIZE - Results.HEADER.size))
+		reader = Results.Reader(self.path)
+		self.failUnless(isinstance(reader.frames, np.memmap))
+		self.assertEqual(len(reader), 5)
+		for i in range(0,5):
+			self.assertEqual(reader.time(i), 0.5*i)
+			frame = reader.frame(i)
+			for k in ('pos', 'velPot', 'accPot'):
+				self.failUnless(np.array_equal(frame[k], frames[i][k]))
+
+	def testTruncated(self):
+		if not Results:
+			return
+		self.write(self.frames(4)).close()
+		itemsize = Results.Reader(self.path).dtype.itemsize
+		# Only the complete frames are read
+		f = open(self.path, 'r+b')
+		f.truncate(Results.HEADER_SIZE + 2*itemsize + itemsize//2)
+		f.close()
+		reader = Results.Reader(self.path)
+		self.assertEqual(len(reader), 2)
+		self.assertEqual(reader.time(1), 0.5)
+		# Without a complete header, the file is rejected
+		f = open(self.path, 'r+b')
+		f.truncate(10)
+		f.close()
+		self.assertRaises(ValueError, Results.Reader, self.path)
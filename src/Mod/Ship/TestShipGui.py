@@ -0,0 +1,154 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2013 FreeCAD contributors                               *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# The tools packages need the GUI, so these tests only run when it is up
+
+import math, unittest
+import FreeCAD, Part
+from FreeCAD import Vector
+from shipHydrostatics import Tools
+import TankInstance
+
+#---------------------------------------------------------------------------
+# helpers and fixtures
+#---------------------------------------------------------------------------
+
+class FakeShip:
+	""" Stands for a ship instance, so the tools can be used without
+	a document.
+	"""
+	def __init__(self, name, shape):
+		self.Name = name
+		self.Shape = shape
+		bbox = shape.BoundBox
+		self.Length = bbox.XMax - bbox.XMin
+		self.Breadth = bbox.YMax - bbox.YMin
+		self.Draft = 0.5*(bbox.ZMax - bbox.ZMin)
+
+def boxShip(name="TestShipGui"):
+	""" Builds a box hull ship, 10 long, 4 wide and 3 high, centered
+	in the Y axis.
+	@param name Ship name.
+	@return Ship instance.
+	"""
+	return FakeShip(name, Part.makeBox(10.0, 4.0, 3.0, Vector(0.0, -2.0, 0.0)))
+
+class FakeTank:
+	""" Stands for a tank instance, so the tools can be used without
+	a document.
+	"""
+	def __init__(self, name, shape, level, density):
+		self.Name = name
+		self.Shape = shape
+		self.Level = level
+		self.Density = density
+
+#---------------------------------------------------------------------------
+# define the test cases to test the FreeCAD Ship module
+#---------------------------------------------------------------------------
+
+class HydrostaticsTestCases(unittest.TestCase):
+
+	def setUp(self):
+		self.ship = boxShip()
+		self.faces = Part.makeShell(self.ship.Shape.Faces)
+
+	def assertSameData(self, data, ref):
+		self.assertEqual(sorted(data.keys()), sorted(ref.keys()))
+		for k in ref.keys():
+			if isinstance(ref[k], Vector):
+				self.failUnless((data[k] - ref[k]).Length < 1.0e-9, k)
+			else:
+				self.assertAlmostEqual(data[k], ref[k], 9, k)
+
+	def testBatch(self):
+		conditions = [(draft, 0.0, 0.0) for draft in (0.5, 1.0, 1.5, 2.0, 2.5)]
+		serial = [Tools.evaluate(self.ship, self.faces, *c) for c in conditions]
+		for processes in (1, 2):
+			results = Tools.batch(self.ship, conditions, self.faces, processes=processes)
+			self.assertEqual(len(results), len(serial))
+			for data, ref in zip(results, serial):
+				self.assertSameData(data, ref)
+
+	def testBatchCancel(self):
+		conditions = [(draft, 0.0, 0.0) for draft in (0.5, 1.0, 1.5, 2.0, 2.5)]
+		serial = [Tools.evaluate(self.ship, None, c[0], c[1], c[2], False) for c in conditions]
+		for processes in (1, 2):
+			calls = []
+			def callback(i, data):
+				calls.append(i)
+				return i < 1
+			results = Tools.batch(self.ship, conditions, None, callback, False, processes)
+			self.assertEqual(calls, [0, 1])
+			self.assertEqual(len(results), 2)
+			for data, ref in zip(results, serial):
+				self.assertSameData(data, ref)
+
+	def testSolveDraft(self):
+		# Box hull, the displacement is proportional to the draft
+		draft, B = Tools.solveDraft(self.ship, 1.025*40.0*1.2)
+		self.failUnless(abs(draft - 1.2) < 1.0e-3)
+		self.failUnless((B - Vector(5.0, 0.0, 0.6)).Length < 1.0e-2)
+
+	def testDisplacementCurve(self):
+		drafts, disps = Tools.displacementCurve(self.ship)
+		self.failUnless(abs(drafts[0]) < 1.0e-6 and abs(drafts[-1] - 3.0) < 1.0e-6)
+		self.failUnless(Tools.displacementCurve(self.ship)[0] is drafts)
+		# A new shape, even an equal one, is not mistaken for the old one
+		self.ship.Shape = Part.makeBox(10.0, 4.0, 2.0, Vector(0.0, -2.0, 0.0))
+		drafts, disps = Tools.displacementCurve(self.ship)
+		self.failUnless(abs(drafts[-1] - 2.0) < 1.0e-6)
+		self.failUnless(abs(disps[-1] - 1.025*80.0) < 0.1)
+
+	def testSolveEquilibrium(self):
+		W = 1.025*40.0*1.2
+		draft, trim, B = Tools.solveEquilibrium(self.ship, lambda t: [W, 5.0, 0.0, 1.0])
+		self.failUnless(abs(draft - 1.2) < 1.0e-3)
+		self.failUnless(abs(trim) < 0.01)
+		# Gravity center 0.5 off the middle, the box trims by the angle
+		# of the wall sided formula, 0.5 = t*(GM + BM*t^2/2), with
+		# BM = L^2/(12T) = 6.944, GM = T/2 + BM - zG = 6.544 and t the
+		# tangent of the trim angle
+		trims = []
+		for xG in (4.5, 5.5):
+			draft, trim, B = Tools.solveEquilibrium(self.ship, lambda t: [W, xG, 0.0, 1.0])
+			self.failUnless(abs(abs(trim) - math.degrees(math.atan(0.07617))) < 0.05)
+			trims.append(trim)
+		self.failUnless(abs(trims[0] + trims[1]) < 0.02)
+
+	def testTankTables(self):
+		box = Part.makeBox(2.0, 2.0, 2.0)
+		tank = FakeTank("TestShipGuiTank", box, 25.0, 0.5)
+		# Upright, filled up to 0.5
+		W = TankInstance.tankTableWeight(tank)
+		self.failUnless(abs(W[0] - 2.0*0.5) < 1.0e-3)
+		self.failUnless((Vector(*W[1:]) - Vector(1.0, 1.0, 0.25)).Length < 1.0e-3)
+		# Rolled 10 degrees around its center, the fluid keeps its volume
+		# and its center moves, in the tank, B^2*tan(roll)/(12h) to a side
+		# and B^2*tan(roll)^2/(24h) up, where h = 0.5 is the mean depth
+		cor = Vector(1.0, 1.0, 1.0)
+		t = math.tan(math.radians(10.0))
+		center = Vector(1.0, 1.0 + 4.0*t/6.0, 0.25 + 4.0*t*t/12.0)
+		W = TankInstance.tankTableWeight(tank, Vector(10.0, 0.0, 0.0), cor)
+		self.failUnless(abs(W[0] - 2.0*0.5) < 1.0e-3)
+		self.failUnless(abs(W[1] - 1.0) < 1.0e-3)
+		self.failUnless(abs((Vector(*W[1:]) - cor).Length - (center - cor).Length) < 5.0e-3)
@@ -0,0 +1,498 @@
+#***************************************************************************
+#*																		 *
+#*   Copyright (c) 2011, 2012											  *  
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>							*  
+#*																		 *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)	*
+#*   as published by the Free Software Foundation; either version 2 of	 *
+#*   the License, or (at your option) any later version.				   *
+#*   for detail see the LICENCE text file.								 *
+#*																		 *
+#*   This program is distributed in the hope that it will be useful,	   *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of		*
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the		 *
+#*   GNU Library General Public License for more details.				  *
+#*																		 *
+#*   You should have received a copy of the GNU Library General Public	 *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA																   *
+#*																		 *
+#***************************************************************************
+
+
+import math
+import numpy as np
+# FreeCAD modules
+from FreeCAD import Vector
+import Part
+import FreeCAD as App
+
+# Salt water density [tons/m3]
+DENS = 1.025
+
+def rotation(axis, angle):
+	""" Returns a rotation matrix (right hand rule).
+	@param axis Rotation axis, as a 3 components list.
+	@param angle Rotation angle [deg].
+	@return 3x3 rotation matrix.
+	"""
+	u = np.array(axis, dtype=np.float64)
+	u = u / np.sqrt(np.dot(u,u))
+	a = math.radians(angle)
+	c = math.cos(a)
+	s = math.sin(a)
+	ux = np.array([[0.0, -u[2], u[1]],
+	               [u[2], 0.0, -u[0]],
+	               [-u[1], u[0], 0.0]])
+	return c*np.eye(3) + s*ux + (1.0 - c)*np.outer(u,u)
+
+def transform(roll=0.0, trim=0.0, yaw=0.0):
+	""" Returns the rotation applied to the ship by the hydrostatics tools.
+	Rotations composition is Roll->Trim->Yaw.
+	@param roll Ship roll angle [deg].
+	@param trim Ship trim angle [deg].
+	@param yaw Ship yaw angle [deg].
+	@return 3x3 rotation matrix.
+	"""
+	R = rotation([1.0,0.0,0.0], roll)
+	R = np.dot(rotation([0.0,-1.0,0.0], trim), R)
+	return np.dot(rotation([0.0,0.0,1.0], yaw), R)
+
+def inside(point, loop):
+	""" Returns whether a point is inside a closed polyline, using the
+	ray casting rule.
+	@param point (y,z) point.
+	@param loop Closed polyline, as an array of (y,z) points.
+	@return True if the point is inside the polyline, False otherwise.
+	"""
+	y = loop[:,0]
+	z = loop[:,1]
+	y1 = np.roll(y,-1)
+	z1 = np.roll(z,-1)
+	cross = (z > point[1]) != (z1 > point[1])
+	with np.errstate(divide='ignore', invalid='ignore'):
+		yc = y + (point[1] - z)*(y1 - y)/(z1 - z)
+	return bool(np.sum(cross & (point[0] < yc)) % 2)
+
+class Slices:
+	""" Hydrostatics engine. The hull is sliced once in a stack of 
+	transversal sections, stored as closed polylines, that are integrated
+	for any draft, trim and roll angles without any further boolean
+	operation. Since all the sections share the same number of points per
+	polyline, consecutive sections define a discretized hull surface too.
+	"""
+	def __init__(self, shape, nx=101, ny=64):
+		""" Slices the hull.
+		@param shape Ship solids (usually Ship.Shape).
+		@param nx Number of transversal sections.
+		@param ny Number of points per section polyline.
+		"""
+		bbox = shape.BoundBox
+		self.xmin = bbox.XMin
+		self.xmax = bbox.XMax
+		self.dx = (self.xmax - self.xmin) / nx
+		# Sections are placed at the middle of nx intervals, so
+		# integrals are computed with the midpoint rule.
+		self.x = self.xmin + (np.arange(nx) + 0.5)*self.dx
+		loops = []
+		for x in self.x:
+			loops.append(self.section(shape, x, ny))
+		self.build(loops)
+
+	def section(self, shape, x, ny):
+		""" Computes a transversal section.
+		@param shape Ship solids.
+		@param x Section position.
+		@param ny Number of points per polyline.
+		@return List of closed polylines, as arrays of (y,z) points,
+		starting at their lowest point and sorted by y coordinate.
+		Outer polylines are counter clockwise oriented, and inner ones
+		(holes) clockwise oriented, so the signed area of the section
+		is the sum of the polylines signed areas.
+		"""
+		loops = []
+		for s in shape.Solids:
+			try:
+				wires = s.slice(Vector(1.0,0.0,0.0), x)
+			except:
+				continue
+			solidLoops = []
+			for w in wires:
+				try:
+					pts = w.discretize(ny + 1)
+				except:
+					continue
+				pts = np.array([[p.y, p.z] for p in pts[0:ny]])
+				if len(pts) < 3:
+					continue
+				# Orientation
+				y = pts[:,0]
+				z = pts[:,1]
+				area = 0.5*np.sum(y*np.roll(z,-1) - np.roll(y,-1)*z)
+				if abs(area) < 1.0e-12:
+					continue
+				if area < 0.0:
+					pts = pts[::-1]
+				solidLoops.append(pts)
+			for i in range(len(solidLoops)):
+				pts = solidLoops[i]
+				# Polylines nested in an odd number of other ones are holes
+				depth = 0
+				for j in range(len(solidLoops)):
+					if i != j and inside(pts[0], solidLoops[j]):
+						depth += 1
+				if depth % 2:
+					pts = pts[::-1]
+				# Start point
+				k = np.lexsort((pts[:,0], pts[:,1]))[0]
+				pts = np.roll(pts, -k, axis=0)
+				loops.append(pts)
+		loops.sort(key=lambda l: np.mean(l[:,0]))
+		return loops
+
+	def build(self, loops):
+		""" Builds the flat segments and surface triangles arrays.
+		@param loops Sections polylines.
+		"""
+		p0 = []
+		p1 = []
+		sid = []
+		for i in range(len(loops)):
+			for l in loops[i]:
+				n = len(l)
+				x = np.empty((n,1))
+				x.fill(self.x[i])
+				a = np.hstack((x, l))
+				p0.append(a)
+				p1.append(np.roll(a, -1, axis=0))
+				sid.append(np.empty(n, dtype=np.int32))
+				sid[-1].fill(i)
+		if not p0:
+			raise ValueError("Hull can't be sliced")
+		self.p0 = np.vstack(p0)
+		self.p1 = np.vstack(p1)
+		self.sid = np.concatenate(sid)
+		# Surface triangles between consecutive sections with the same
+		# number of polylines
+		tris = []
+		for i in range(len(loops) - 1):
+			if len(loops[i]) != len(loops[i+1]):
+				continue
+			for la,lb in zip(loops[i], loops[i+1]):
+				if len(la) != len(lb):
+					continue
+				n = len(la)
+				xa = np.empty((n,1))
+				xa.fill(self.x[i])
+				xb = np.empty((n,1))
+				xb.fill(self.x[i+1])
+				a0 = np.hstack((xa, la))
+				b0 = np.hstack((xb, lb))
+				a1 = np.roll(a0, -1, axis=0)
+				b1 = np.roll(b0, -1, axis=0)
+				tris.append(np.dstack((a0,a1,b1)))
+				tris.append(np.dstack((a0,b1,b0)))
+		if tris:
+			# Stored as (n, 3 vertices, 3 coordinates)
+			self.tris = np.swapaxes(np.vstack(tris), 1, 2)
+		else:
+			self.tris = np.zeros((0,3,3))
+		# Hull points, with the extreme sections moved to the hull ends,
+		# used to compute the block coefficient
+		self.hull = self.p0.copy()
+		self.hull[self.sid == 0, 0] = self.xmin
+		self.hull[self.sid == len(loops) - 1, 0] = self.xmax
+		# Level tables (see levelTable)
+		self.tables = {}
+
+	def waterplane(self, draft, roll=0.0, trim=0.0):
+		""" Returns the waterplane in ship coordinates.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@return w, c: unit normal pointing upwards and plane
+		constant, such that submerged points verify w*p < c.
+		"""
+		w = transform(roll, trim)[2]
+		return w, draft*w[2]
+
+	def clip(self, draft, roll=0.0, trim=0.0):
+		""" Clips the sections by the waterplane.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@return Per section arrays of areas, y and z first moments,
+		waterline width, first and second moments along the 
+		waterline, as well as the waterplane definition.
+		"""
+		w, c = self.waterplane(draft, roll, trim)
+		return self.clipPlane(w, c)
+
+	def clipPlane(self, w, c):
+		""" Clips the sections by a plane.
+		@param w Plane unit normal, pointing upwards.
+		@param c Plane constant, such that submerged points verify
+		w*p < c.
+		@return Same as clip.
+		"""
+		n2 = w[1]*w[1] + w[2]*w[2]
+		nx = len(self.x)
+		# Waterline origin at each section
+		cs = c - w[0]*self.x
+		oy = cs*w[1]/n2
+		oz = cs*w[2]/n2
+		# Waterline direction in the sections plane
+		dy = -w[2]/math.sqrt(n2)
+		dz = w[1]/math.sqrt(n2)
+		s0 = np.dot(self.p0, w) - c
+		s1 = np.dot(self.p1, w) - c
+		in0 = s0 < 0.0
+		in1 = s1 < 0.0
+		keep = in0 | in1
+		cross = in0 != in1
+		t = np.zeros(len(s0))
+		t[cross] = s0[cross] / (s0[cross] - s1[cross])
+		pc = self.p0 + t[:,np.newaxis]*(self.p1 - self.p0)
+		# Submerged part of each segment
+		q0 = np.where(in0[:,np.newaxis], self.p0, pc)
+		q1 = np.where(in1[:,np.newaxis], self.p1, pc)
+		sid = self.sid
+		y0 = q0[:,1] - oy[sid]
+		z0 = q0[:,2] - oz[sid]
+		y1 = q1[:,1] - oy[sid]
+		z1 = q1[:,2] - oz[sid]
+		# Closing segments lay over the waterline, that contains the 
+		# origin, so they don't contribute to the integrals
+		k = np.where(keep, y0*z1 - y1*z0, 0.0)
+		area = np.bincount(sid, weights=0.5*k, minlength=nx)
+		my = np.bincount(sid, weights=(y0+y1)*k/6.0, minlength=nx) + oy*area
+		mz = np.bincount(sid, weights=(z0+z1)*k/6.0, minlength=nx) + oz*area
+		# Waterline crossings, entering the water adds, leaving subtracts
+		sign = np.where(in1, 1.0, -1.0)[cross]
+		tc = (pc[cross,1] - oy[sid[cross]])*dy + (pc[cross,2] - oz[sid[cross]])*dz
+		sc = sid[cross]
+		width = np.bincount(sc, weights=sign*tc, minlength=nx)
+		m1 = np.bincount(sc, weights=sign*tc**2/2.0, minlength=nx)
+		m2 = np.bincount(sc, weights=sign*tc**3/3.0, minlength=nx)
+		if len(tc):
+			tlim = (np.min(tc), np.max(tc))
+		else:
+			tlim = (0.0, 0.0)
+		return {"area":area, "my":my, "mz":mz,
+		        "width":width, "m1":m1, "m2":m2, "tlim":tlim,
+		        "w":w, "c":c, "scale":1.0/math.sqrt(n2),
+		        "q0":q0, "q1":q1, "keep":keep}
+
+	def displacement(self, draft, roll=0.0, trim=0.0, yaw=0.0):
+		""" Compute ship displacement.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@param yaw Ship yaw angle.
+		@return [disp, B, Cb], same as shipHydrostatics.Tools.displacement
+		"""
+		data = self.clip(draft, roll, trim)
+		area = data["area"]
+		vol = np.sum(area)*self.dx
+		if vol <= 0.0:
+			return [0.0, Vector(), 0.0]
+		B = Vector(float(np.sum(self.x*area)*self.dx / vol),
+		           float(np.sum(data["my"])*self.dx / vol),
+		           float(np.sum(data["mz"])*self.dx / vol))
+		# Block coefficient, from the transformed hull bounds
+		pts = np.dot(self.hull - np.array([0.0,0.0,draft]), transform(roll, trim, yaw).T)
+		L = np.max(pts[:,0]) - np.min(pts[:,0])
+		Bm = np.max(pts[:,1]) - np.min(pts[:,1])
+		T = abs(np.min(pts[:,2]))
+		Cb = 0.0
+		if L*Bm*T > 0.0:
+			Cb = vol / (L*Bm*T)
+		return [float(DENS*vol), B, float(Cb)]
+
+	def areas(self, draft, roll=0.0, trim=0.0, n=30):
+		""" Compute ship transversal areas. Sections are normal to
+		the ship x axis.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@param n Number of sections to perform.
+		@return Transversal areas, as [x, area] pairs.
+		"""
+		if n < 2:
+			return []
+		area = self.clip(draft, roll, trim)["area"]
+		xs = np.linspace(self.xmin, self.xmax, n)
+		a = np.interp(xs[1:-1], self.x, area)
+		result = [[self.xmin, 0.0]]
+		for i in range(len(a)):
+			result.append([float(xs[i+1]), float(a[i])])
+		result.append([self.xmax, 0.0])
+		return result
+
+	def floatingArea(self, draft, roll=0.0, trim=0.0):
+		""" Compute the waterplane area.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@return Ship floating area, and floating coefficient.
+		"""
+		data = self.clip(draft, roll, trim)
+		width = data["width"]
+		area = np.sum(width)*self.dx*data["scale"]
+		wet = np.nonzero(width > 0.0)[0]
+		cf = 0.0
+		if len(wet):
+			dx = (self.x[wet[-1]] - self.x[wet[0]] + self.dx)*data["scale"]
+			dy = data["tlim"][1] - data["tlim"][0]
+			if dx*dy > 0.0:
+				cf = area / (dx*dy)
+		return [float(area), float(cf)]
+
+	def BMT(self, draft, roll=0.0, trim=0.0):
+		""" Compute the transversal metacentric radius, as the
+		waterplane transversal inertia divided by the submerged volume.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@return BM Bouyance to metacenter height [m].
+		"""
+		data = self.clip(draft, roll, trim)
+		vol = np.sum(data["area"])*self.dx
+		f = self.dx*data["scale"]
+		awp = np.sum(data["width"])*f
+		if vol <= 0.0 or awp <= 0.0:
+			return 0.0
+		tc = np.sum(data["m1"])*f / awp
+		I = np.sum(data["m2"])*f - tc*tc*awp
+		return float(I / vol)
+
+	def mainFrameCoeff(self, draft):
+		""" Compute main frame coefficient, at x = 0.
+		@param draft Ship draft.
+		@return Main frame coefficient.
+		"""
+		data = self.clip(draft)
+		area = np.interp(0.0, self.x, data["area"])
+		# Section breadth at the nearest section
+		i = np.argmin(np.abs(self.x))
+		sel = data["keep"] & (self.sid == i)
+		if not np.any(sel):
+			return 0.0
+		y = np.concatenate((data["q0"][sel,1], data["q1"][sel,1]))
+		dy = max(0.0, np.max(y)) - max(0.0, np.min(y))
+		if dy*draft > 0.0:
+			return float(area / (dy*draft))
+		return 0.0
+
+	def wettedArea(self, draft, roll=0.0, trim=0.0):
+		""" Compute the wetted hull surface.
+		@param draft Ship draft.
+		@param roll Ship roll angle.
+		@param trim Ship trim angle.
+		@return Wetted ship area.
+		"""
+		w, c = self.waterplane(draft, roll, trim)
+		tris = self.tris
+		if not len(tris):
+			return 0.0
+		e1 = tris[:,1] - tris[:,0]
+		e2 = tris[:,2] - tris[:,0]
+		full = 0.5*np.sqrt(np.sum(np.cross(e1,e2)**2, axis=1))
+		s = np.dot(tris, w) - c
+		neg = s < 0.0
+		count = np.sum(neg, axis=1)
+		# Vertex alone at its side of the waterplane
+		lone = np.where(count == 1, np.argmax(neg, axis=1), np.argmin(neg, axis=1))
+		idx = np.arange(len(s))
+		sl = s[idx, lone]
+		sa = s[idx, (lone + 1) % 3]
+		sb = s[idx, (lone + 2) % 3]
+		with np.errstate(divide='ignore', invalid='ignore'):
+			r = (sl / (sl - sa)) * (sl / (sl - sb))
+		frac = np.where(count == 3, 1.0,
+		       np.where(count == 0, 0.0,
+		       np.where(count == 1, r, 1.0 - r)))
+		area = np.sum(full*frac)
+		# Hull surface between the extreme sections and the hull ends
+		data = self.clip(draft, roll, trim)
+		for i in (0, len(self.x)-1):
+			sel = data["keep"] & (self.sid == i)
+			d = data["q1"][sel] - data["q0"][sel]
+			area = area + 0.5*self.dx*np.sum(np.sqrt(np.sum(d**2, axis=1)))
+		return float(area)
+
+	def volume(self, w, c):
+		""" Compute the volume below a plane, and its center.
+		@param w Plane unit normal, pointing upwards.
+		@param c Plane constant, such that points below the plane 
+		verify w*p < c.
+		@return Volume, and its center as a numpy array. The center is
+		the null vector if the volume is null.
+		"""
+		data = self.clipPlane(w, c)
+		area = data["area"]
+		vol = np.sum(area)*self.dx
+		if vol <= 0.0:
+			return 0.0, np.zeros(3)
+		cog = np.array([np.sum(self.x*area), np.sum(data["my"]), np.sum(data["mz"])])
+		return float(vol), cog*self.dx/vol
+
+	def levelTable(self, roll=0.0, trim=0.0, yaw=0.0, n=64):
+		""" Compute the volume below a set of planes, placed along the 
+		whole hull height for the selected angles. It can be used to 
+		quickly compute the free surface of a fluid inside a tank.
+		@param roll Roll angle [deg].
+		@param trim Trim angle [deg].
+		@param yaw Yaw angle [deg].
+		@param n Number of planes.
+		@return Planes constants, volumes, and volume centers (as a 
+		(n,3) array), with the plane unit normal.
+		@note Computed tables are stored, so they are computed just once
+		per set of angles.
+		"""
+		key = (roll, trim, yaw, n)
+		if key in self.tables:
+			return self.tables[key]
+		w = transform(roll, trim, yaw)[2]
+		s = np.dot(self.hull, w)
+		cs = np.linspace(np.min(s), np.max(s), n)
+		vols = np.zeros(n)
+		cogs = np.zeros((n,3))
+		for i in range(n):
+			vols[i], cogs[i] = self.volume(w, cs[i])
+		self.tables[key] = (cs, vols, cogs, w)
+		return self.tables[key]
+
+# Engines cache, by name
+_cache = {}
+
+def getSlices(ship):
+	""" Returns the hydrostatics engine of a ship, building it only if
+	the ship shape changed since the last call.
+	@param ship Ship instance.
+	@return Slices object, None if the hull can't be sliced.
+	"""
+	return cached(ship.Name, ship.Shape)
+
+def cached(name, shape):
+	""" Returns the sliced shape stored with the given name, building
+	it only if the shape changed since the last call.
+	@param name Name of the stored engine.
+	@param shape Shape to slice.
+	@return Slices object, None if the shape can't be sliced.
+	@note Failures are stored too, so a shape that can't be sliced
+	is not sliced again until it changes.
+	@note The stored shape is kept alive, so its data can't be reused
+	by a new shape, and isSame can't give false positives.
+	"""
+	if name in _cache:
+		if _cache[name][0].isSame(shape):
+			return _cache[name][1]
+	try:
+		s = Slices(shape)
+	except:
+		s = None
+	_cache[name] = (shape, s)
+	return s
@@ -73,19 +73,25 @@ class TaskPanel:
 		msg = QtGui.QApplication.translate("ship_console", "Computing hydrostatics",
                                    None,QtGui.QApplication.UnicodeUTF8)
 		App.Console.PrintMessage(msg + '...\n')
-		points = []
-		for i in range(0,len(drafts)):
-			App.Console.PrintMessage("\t%d / %d\n" % (i+1, len(drafts)))
-			draft = drafts[i]
-			point = Tools.Point(self.ship,faces,draft,self.form.trim.value())
-			points.append(point)
-			self.timer.start(0.0)
-			self.loop.exec_()
-			if(not self.running):
-				break
-		PlotAux.Plot(self.ship, self.form.trim.value(), points)
+		trim = self.form.trim.value()
+		self.points = []
+		conditions = [(draft, trim, 0.0) for draft in drafts]
+		Tools.batch(self.ship, conditions, faces, self.onPoint)
+		PlotAux.Plot(self.ship, trim, self.points)
 		return True
 
+	def onPoint(self, i, data):
+		""" Receives a computed hydrostatics point.
+		@param i Point index.
+		@param data Hydrostatics dictionary.
+		@return False if the computation has been cancelled.
+		"""
+		App.Console.PrintMessage("\t%d / %d\n" % (i+1, self.form.nDraft.value()))
+		self.points.append(Tools.Point(self.ship, None, data['draft'], data['trim'], data))
+		self.timer.start(0.0)
+		self.loop.exec_()
+		return self.running
+
 	def reject(self):
 		if not self.ship:
 			return False
@@ -21,6 +21,7 @@
 #*																		 *
 #***************************************************************************
 
+import os
 import math
 # FreeCAD modules
 from FreeCAD import Vector
@@ -30,6 +31,20 @@ import FreeCADGui as Gui
 # Module
 import Instance
 from shipUtils import Math
+try:
+	import Slices
+except ImportError:
+	# numpy is not available, boolean operations will be used
+	Slices = None
+
+def engine(ship):
+	""" Returns the sliced hull hydrostatics engine of a ship.
+	@param ship Ship instance.
+	@return Slices engine, None if it is not available.
+	"""
+	if not Slices:
+		return None
+	return Slices.getSlices(ship)
 
 def areas(ship, draft, roll=0.0, trim=0.0, yaw=0.0, n=30):
 	""" Compute ship transversal areas.
@@ -45,6 +60,9 @@ def areas(ship, draft, roll=0.0, trim=0.0, yaw=0.0, n=30):
 	"""
 	if n < 2:
 		return []
+	sliced = engine(ship)
+	if sliced and not yaw:
+		return sliced.areas(draft, roll, trim, n)
 	# We will take a duplicate of ship shape in order to place it
 	shape = ship.Shape.copy()
 	shape.translate(Vector(0.0,0.0,-draft))
@@ -125,6 +143,9 @@ def displacement(ship, draft, roll=0.0, trim=0.0, yaw=0.0):
 	@note Bouyance center will returned as FreeCAD.Vector class.
 	@note Returned Bouyance center is in non modified ship coordinates
 	"""
+	sliced = engine(ship)
+	if sliced:
+		return sliced.displacement(draft, roll, trim, yaw)
 	# We will take a duplicate of ship shape in order to place it
 	shape = ship.Shape.copy()
 	shape.translate(Vector(0.0,0.0,-draft))
@@ -176,13 +197,123 @@ def displacement(ship, draft, roll=0.0, trim=0.0, yaw=0.0):
 	dens = 1.025 # [tons/m3], salt water
 	return [dens*vol, B, vol/Vol]
 
-def wettedArea(shape, draft, trim):
+# Displacement curves, by ship name and angles
+_curves = {}
+
+def displacementCurve(ship, trim=0.0, roll=0.0, n=16):
+	""" Compute the displacement as a function of the draft. Curves are
+	stored until the ship shape changes.
+	@param ship Ship instance.
+	@param trim Ship trim angle.
+	@param roll Ship roll angle.
+	@param n Number of drafts to evaluate.
+	@return Drafts and displacements lists.
+	@note As in Slices.cached, the shape is stored with the curve, so
+	isSame can't give false positives.
+	"""
+	key   = (ship.Name, trim, roll, n)
+	shape = ship.Shape
+	if key in _curves and _curves[key][0].isSame(shape):
+		return _curves[key][1:]
+	bbox   = ship.Shape.BoundBox
+	drafts = []
+	disps  = []
+	for i in range(0,n):
+		draft = bbox.ZMin + (bbox.ZMax - bbox.ZMin)*i/(n - 1.0)
+		drafts.append(draft)
+		disps.append(displacement(ship,draft,roll,trim,0.0)[0])
+	_curves[key] = (shape, drafts, disps)
+	return drafts, disps
+
+def solveDraft(ship, disp, trim=0.0, roll=0.0, tol=0.0001, maxIter=30):
+	""" Compute the draft of a ship for a given displacement, using the
+	secant method. The initial guess is interpolated from the cached 
+	displacement curve if the sliced hull engine is available.
+	@param ship Ship instance.
+	@param disp Ship displacement [ton].
+	@param trim Ship trim angle.
+	@param roll Ship roll angle.
+	@param tol Relative displacement tolerance.
+	@param maxIter Maximum number of iterations.
+	@return [draft, B], Ship draft and bouyance center.
+	"""
+	bbox = ship.Shape.BoundBox
+	H	= bbox.ZMax - bbox.ZMin
+	if engine(ship):
+		drafts, disps = displacementCurve(ship, trim, roll)
+		x0 = drafts[-1]
+		for i in range(1,len(drafts)):
+			if disps[i] >= disp:
+				f  = (disp - disps[i-1]) / max(disps[i] - disps[i-1], 1.0e-12)
+				x0 = drafts[i-1] + f*(drafts[i] - drafts[i-1])
+				break
+	else:
+		# Box approximation
+		dens = 1.025
+		dx   = bbox.XMax - bbox.XMin
+		dy   = bbox.YMax - bbox.YMin
+		x0   = bbox.ZMin + disp / (dens*dx*dy)
+	data = displacement(ship,x0,roll,trim,0.0)
+	f0   = data[0] - disp
+	x1   = x0 + 0.01*H
+	for i in range(0,maxIter):
+		data = displacement(ship,x1,roll,trim,0.0)
+		f1   = data[0] - disp
+		if abs(f1) <= tol*disp or f1 == f0:
+			break
+		x0, x1, f0 = x1, x1 - f1*(x1 - x0)/(f1 - f0), f1
+	return [x1, data[1]]
+
+def solveEquilibrium(ship, weights, roll=0.0, trim=0.0, tol=0.01, maxIter=30, maxStep=2.0):
+	""" Compute the draft and trim where the ship is in equilibrium,
+	using the secant method over the trim angle.
+	@param ship Ship instance.
+	@param weights Function that returns the ship weight [ton] and its
+	center of gravity coordinates, as a list, for a given trim angle.
+	@param roll Ship roll angle.
+	@param trim Initial trim angle.
+	@param tol Trim tolerance [deg].
+	@param maxIter Maximum number of iterations.
+	@param maxStep Maximum trim variation per iteration [deg].
+	@return [draft, trim, B], Ship draft, trim and bouyance center.
+	"""
+	def moment(trim):
+		""" Angle between the vertical and the line that joins 
+		bouyance and gravity centers.
+		"""
+		W	 = weights(trim)
+		draft = solveDraft(ship, W[0], trim, roll)
+		B	 = draft[1]
+		BG	= [W[1]-B.x, W[2]-B.y, W[3]-B.z]
+		x	 = BG[0]*math.cos(math.radians(trim)) - BG[2]*math.sin(math.radians(trim))
+		z	 = BG[0]*math.sin(math.radians(trim)) + BG[2]*math.cos(math.radians(trim))
+		return math.degrees(math.atan2(x,z)), draft
+	x0 = trim
+	f0, draft = moment(x0)
+	if abs(f0) < tol:
+		return [draft[0], x0, draft[1]]
+	x1 = x0 - math.copysign(min(abs(f0), maxStep), f0)
+	for i in range(0,maxIter):
+		f1, draft = moment(x1)
+		if abs(f1) < tol or abs(x1 - x0) < 0.01*tol or f1 == f0:
+			break
+		dx = -f1*(x1 - x0)/(f1 - f0)
+		x0, x1, f0 = x1, x1 + math.copysign(min(abs(dx), maxStep), dx), f1
+	return [draft[0], x1, draft[1]]
+
+def wettedArea(shape, draft, trim, ship=None):
 	""" Calculate wetted ship area.
 	@param shape Ship external faces instance.
 	@param draft Draft.
 	@param trim Trim in degrees.
+	@param ship Ship instance. If provided, the sliced hull will be 
+	used instead of the external faces.
 	@return Wetted ship area.
 	"""
+	if ship:
+		sliced = engine(ship)
+		if sliced:
+			return sliced.wettedArea(draft, 0.0, trim)
 	area	 = 0.0
 	nObjects = 0
 	# We will take a duplicate of ship shape in order to place it
@@ -233,6 +364,9 @@ def FloatingArea(ship, draft, trim):
 	@param trim Trim in degrees.
 	@return Ship floating area, and floating coefficient.
 	"""
+	sliced = engine(ship)
+	if sliced:
+		return sliced.floatingArea(draft, 0.0, trim)
 	area	 = 0.0
 	cf	   = 0.0
 	maxX	 = 0.0
@@ -298,6 +432,9 @@ def BMT(ship, draft, trim=0.0):
 	@param trim Ship trim angle.
 	@return BM Bouyance to metacenter height [m].
 	"""
+	sliced = engine(ship)
+	if sliced:
+		return sliced.BMT(draft, 0.0, trim)
 	nRoll	= 2
 	maxRoll  = 7.0
 	B0	   = displacement(ship,draft,0.0,trim,0.0)[1]
@@ -322,6 +459,9 @@ def mainFrameCoeff(ship, draft):
 	@param draft Draft.
 	@return Main frame coefficient
 	"""
+	sliced = engine(ship)
+	if sliced:
+		return sliced.mainFrameCoeff(draft)
 	cm	   = 0.0
 	maxY	 = 0.0
 	minY	 = 0.0
@@ -391,34 +531,138 @@ class Point:
 	Cm Main frame coefficient.
 	@note Moment is positive when produce positive trim.
 	"""
-	def __init__(self, ship, faces, draft, trim):
+	def __init__(self, ship, faces, draft, trim, data=None):
 		""" Use all hydrostatics tools to define a hydrostatics 
 		point.
 		@param ship Selected ship instance
 		@param faces Ship external faces
 		@param draft Draft.
 		@param trim Trim in degrees.
+		@param data Already computed hydrostatics (see batch). If 
+		provided, nothing will be computed again.
 		"""
 		# Hydrostatics computation
-		dispData   = displacement(ship,draft,0.0,trim,0.0)
-		if not faces:
-			wet	= 0.0
-		else:
-			wet	= wettedArea(faces,draft,trim)
-		mom		= moment(ship,draft,trim,dispData[0],dispData[1].x)
-		farea	  = FloatingArea(ship,draft,trim)
-		bm		 = BMT(ship,draft,trim)
-		cm		 = mainFrameCoeff(ship,draft)
+		if not data:
+			data = evaluate(ship, faces, draft, trim)
 		# Store final data
 		self.draft = draft
 		self.trim  = trim
-		self.disp  = dispData[0]
-		self.xcb   = dispData[1].x
-		self.wet   = wet
-		self.farea = farea[0]
-		self.mom   = mom
-		self.KBt   = dispData[1].z
-		self.BMt   = bm
-		self.Cb	= dispData[2]
-		self.Cf	= farea[1]
-		self.Cm	= cm
+		self.disp  = data['disp']
+		self.xcb   = data['B'].x
+		self.wet   = data['wet']
+		self.farea = data['farea']
+		self.mom   = data['mom']
+		self.KBt   = data['B'].z
+		self.BMt   = data['BMt']
+		self.Cb	= data['Cb']
+		self.Cf	= data['Cf']
+		self.Cm	= data['Cm']
+
+def evaluate(ship, faces, draft, trim, roll=0.0, full=True):
+	""" Compute all the hydrostatics of a floating condition.
+	@param ship Selected ship instance
+	@param faces Ship external faces
+	@param draft Draft.
+	@param trim Trim in degrees.
+	@param roll Roll in degrees. Only the displacement considers it.
+	@param full False if just the displacement is required.
+	@return Hydrostatics dictionary, with the keys draft, trim, roll,
+	disp, B, Cb, and if full is requested, wet, mom, farea, Cf, BMt and
+	Cm.
+	"""
+	dispData = displacement(ship,draft,roll,trim,0.0)
+	data = {'draft':draft, 'trim':trim, 'roll':roll,
+	        'disp':dispData[0], 'B':dispData[1], 'Cb':dispData[2]}
+	if not full:
+		return data
+	if not faces and not engine(ship):
+		data['wet'] = 0.0
+	else:
+		data['wet'] = wettedArea(faces,draft,trim,ship)
+	data['mom'] = moment(ship,draft,trim,dispData[0],dispData[1].x)
+	farea = FloatingArea(ship,draft,trim)
+	data['farea'] = farea[0]
+	data['Cf'] = farea[1]
+	data['BMt'] = BMT(ship,draft,trim)
+	data['Cm'] = mainFrameCoeff(ship,draft)
+	return data
+
+# Batch worker process data, (ship, faces, full)
+_worker = None
+
+def _initWorker(ship, faces, full):
+	""" Batch worker process initialization. Workers are forked after
+	the sliced hull is built, so they find it already stored.
+	@param ship Selected ship instance
+	@param faces Ship external faces
+	@param full False if just the displacement is required.
+	"""
+	global _worker
+	_worker = (ship, faces, full)
+
+def _evaluate(condition):
+	""" Batch worker process job (see evaluate).
+	@param condition (draft, trim, roll) floating condition.
+	@return Hydrostatics dictionary, where FreeCAD vectors has been
+	replaced by tuples.
+	"""
+	ship, faces, full = _worker
+	draft, trim, roll = condition
+	data = evaluate(ship, faces, draft, trim, roll, full)
+	B = data['B']
+	data['B'] = (B.x, B.y, B.z)
+	return data
+
+def batch(ship, conditions, faces=None, callback=None, full=True, processes=1):
+	""" Compute the hydrostatics of several floating conditions. If 
+	more than one process is requested and the sliced hull engine is
+	available, conditions are computed in parallel by a pool of forked
+	processes on posix systems, otherwise they are sequentially computed.
+	@param ship Selected ship instance
+	@param conditions List of (draft, trim, roll) floating conditions.
+	@param faces Ship external faces, only used if the sliced hull 
+	engine is not available.
+	@param callback Function called each time a condition is computed,
+	in the same order as conditions, with the condition index and its
+	hydrostatics dictionary as arguments. If it returns False the 
+	computation is cancelled.
+	@param full False if just the displacement is required.
+	@param processes Number of worker processes, None to use all the 
+	available cores. Forking is not safe from the GUI, where the default
+	sequential computation must be used.
+	@return List of hydrostatics dictionaries (see evaluate). The list
+	will be shorter than conditions if the computation is cancelled.
+	"""
+	conditions = [(float(c[0]), float(c[1]), float(c[2])) for c in conditions]
+	results = []
+	sliced = engine(ship)
+	pool = None
+	if sliced and len(conditions) > 1 and processes != 1 and os.name == "posix":
+		# Workers are forked, so they share the sliced hull and don't
+		# need to import FreeCAD again
+		try:
+			import multiprocessing
+			if not processes:
+				processes = multiprocessing.cpu_count()
+			pool = multiprocessing.Pool(processes, _initWorker, (ship, faces, full))
+		except:
+			App.Console.PrintWarning("Couldn't use a process pool, computing sequentially\n")
+			if pool:
+				pool.terminate()
+			pool = None
+	if pool:
+		chunk = max(1, len(conditions) // (4*processes))
+		jobs = pool.imap(_evaluate, conditions, chunk)
+	else:
+		jobs = (evaluate(ship, faces, c[0], c[1], c[2], full) for c in conditions)
+	try:
+		for data in jobs:
+			if isinstance(data['B'], tuple):
+				data['B'] = Vector(*data['B'])
+			results.append(data)
+			if callback and callback(len(results) - 1, data) == False:
+				break
+	finally:
+		if pool:
+			pool.terminate()
+	return results
@@ -31,12 +31,15 @@ import pyopencl as cl
 # Module
 import SimInstance
 from shipUtils import Paths
-from simRun import Simulation
+from simRun import Simulation, Results
 Sim = Simulation.FreeCADShipSimulation
 
 class TaskPanel:
 	def __init__(self):
 		self.ui  = Paths.modulePath() + "/simPost/TaskPanel.ui"
+		self.sim	 = None
+		self.results = None
+		self.frame   = 0
 
 	def accept(self):
 		return True
@@ -100,6 +103,29 @@ class TaskPanel:
 	def initValues(self):
 		""" Set initial values for fields
 		"""
+		# Get the simulation, the active one or the selected one
+		path = None
+		try:
+			simulator = Sim()
+			self.sim  = simulator.sim
+			path	  = simulator.results
+		except:
+			for obj in Gui.Selection.getSelection():
+				props = obj.PropertiesList
+				if "IsShipSimulation" in props and obj.IsShipSimulation:
+					self.sim = obj
+					path	 = Results.path(obj)
+					break
+		if not self.sim:
+			msg = QtGui.QApplication.translate("ship_console", "Can't find any active simulation",
+											   None,QtGui.QApplication.UnicodeUTF8)
+			App.Console.PrintError(msg + '\n')
+			return True
+		# Open the recorded results
+		try:
+			self.results = Results.Reader(path)
+		except (IOError, ValueError):
+			self.results = None
 		return False
 
 	def retranslateUi(self):
@@ -113,41 +139,70 @@ class TaskPanel:
 	def onFirst(self):
 		""" Called when first frame button is pressed.
 		"""
+		self.showFrame(0)
 
 	def onPrev(self):
 		""" Called when previous frame button is pressed.
 		"""
+		self.showFrame(self.frame - 1)
 
 	def onNow(self):
 		""" Called when actual frame button is pressed.
 		"""
-		sim = Sim()
-		pos = sim.sim.FS_Position[:]
-		nx  = sim.FS['Nx']
-		ny  = sim.FS['Ny']
-		for i in range(0, nx):
-			for j in range(0, ny):
-				pos[i*ny+j].z = float(sim.FS['pos'][i,j][2])
-		sim.sim.FS_Position = pos[:]
-		App.ActiveDocument.recompute()
-		self.form.time.setText("t = %g s" % (sim.t))
+		try:
+			sim = Sim()
+			FS  = sim.FS
+			t   = sim.t
+		except:
+			# No active simulation, show the last recorded instant
+			self.onLast()
+			return
+		self.setPositions(FS['pos'], FS['Nx'], FS['Ny'])
+		self.form.time.setText("t = %g s" % (t))
 
 	def onNext(self):
 		""" Called when next frame button is pressed.
 		"""
+		self.showFrame(self.frame + 1)
 
 	def onLast(self):
 		""" Called when last frame button is pressed.
 		"""
+		if not self.results:
+			return
+		self.showFrame(self.results.refresh() - 1)
+
+	def showFrame(self, i):
+		""" Show a recorded time instant.
+		@param i Frame index. It will be clamped to the available frames.
+		"""
+		if not self.results:
+			return
+		n = len(self.results)
+		if i >= n:
+			# The simulation may be still running
+			n = self.results.refresh()
+		if not n:
+			return
+		self.frame = max(0, min(i, n-1))
+		frame = self.results.frame(self.frame)
+		self.setPositions(frame['pos'], self.results.nx, self.results.ny)
+		self.form.time.setText("t = %g s" % (frame['t']))
+
+	def setPositions(self, FSpos, nx, ny):
+		""" Set the free surface points elevation.
+		@param FSpos Free surface positions, as a (nx,ny,3) array.
+		@param nx Number of free surface points in x direction.
+		@param ny Number of free surface points in y direction.
+		"""
+		pos = self.sim.FS_Position[:]
+		for i in range(0, nx):
+			for j in range(0, ny):
+				pos[i*ny+j].z = float(FSpos[i,j][2])
+		self.sim.FS_Position = pos[:]
+		App.ActiveDocument.recompute()
 
 def createTask():
-	try:
-		simulator = Sim()
-	except:
-		msg = QtGui.QApplication.translate("ship_console", "Can't find any active simulation",
-										   None,QtGui.QApplication.UnicodeUTF8)
-		App.Console.PrintError(msg + '\n')
-		return
 	panel = TaskPanel()
 	Gui.Control.showDialog(panel)
 	if panel.setupUi():
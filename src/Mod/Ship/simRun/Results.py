@@ -0,0 +1,167 @@
+#***************************************************************************
+#*																		 *
+#*   Copyright (c) 2011, 2012											  *  
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>							*  
+#*																		 *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)	*
+#*   as published by the Free Software Foundation; either version 2 of	 *
+#*   the License, or (at your option) any later version.				   *
+#*   for detail see the LICENCE text file.								 *
+#*																		 *
+#*   This program is distributed in the hope that it will be useful,	   *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of		*
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the		 *
+#*   GNU Library General Public License for more details.				  *
+#*																		 *
+#*   You should have received a copy of the GNU Library General Public	 *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA																   *
+#*																		 *
+#***************************************************************************
+
+import os
+import struct
+
+# numpy
+import numpy as np
+
+# FreeCAD
+import FreeCAD
+
+# File header: magic, version, nx, ny, chunk size, number of frames
+HEADER	  = struct.Struct('<4sIIIIQ')
+HEADER_SIZE = 64
+MAGIC	   = 'FSSR'
+VERSION	 = 1
+# Number of frames allocated each time the file should grow
+CHUNK	   = 64
+
+def frameType(nx, ny):
+	""" Returns the record type of a stored time instant.
+	@param nx Number of free surface points in x direction.
+	@param ny Number of free surface points in y direction.
+	@return numpy data type.
+	"""
+	return np.dtype([('t', '<f8'),
+					 ('pos', '<f4', (nx,ny,3)),
+					 ('velPot', '<f4', (nx,ny)),
+					 ('accPot', '<f4', (nx,ny))])
+
+def path(sim):
+	""" Returns the default results file of a simulation.
+	@param sim Ship simulation instance.
+	@return Results file path.
+	"""
+	folder = FreeCAD.ConfigGet("UserAppData") + "ShipOutput/"
+	if not os.path.exists(folder):
+		os.makedirs(folder)
+	return folder + sim.Name + ".fsr"
+
+class Writer:
+	def __init__(self, filename, nx, ny, chunk=CHUNK):
+		""" Creates a results file. The file grows in chunks of frames,
+		and the header is updated after each frame is written, so the 
+		file can be read while the simulation is running.
+		@param filename Results file path.
+		@param nx Number of free surface points in x direction.
+		@param ny Number of free surface points in y direction.
+		@param chunk Number of frames allocated each time the file 
+		should grow.
+		"""
+		self.nx	   = nx
+		self.ny	   = ny
+		self.chunk	= chunk
+		self.dtype	= frameType(nx, ny)
+		self.count	= 0
+		self.capacity = 0
+		self.file	 = open(filename, 'w+b')
+		self.writeHeader()
+
+	def writeHeader(self):
+		""" Writes the file header. """
+		header = HEADER.pack(MAGIC, VERSION, self.nx, self.ny, self.chunk, self.count)
+		self.file.seek(0)
+		self.file.write(header + '\0'*(HEADER_SIZE - len(header)))
+
+	def write(self, t, fs):
+		""" Appends a time instant.
+		@param t Simulation time.
+		@param fs Free surface instance.
+		"""
+		if self.count == self.capacity:
+			self.capacity = self.capacity + self.chunk
+			self.file.truncate(HEADER_SIZE + self.capacity*self.dtype.itemsize)
+		frame = np.zeros(1, dtype=self.dtype)
+		frame['t']	  = t
+		frame['pos']	= fs['pos']
+		frame['velPot'] = fs['velPot']
+		frame['accPot'] = fs['accPot']
+		self.file.seek(HEADER_SIZE + self.count*self.dtype.itemsize)
+		self.file.write(frame.tostring())
+		self.count = self.count + 1
+		self.writeHeader()
+		self.file.flush()
+
+	def close(self):
+		""" Closes the file, discarding the unused allocated frames. """
+		if self.file.closed:
+			return
+		self.file.truncate(HEADER_SIZE + self.count*self.dtype.itemsize)
+		self.file.close()
+
+class Reader:
+	def __init__(self, filename):
+		""" Opens a results file. Frames are memory mapped, so any 
+		time instant can be accessed without loading the whole file.
+		@param filename Results file path.
+		"""
+		self.filename = filename
+		self.frames   = None
+		self.refresh()
+
+	def refresh(self):
+		""" Reads again the file header, in order to access the frames 
+		written since the file was opened.
+		@return Number of available frames.
+		"""
+		f = open(self.filename, 'rb')
+		data = f.read(HEADER.size)
+		size = os.fstat(f.fileno()).st_size
+		f.close()
+		if len(data) < HEADER.size:
+			raise ValueError("Invalid results file: " + self.filename)
+		header = HEADER.unpack(data)
+		if header[0] != MAGIC or header[1] != VERSION:
+			raise ValueError("Invalid results file: " + self.filename)
+		self.nx	= header[2]
+		self.ny	= header[3]
+		self.dtype = frameType(self.nx, self.ny)
+		# Only the complete frames of a truncated file can be read
+		count	  = min(header[5], max(0, size - HEADER_SIZE) // self.dtype.itemsize)
+		if count:
+			self.frames = np.memmap(self.filename, dtype=self.dtype, mode='r',
+									offset=HEADER_SIZE, shape=(count,))
+		else:
+			self.frames = None
+		return count
+
+	def __len__(self):
+		if self.frames is None:
+			return 0
+		return len(self.frames)
+
+	def time(self, i):
+		""" Returns the time of a frame.
+		@param i Frame index.
+		@return Simulation time.
+		"""
+		return float(self.frames[i]['t'])
+
+	def frame(self, i):
+		""" Returns a stored time instant.
+		@param i Frame index.
+		@return Record with the fields t, pos, velPot and accPot.
+		"""
+		return self.frames[i]
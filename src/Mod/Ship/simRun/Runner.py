@@ -0,0 +1,218 @@
+#***************************************************************************
+#*																		 *
+#*   Copyright (c) 2011, 2012											  *  
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>							*  
+#*																		 *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)	*
+#*   as published by the Free Software Foundation; either version 2 of	 *
+#*   the License, or (at your option) any later version.				   *
+#*   for detail see the LICENCE text file.								 *
+#*																		 *
+#*   This program is distributed in the hope that it will be useful,	   *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of		*
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the		 *
+#*   GNU Library General Public License for more details.				  *
+#*																		 *
+#*   You should have received a copy of the GNU Library General Public	 *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA																   *
+#*																		 *
+#***************************************************************************
+
+import os
+import sys
+
+# FreeCAD
+import FreeCAD
+
+# Simulation stuff
+import Results
+
+def FSMesh(sim):
+	""" Get free surface mesh, without loading the simulation instance
+	module (that requires Qt and Coin).
+	@param sim Ship simulation instance.
+	@return Free surface mesh, that can be used as a faces matrix too.
+	"""
+	from FreeSurface import FreeSurface
+	return FreeSurface.fromObject(sim)
+
+def waves(sim):
+	""" Get the simulation waves.
+	@param sim Ship simulation instance.
+	@return Waves parameters (A,T,phi,heading)
+	"""
+	wData = sim.Waves
+	wDir  = sim.Waves_Dir
+	w	 = []
+	for i in range(0,len(wData)):
+		w.append([wData[i].x, wData[i].y, wData[i].z, wDir[i]])
+	return w
+
+def backend(device=None, processes=False):
+	""" Select the simulation backend.
+	@param device OpenCL device, None if OpenCL must not be used.
+	@param processes True if the process parallel backend can be used.
+	Forking is not safe from the GUI, so only the command line runner
+	allows it.
+	@return Backend package. If processes are allowed, more than one
+	core is available, OpenCL is not used and the system can fork
+	processes, the process parallel backend is selected.
+	"""
+	if device != None:
+		import clSim
+		return clSim
+	try:
+		if not processes:
+			raise ImportError
+		import multiprocessing
+		if os.name != "posix" or multiprocessing.cpu_count() < 2:
+			raise ImportError
+		import mpSim
+		return mpSim
+	except (ImportError, NotImplementedError):
+		import Sim
+		return Sim
+
+class Runner:
+	def __init__(self, endTime, output, FSmesh, waves, results=None,
+				 device=None, context=None, queue=None, messages=None,
+				 processes=False):
+		""" Simulation runner, without any GUI dependency.
+		@param endTime Maximum simulation time.
+		@param output [Rate,Type] Output rate, Type=0 if FPS, 1 if IPF.
+		@param FSmesh Free surface mesh faces.
+		@param waves Waves parameters (A,T,phi,heading)
+		@param results Results file path, None if results must not be
+		recorded.
+		@param device OpenCL device to use, None for CPU backends.
+		@param context OpenCL context.
+		@param queue OpenCL command queue.
+		@param messages Dictionary of console messages, to provide 
+		translated ones.
+		@param processes True if the simulation can be computed by
+		forked processes (see backend).
+		"""
+		self.endTime  = endTime
+		self.output   = output
+		self.FSmesh   = FSmesh
+		self.waves	= waves
+		self.results  = results
+		self.device   = device
+		self.context  = context
+		self.queue	= queue
+		self.processes = processes
+		self.messages = {'init':'Initializating', 'iter':'Iterating'}
+		if messages:
+			self.messages.update(messages)
+		self.active   = False
+		self.t		= 0.0
+		self.FS	   = None
+
+	def run(self):
+		""" Runs the simulation until the end time is reached or stop
+		is called.
+		"""
+		self.active = True
+		sim = backend(self.device, self.processes)
+		FreeCAD.Console.PrintMessage("\t[Sim]: " + self.messages['init'] + "...\n")
+		init   = sim.simInitialization(self.FSmesh,self.waves,self.context,self.queue)
+		matGen = sim.simMatrixGen(self.context,self.queue)
+		solver = sim.simComputeSources(self.context,self.queue)
+		fsEvol = sim.simFSEvolution(self.context,self.queue)
+		A	  = init.A
+		FS	 = init.fs
+		waves  = init.waves
+		dt	 = init.dt
+		self.t  = 0.0
+		self.FS = FS
+		writer  = None
+		if self.results:
+			writer = Results.Writer(self.results, FS['Nx'], FS['Ny'])
+			writer.write(self.t, FS)
+		# Output rate
+		rate	 = self.output[0]
+		iters	= 0
+		nextTime = 0.0
+		if self.output[1] == 0 and rate > 0.0:
+			nextTime = 1.0 / rate
+		FreeCAD.Console.PrintMessage("\t[Sim]: " + self.messages['iter'] + "...\n")
+		try:
+			while self.active and self.t < self.endTime:
+				if matGen.execute(FS, A):
+					solver.invalidate()
+				solver.execute(FS, A)
+				fsEvol.execute(FS, waves, dt, self.t)
+				self.t = self.t + dt
+				iters  = iters + 1
+				FreeCAD.Console.PrintMessage('\t[Sim]: t = %g s\n' % (self.t))
+				if not writer:
+					continue
+				if self.output[1] == 0:
+					if self.t >= nextTime:
+						writer.write(self.t, FS)
+						nextTime = nextTime + 1.0 / max(rate, 1.0e-6)
+				elif iters % max(int(rate), 1) == 0:
+					writer.write(self.t, FS)
+		finally:
+			if writer:
+				writer.close()
+			# Release backend resources
+			if hasattr(init, 'close'):
+				init.close()
+			self.active = False
+
+	def stop(self):
+		""" Call to stop execution at the end of the actual iteration.
+		"""
+		self.active = False
+
+def main(argv=None):
+	""" Command line entry point, runs a simulation stored in a document.
+	@param argv Command line arguments.
+	@return Exit code.
+	"""
+	import optparse
+	parser = optparse.OptionParser(usage="%prog [options] document.fcstd [simulation]")
+	parser.add_option("-t", "--time", type="float", default=10.0,
+					  help="simulation time [s]")
+	parser.add_option("-o", "--output", type="float", default=10.0,
+					  help="output rate, frames per second (default) or iterations per frame")
+	parser.add_option("--ipf", action="store_true", default=False,
+					  help="output rate is given in iterations per frame")
+	parser.add_option("-r", "--results", default=None,
+					  help="results file (default: ShipOutput/<simulation>.fsr)")
+	opts, args = parser.parse_args(argv)
+	if not args:
+		parser.error("a document must be provided")
+	doc = FreeCAD.openDocument(args[0])
+	sim = None
+	for obj in doc.Objects:
+		if len(args) > 1 and obj.Name != args[1]:
+			continue
+		if "IsShipSimulation" in obj.PropertiesList and obj.IsShipSimulation:
+			sim = obj
+			break
+	if not sim:
+		FreeCAD.Console.PrintError("Ship simulation instance not found\n")
+		return 1
+	results = opts.results
+	if not results:
+		results = Results.path(sim)
+	output = [opts.output, 0]
+	if opts.ipf:
+		output[1] = 1
+	runner = Runner(opts.time, output, FSMesh(sim), waves(sim), results,
+					processes=True)
+	runner.run()
+	FreeCAD.closeDocument(doc.Name)
+	return 0
+
+if __name__ == '__main__':
+	# Allow to import the simulation packages
+	path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	if path not in sys.path:
+		sys.path.insert(0, path)
+	sys.exit(main())
@@ -23,6 +23,10 @@
 
 # numpy
 import numpy as np
+try:
+    from scipy.linalg import lu_factor, lu_solve
+except ImportError:
+    lu_factor = None
 
 grav=9.81
 
@@ -36,10 +40,37 @@ class simComputeSources:
         """
         self.context = context
         self.queue   = queue
+        self.lu      = None
+
+    def invalidate(self):
+        """ Discard the linear system matrix factorization. Must be 
+        called each time the matrix changes.
+        """
+        self.lu = None
+
+    def factorize(self, A):
+        """ Factorize the linear system matrix. LU factorization is used
+        if scipy is available, otherwise the inverse matrix is stored.
+        @param A Linear system matrix.
+        """
+        if lu_factor:
+            self.lu = lu_factor(A)
+        else:
+            self.lu = np.linalg.inv(A)
+
+    def solve(self, b):
+        """ Solve the linear systems using the stored factorization.
+        @param b Independent terms, one column per system.
+        @return Solutions, one column per system.
+        """
+        if lu_factor:
+            return lu_solve(self.lu, b)
+        return np.dot(self.lu, b)
 
     def execute(self, fs, A):
         """ Compute potential sources (for velocity potential and 
-        acceleration potential).
+        acceleration potential). The matrix is factorized only once,
+        until invalidate is called.
         @param fs Free surface instance.
         @param A Linear system matrix.
         """
@@ -50,20 +81,14 @@ class simComputeSources:
         nF      = nx*ny
         nB      = 0 # No body for the moment
         N       = nx*ny + nB
-        b       = np.ndarray(N, dtype=np.float32)
-        bb      = np.ndarray(N, dtype=np.float32)
-        s       = np.ndarray(N, dtype=np.float32)
-        ss      = np.ndarray(N, dtype=np.float32)
+        b       = np.zeros((N, 2), dtype=np.float32)
         # Create independent terms
-        for i in range(0,nx):
-            for j in range(0,ny):
-                b[i*ny+j]  = self.fs['velPot'][i,j]
-                bb[i*ny+j] = self.fs['accPot'][i,j]
+        b[0:nF,0] = self.fs['velPot'].reshape(nF)
+        b[0:nF,1] = self.fs['accPot'].reshape(nF)
         # Solve systems
-        s  = np.linalg.solve(A, b)
-        ss = np.linalg.solve(A, bb)
+        if self.lu is None:
+            self.factorize(A)
+        s = self.solve(b)
         # Store sources
-        for i in range(0,nx):
-            for j in range(0,ny):
-                self.fs['velSrc'][i,j] =  s[i*ny+j]
-                self.fs['accSrc'][i,j] = ss[i*ny+j]
+        self.fs['velSrc'][:,:] = s[0:nF,0].reshape(nx,ny)
+        self.fs['accSrc'][:,:] = s[0:nF,1].reshape(nx,ny)
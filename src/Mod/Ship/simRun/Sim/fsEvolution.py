@@ -26,6 +26,10 @@ import numpy as np
 
 grav=9.81
 
+# Maximum memory [bytes] used by the distances temporal arrays during the
+# gradient evaluation. Gradients will be computed in tiles to fit in.
+MAXMEM = 64*1024*1024
+
 class simFSEvolution:
     def __init__(self, context=None, queue=None):
         """ Constructor.
@@ -48,80 +52,109 @@ class simFSEvolution:
         nx      = self.fs['Nx']
         ny      = self.fs['Ny']
         nF      = nx*ny
-        grad    = self.evaluateGradient()
+        grad    = self.evaluateGradient().reshape(nx,ny,3)
+        pos     = self.fs['pos']
         # In order to improve results in really long simulations free surface
         # will performed considering external waves and second order effects
         # in two different ways. First external waves at time t will be
         # substracted, then second order waves will be computed, and finally
         # external waves at t+dt will be added.
-        for i in range(0,nx):
-            for j in range(0,ny):
-                pos = np.copy(self.fs['pos'][i,j])
-                # Substract external waves at time t.
-                for w in waves['data']:
-                    A       = w[0]
-                    T       = w[1]
-                    phase   = w[2]
-                    heading = np.pi*w[3]/180.0
-                    wl      = 0.5 * grav / np.pi * T*T
-                    k       = 2.0*np.pi/wl
-                    frec    = 2.0*np.pi/T
-                    l       = pos[0]*np.cos(heading) + pos[1]*np.sin(heading)
-                    amp     = A*np.sin(k*l - frec*t + phase)
-                    pos[2]  = pos[2] - amp
-                    amp     = - grav/frec*A*np.sin(k*l - frec*t + phase)
-                    self.fs['velPot'][i,j] = self.fs['velPot'][i,j] - amp
-                    amp     = grav*A*np.cos(k*l - frec*t + phase)
-                    self.fs['accPot'][i,j] = self.fs['accPot'][i,j] - amp
-                # Now compute second order waves using position copy, 
-                # where external waves are excluded, in order impose
-                # free surface boundary condition relative to second
-                # order phenomena.
-                self.fs['velPot'][i,j] = self.fs['velPot'][i,j]    + \
-                                         dt*self.fs['accPot'][i,j]
-                # self.fs['accPot'][i,j] = self.fs['accPot'][i,j]    + \
-                #                          grav*pos[2]
-                # Restore external waves to velocity and acceleration
-                # potentials.
-                for w in waves['data']:
-                    A       = w[0]
-                    T       = w[1]
-                    phase   = w[2]
-                    heading = np.pi*w[3]/180.0
-                    wl      = 0.5 * grav / np.pi * T*T
-                    k       = 2.0*np.pi/wl
-                    frec    = 2.0*np.pi/T
-                    l       = pos[0]*np.cos(heading) + pos[1]*np.sin(heading)
-                    amp     = - grav/frec*A*np.sin(k*l - frec*(t+dt) + phase)
-                    self.fs['velPot'][i,j] = self.fs['velPot'][i,j] + amp
-                    amp     = grav*A*np.cos(k*l - frec*(t+dt) + phase)
-                    self.fs['accPot'][i,j] = self.fs['accPot'][i,j] + amp
-                # Update free surface point position
-                gradVal = np.dot(np.abs(grad[i*ny+j]),grad[i*ny+j])
-                gradVal = np.copysign(np.sqrt(np.abs(gradVal)), gradVal)
-                self.fs['pos'][i,j][2] = self.fs['pos'][i,j][2] + dt*gradVal
+        amp, vel, acc = self.incidentWaves(pos, waves, t)
+        self.fs['velPot'][:,:] = self.fs['velPot'] - vel
+        self.fs['accPot'][:,:] = self.fs['accPot'] - acc
+        # Now compute second order waves using position copy, 
+        # where external waves are excluded, in order impose
+        # free surface boundary condition relative to second
+        # order phenomena.
+        self.fs['velPot'][:,:] = self.fs['velPot'] + dt*self.fs['accPot']
+        # self.fs['accPot'][:,:] = self.fs['accPot'] + grav*(pos[:,:,2] - amp)
+        # Restore external waves to velocity and acceleration
+        # potentials.
+        amp, vel, acc = self.incidentWaves(pos, waves, t+dt)
+        self.fs['velPot'][:,:] = self.fs['velPot'] + vel
+        self.fs['accPot'][:,:] = self.fs['accPot'] + acc
+        # Update free surface points position
+        gradVal = np.sum(np.abs(grad)*grad, axis=2)
+        gradVal = np.copysign(np.sqrt(np.abs(gradVal)), gradVal)
+        pos[:,:,2] = pos[:,:,2] + dt*gradVal
         # Impose values at beach (far free surface)
-        for i in range(0,nx):
-            for j in [0,ny-1]:
-                self.beach(i,j, waves, dt, t)
-        for j in range(0,ny):
-            for i in [0,nx-1]:
-                self.beach(i,j, waves, dt, t)
+        self.beach(waves, dt, t)
 
-    def evaluateGradient(self):
+    def incidentWaves(self, pos, waves, t):
+        """ Compute the external waves effect over a set of points.
+        @param pos Points to evaluate, with the coordinates in the last
+        axis.
+        @param waves Waves instance.
+        @param t Time.
+        @return Free surface elevation, velocity potential and 
+        acceleration potential, with the shape of pos points.
+        """
+        w       = waves['data'].astype(np.float64)
+        A       = w[:,0]
+        T       = w[:,1]
+        phase   = w[:,2]
+        heading = np.pi*w[:,3]/180.0
+        wl      = 0.5 * grav / np.pi * T*T
+        k       = 2.0*np.pi/wl
+        frec    = 2.0*np.pi/T
+        x       = pos[...,0,np.newaxis]
+        y       = pos[...,1,np.newaxis]
+        l       = x*np.cos(heading) + y*np.sin(heading)
+        arg     = k*l - frec*t + phase
+        amp     = np.sum(A*np.sin(arg), axis=-1)
+        vel     = np.sum(- grav/frec*A*np.sin(arg), axis=-1)
+        acc     = np.sum(grav*A*np.cos(arg), axis=-1)
+        return amp, vel, acc
+
+    def evaluateGradient(self, tile=None):
         """ Evaluate potential gradients over free surface.
+        @param tile Number of points evaluated at once. None to select 
+        it from the available memory (see MAXMEM).
         @return Potential gradients.
         """
         nx   = self.fs['Nx']
         ny   = self.fs['Ny']
+        return self.gradientRows(0, nx*ny, tile)
+
+    def gradientRows(self, i0, i1, tile=None):
+        """ Evaluate potential gradients over a range of free surface
+        points.
+        @param i0 First point.
+        @param i1 Last point (not included).
+        @param tile Number of points evaluated at once. None to select 
+        it from the available memory (see MAXMEM).
+        @return Potential gradients, as a (i1-i0,3) array.
+        """
+        nx   = self.fs['Nx']
+        ny   = self.fs['Ny']
         nF   = nx*ny
-        grad = np.ndarray((nF,3), dtype=np.float32)
-        for i in range(0,nx):
-            for j in range(0,ny):
-                pos = self.fs['pos'][i,j]
-                grad[i*ny+j] = self.gradientphi(pos)
-                gradVal = np.dot(np.abs(grad[i*ny+j]),grad[i*ny+j])
-                gradVal = np.copysign(np.sqrt(np.abs(gradVal)), gradVal)
+        pos  = self.fs['pos'].reshape(nF,3)
+        area = self.fs['area'].reshape(nF)
+        # Get sources position (desingularized)
+        src  = np.copy(pos)
+        src[:,2] = src[:,2] + np.sqrt(area)
+        # Sources strength
+        srcArea = self.fs['velSrc'].reshape(nF)*area
+        if not tile:
+            tile = max(1, MAXMEM // (3*nF*src.itemsize))
+        grad = np.ndarray((i1-i0,3), dtype=np.float32)
+        for i in range(i0,i1,tile):
+            n = min(tile, i1-i)
+            grad[i-i0:i-i0+n] = self.gradientKernel(pos[i:i+n], src, srcArea)
+        return grad
+
+    def gradientKernel(self, pos, src, srcArea):
+        """ Compute gradient over a set of points.
+        @param pos Points to evaluate, as a (n,3) array.
+        @param src Desingularized sources positions.
+        @param srcArea Sources strength multiplied by their areas.
+        @return Potential gradients, as a (n,3) array.
+        """
+        d    = pos[:,np.newaxis,:] - src[np.newaxis,:,:]
+        f    = srcArea / np.sum(d*d, axis=2)
+        grad = np.sum(d*f[:,:,np.newaxis], axis=1)
+        # Discard Z induced effect by desingularization
+        grad[:,2] = 0.
         return grad
 
     def gradientphi(self, pos):
@@ -131,47 +164,31 @@ class simFSEvolution:
         """
         nx   = self.fs['Nx']
         ny   = self.fs['Ny']
-        grad = np.zeros(3, dtype=np.float32)
-        for i in range(0,nx):
-            for j in range(0,ny):
-                # Get source position (desingularized)
-                srcPos    = np.copy(self.fs['pos'][i,j])
-                area      = self.fs['area'][i,j]
-                srcPos[2] = srcPos[2] + np.sqrt(area)
-                src       = self.fs['velSrc'][i,j]
-                # Get distance between points
-                d         = pos-srcPos
-                grad      = grad + d/np.dot(d,d)*src*area
-        # Discard Z induced effect by desingularization
-        grad[2] = 0.
-        return grad
+        nF   = nx*ny
+        area = self.fs['area'].reshape(nF)
+        src  = np.copy(self.fs['pos'].reshape(nF,3))
+        src[:,2] = src[:,2] + np.sqrt(area)
+        srcArea = self.fs['velSrc'].reshape(nF)*area
+        pos  = np.array(pos, dtype=np.float32).reshape(1,3)
+        return self.gradientKernel(pos, src, srcArea)[0].astype(np.float32)
 
-    def beach(self, i,j, waves, dt, t):
+    def beach(self, waves, dt, t):
         """ Compute far free surface where only 
         incident waves can be taken into account.
-        @param i First free surface cell index.
-        @param j Second free surface cell index.
         @param waves Waves instance.
         @param dt Time step.
         @param t Actual time (without adding dt).
         """
-        pos = self.fs['pos'][i,j]
-        pos[2] = 0.
-        self.fs['velPot'][i,j] = 0.
-        self.fs['accPot'][i,j] = 0.
-        for w in waves['data']:
-            A       = w[0]
-            T       = w[1]
-            phase   = w[2]
-            heading = np.pi*w[3]/180.0
-            wl      = 0.5 * grav / np.pi * T*T
-            k       = 2.0*np.pi/wl
-            frec    = 2.0*np.pi/T
-            l       = pos[0]*np.cos(heading) + pos[1]*np.sin(heading)
-            amp     = A*np.sin(k*l - frec*(t+dt) + phase)
-            self.fs['pos'][i,j][2] = self.fs['pos'][i,j][2] + amp
-            amp     = - grav/frec*A*np.sin(k*l - frec*(t+dt) + phase)
-            self.fs['velPot'][i,j] = self.fs['velPot'][i,j] + amp
-            amp     = grav*A*np.cos(k*l - frec*(t+dt) + phase)
-            self.fs['accPot'][i,j] = self.fs['accPot'][i,j] + amp
- 
\ No newline at end of file
+        nx   = self.fs['Nx']
+        ny   = self.fs['Ny']
+        mask = np.zeros((nx,ny), dtype=np.bool_)
+        mask[:,0]    = True
+        mask[:,ny-1] = True
+        mask[0,:]    = True
+        mask[nx-1,:] = True
+        pos  = self.fs['pos'][mask]
+        amp, vel, acc = self.incidentWaves(pos, waves, t+dt)
+        pos[:,2] = amp
+        self.fs['pos'][mask] = pos
+        self.fs['velPot'][mask] = vel
+        self.fs['accPot'][mask] = acc
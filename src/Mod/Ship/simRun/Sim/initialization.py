@@ -23,9 +23,14 @@
 
 # numpy
 import numpy as np
+import tempfile
 
 grav=9.81
 
+# Maximum linear system matrix size [bytes] stored in memory. Larger 
+# matrices will be stored in a temporary memory mapped file.
+MAXMATRIX = 1024*1024*1024
+
 class simInitialization:
     def __init__(self, FSmesh, waves, context=None, queue=None):
         """ Constructor.
@@ -51,9 +56,39 @@ class simInitialization:
         @param FSmesh Initial free surface mesh.
         @param waves Considered simulation waves (A,T,phi,heading).        
         """
+        nW = len(waves)
+        if hasattr(FSmesh, 'fs'):
+            # Free surface arrays can be directly used
+            self.fs = FSmesh.fs()
+        else:
+            self.fs = self.loadFaces(FSmesh)
+        nx = self.fs['Nx']
+        ny = self.fs['Ny']
+        # Waves data
+        w = np.ndarray((nW, 4), dtype=np.float32)
+        for i in range(0,nW):
+            w[i,0] = waves[i][0]
+            w[i,1] = waves[i][1]
+            w[i,2] = waves[i][2]
+            w[i,3] = waves[i][3]
+        self.waves = {'N':nW, 'data':w}
+        # Linear system matrix
+        nF     = nx*ny
+        nB     = 0 # No body for the moment
+        N      = nx*ny + nB
+        if N*N*np.dtype(np.float32).itemsize > MAXMATRIX:
+            self.A = np.memmap(tempfile.TemporaryFile(), dtype=np.float32,
+                               mode='w+', shape=(N, N))
+        else:
+            self.A = np.ndarray((N, N), dtype=np.float32)
+
+    def loadFaces(self, FSmesh):
+        """ Convert a faces matrix to numpy format.
+        @param FSmesh Initial free surface mesh faces.
+        @return Free surface instance.
+        """
         nx = len(FSmesh)
         ny = len(FSmesh[0])
-        nW = len(waves)
         # Mesh data
         p   = np.ndarray((nx,ny, 3), dtype=np.float32)
         n   = np.ndarray((nx,ny, 3), dtype=np.float32)
@@ -78,21 +113,8 @@ class simInitialization:
                 Phi[i,j] = 0.
                 s[i,j]   = 0.
                 ss[i,j]  = 0.
-        self.fs = {'Nx':nx, 'Ny':ny, 'pos':p, 'normal':n, 'area':a, \
-                   'velPot':phi, 'accPot':Phi, 'velSrc':s, 'accSrc':ss}
-        # Waves data
-        w = np.ndarray((nW, 4), dtype=np.float32)
-        for i in range(0,nW):
-            w[i,0] = waves[i][0]
-            w[i,1] = waves[i][1]
-            w[i,2] = waves[i][2]
-            w[i,3] = waves[i][3]
-        self.waves = {'N':nW, 'data':w}
-        # Linear system matrix
-        nF     = nx*ny
-        nB     = 0 # No body for the moment
-        N      = nx*ny + nB
-        self.A = np.ndarray((N, N), dtype=np.float32)
+        return {'Nx':nx, 'Ny':ny, 'pos':p, 'normal':n, 'area':a, \
+                'velPot':phi, 'accPot':Phi, 'velSrc':s, 'accSrc':ss}
 
     def execute(self):
         """ Compute initial conditions. """
@@ -26,21 +26,35 @@ import numpy as np
 
 grav=9.81
 
+# Maximum memory [bytes] used by the distances temporal arrays during the
+# matrix assembly. Matrix rows will be computed in blocks to fit in.
+MAXMEM = 64*1024*1024
+
 class simMatrixGen:
-    def __init__(self, context=None, queue=None):
+    def __init__(self, context=None, queue=None, linear=True):
         """ Constructor.
         @param context OpenCL context where apply. Only for compatibility, 
         must be None.
         @param queue OpenCL command queue. Only for compatibility, 
         must be None.
+        @param linear True if the linearized scheme must be used, where
+        the matrix is computed over the mean free surface (z = 0).
         """
-        self.context = context
-        self.queue   = queue
+        self.context  = context
+        self.queue    = queue
+        self.linear   = linear
+        self.geometry = None
 
-    def execute(self, fs, A):
-        """ Compute system matrix.
+    def execute(self, fs, A, block=None):
+        """ Compute system matrix. The matrix is only computed if the
+        free surface geometry has changed since the last call.
         @param fs Free surface instance.
-        @param A Linear system matrix.
+        @param A Linear system matrix. numpy.memmap instances can be used
+        for large meshes.
+        @param block Number of rows computed at once. None to select it
+        from the available memory (see MAXMEM).
+        @return True if the matrix has been computed, False if the 
+        geometry has not changed.
         """
         self.fs = fs
         nx      = self.fs['Nx']
@@ -48,14 +62,74 @@ class simMatrixGen:
         nF      = nx*ny
         nB      = 0 # No body for the moment
         N  = nx*ny + nB
+        geometry = (id(A), self.points(), np.copy(self.fs['area']))
+        if self.geometry and self.geometry[0] == geometry[0] and \
+           np.array_equal(self.geometry[1], geometry[1]) and \
+           np.array_equal(self.geometry[2], geometry[2]):
+            return False
+        self.geometry = geometry
+        self.assemble(A, 0, nF, block)
+        return True
+
+    def assemble(self, A, i0, i1, block=None):
+        """ Compute a range of fluid sources rows of the system matrix.
+        @param A Linear system matrix.
+        @param i0 First row.
+        @param i1 Last row (not included).
+        @param block Number of rows computed at once. None to select it
+        from the available memory (see MAXMEM).
+        """
+        nx      = self.fs['Nx']
+        ny      = self.fs['Ny']
+        nF      = nx*ny
+        pos     = self.points()
+        src     = self.sources()
+        area    = self.fs['area'].reshape(nF)
+        if not block:
+            block = max(1, MAXMEM // (3*nF*src.itemsize))
         # Fluid sources rows
-        for i in range(0,nx):
-            for j in range(0,ny):
-                # Append fluid effect
-                pos = self.fs['pos'][i,j]
-                A[i*ny+j,0:nF] = self.fluidEffect(pos)
-                # Append body effect
-                # ...
+        for i in range(i0,i1,block):
+            n = min(block, i1-i)
+            # Append fluid effect
+            A[i:i+n,0:nF] = self.kernel(pos[i:i+n], src, area)
+            # Append body effect
+            # ...
+
+    def points(self):
+        """ Compute the points where the fluid effect is evaluated.
+        @return Points positions, as a (nx*ny,3) array.
+        """
+        nx      = self.fs['Nx']
+        ny      = self.fs['Ny']
+        nF      = nx*ny
+        pos     = np.copy(self.fs['pos'].reshape(nF,3))
+        if self.linear:
+            pos[:,2] = 0.
+        return pos
+
+    def sources(self):
+        """ Compute desingularized sources positions.
+        @return Sources positions, as a (nx*ny,3) array.
+        """
+        nx      = self.fs['Nx']
+        ny      = self.fs['Ny']
+        nF      = nx*ny
+        src     = np.copy(self.fs['pos'].reshape(nF,3))
+        if self.linear:
+            src[:,2] = 0.
+        src[:,2] = src[:,2] + np.sqrt(self.fs['area'].reshape(nF))
+        return src
+
+    def kernel(self, pos, src, area):
+        """ Compute fluid effect terms over a set of points.
+        @param pos Points to evaluate, as a (n,3) array.
+        @param src Desingularized sources positions.
+        @param area Sources areas.
+        @return Fluid effect rows, as a (n,nx*ny) array.
+        """
+        d = pos[:,np.newaxis,:] - src[np.newaxis,:,:]
+        d = np.sqrt(np.sum(d*d, axis=2))
+        return np.log(d)*area
 
     def fluidEffect(self, pos):
         """ Compute fluid effect terms over desired position. Desingularized 
@@ -66,14 +140,9 @@ class simMatrixGen:
         nx  = self.fs['Nx']
         ny  = self.fs['Ny']
         nF  = nx*ny
-        row = np.ndarray(nF, dtype=np.float32)
-        for i in range(0,nx):
-            for j in range(0,ny):
-                # Get source position (desingularized)
-                source      = np.copy(self.fs['pos'][i,j])
-                area        = self.fs['area'][i,j]
-                source[2]   = source[2] + np.sqrt(area)
-                # Get distance between points
-                d           = np.linalg.norm(pos-source)
-                row[i*ny+j] = np.log(d)*area
-        return row
\ No newline at end of file
+        pos = np.array(pos, dtype=np.float32).reshape(1,3)
+        if self.linear:
+            pos[0,2] = 0.
+        row = self.kernel(pos, self.sources(),
+                          self.fs['area'].reshape(nF))
+        return row[0].astype(np.float32)
@@ -38,6 +38,8 @@ import Part
 
 # Ship design module
 from shipUtils import Paths, Math
+from Runner import Runner
+import Results
 
 class Singleton(type):
 	def __init__(cls, name, bases, dct):
@@ -51,7 +53,7 @@ class Singleton(type):
 
 class FreeCADShipSimulation(threading.Thread):
 	__metaclass__ = Singleton
-	def __init__ (self, device, endTime, output, simInstance, FSmesh, waves):
+	def __init__ (self, device, endTime, output, simInstance, FSmesh, waves, results=None):
 		""" Thread constructor.
 		@param device Device to use.
 		@param endTime Maximum simulation time.
@@ -59,6 +61,8 @@ class FreeCADShipSimulation(threading.Thread):
 		@param simInstance Simulaation instance.
 		@param FSmesh Free surface mesh faces.
 		@param waves Waves parameters (A,T,phi,heading)
+		@param results Results file path. None to use the default one
+		(see Results.path).
 		"""
 		threading.Thread.__init__(self)
 		# Setup as stopped
@@ -77,49 +81,26 @@ class FreeCADShipSimulation(threading.Thread):
 		self.sim	 = simInstance
 		self.FSmesh  = FSmesh
 		self.waves   = waves
-		
+		self.results = results
+		if not self.results:
+			self.results = Results.path(simInstance)
+		self.runner  = None
+
 	def run(self):
 		""" Runs the simulation.
 		"""
 		self.active = True
-		# Simulation stuff
-		if self.device == None:
-			from Sim import *
-		else:
-			from clSim import *
-		msg = QtGui.QApplication.translate("ship_console","Initializating",
+		# Messages are translated just once
+		messages = {}
+		messages['init'] = QtGui.QApplication.translate("ship_console","Initializating",
 								   None,QtGui.QApplication.UnicodeUTF8)
-		FreeCAD.Console.PrintMessage("\t[Sim]: " + msg + "...\n")
-		init   = simInitialization(self.FSmesh,self.waves,self.context,self.queue)
-		matGen = simMatrixGen(self.context,self.queue)
-		solver = simComputeSources(self.context,self.queue)
-		fsEvol = simFSEvolution(self.context,self.queue)
-		A	  = init.A
-		FS	 = init.fs
-		waves  = init.waves
-		dt	 = init.dt
-		self.t  = 0.0
-		self.FS = FS
-		nx = FS['Nx']
-		ny = FS['Ny']
-		msg = QtGui.QApplication.translate("ship_console","Iterating",
+		messages['iter'] = QtGui.QApplication.translate("ship_console","Iterating",
 								   None,QtGui.QApplication.UnicodeUTF8)
-		FreeCAD.Console.PrintMessage("\t[Sim]: " + msg + "...\n")
-		while self.active and self.t < self.endTime:
-			msg = QtGui.QApplication.translate("ship_console","Generating linear system matrix",
-									   None,QtGui.QApplication.UnicodeUTF8)
-			FreeCAD.Console.PrintMessage("\t\t[Sim]: " + msg + "...\n")
-			matGen.execute(FS, A)
-			msg = QtGui.QApplication.translate("ship_console","Solving linear systems",
-									   None,QtGui.QApplication.UnicodeUTF8)
-			FreeCAD.Console.PrintMessage("\t\t[Sim]: " + msg + "...\n")
-			solver.execute(FS, A)
-			msg = QtGui.QApplication.translate("ship_console","Time integrating",
-									   None,QtGui.QApplication.UnicodeUTF8)
-			FreeCAD.Console.PrintMessage("\t\t[Sim]: " + msg + "...\n")
-			fsEvol.execute(FS, waves, dt, self.t)
-			self.t = self.t + dt
-			FreeCAD.Console.PrintMessage('\t[Sim]: t = %g s\n' % (self.t))
+		self.runner = Runner(self.endTime, self.output, self.FSmesh, self.waves,
+							 self.results, self.device, self.context, self.queue,
+							 messages)
+		if self.active:
+			self.runner.run()
 		# Set thread as stopped (and prepare it to restarting)
 		self.active = False
 		threading.Event().set()
@@ -129,9 +110,21 @@ class FreeCADShipSimulation(threading.Thread):
 		""" Call to stop execution.
 		"""
 		self.active = False
+		if self.runner:
+			self.runner.stop()
 		
 	def isRunning(self):
 		""" Report thread state
 		@return True if thread is running, False otherwise.
 		"""
 		return self.active
+
+	@property
+	def t(self):
+		""" Actual simulation time. """
+		return self.runner.t
+
+	@property
+	def FS(self):
+		""" Actual free surface instance. """
+		return self.runner.FS
@@ -21,20 +21,15 @@
 #*																		 *
 #***************************************************************************
 
-# FreeCAD modules
-import FreeCAD
-import FreeCADGui
-
-# Qt libraries
-from PyQt4 import QtGui,QtCore
-
-# Main object
-import TaskPanel
+# Main object is imported when required, so the simulation packages
+# can be used without GUI (see Runner.py)
 
 def load():
 	""" Loads the tool """
+	import TaskPanel
 	TaskPanel.createTask()
 
 def stop():
 	""" Stops the simulation """
+	import TaskPanel
 	TaskPanel.stopSimulation()
@@ -0,0 +1,141 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2011, 2012                                              *
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>                            *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# Standard
+import os
+import tempfile
+import multiprocessing
+from multiprocessing import sharedctypes
+
+# numpy
+import numpy as np
+
+# FreeCAD
+import FreeCAD
+
+# Worker processes pool. Workers are forked, so they inherit the shared
+# memory arrays allocated before the pool is started.
+_pool   = None
+# Shared memory arrays, by name
+_arrays = {}
+
+def view(raw, shape, dtype):
+    """ Build a numpy view of a shared memory array.
+    @param raw Shared memory raw array.
+    @param shape Array shape.
+    @param dtype Array data type.
+    @return numpy array.
+    """
+    return np.ctypeslib.as_array(raw).view(np.dtype(dtype)).reshape(shape)
+
+def sharedArray(name, shape, dtype=np.float32, disk=False):
+    """ Allocate an array in shared memory. The array will be available
+    for the worker processes started after its creation.
+    @param name Array name.
+    @param shape Array shape.
+    @param dtype Array data type.
+    @param disk True if the array must be mapped to a temporary file
+    instead of being kept in RAM.
+    @return numpy array.
+    """
+    dtype = np.dtype(dtype)
+    if disk:
+        # File mappings are shared with the forked processes too
+        _arrays[name] = np.memmap(tempfile.TemporaryFile(), dtype=dtype,
+                                  mode='w+', shape=shape)
+    else:
+        raw = sharedctypes.RawArray('b', int(np.prod(shape))*dtype.itemsize)
+        _arrays[name] = view(raw, shape, dtype)
+    return _arrays[name]
+
+def array(name):
+    """ Get a shared memory array.
+    @param name Array name.
+    @return numpy array.
+    """
+    return _arrays[name]
+
+def freeSurface():
+    """ Build a free surface instance from the shared memory arrays.
+    @return Free surface instance.
+    """
+    pos = _arrays['pos']
+    fs  = {'Nx':pos.shape[0], 'Ny':pos.shape[1]}
+    for name in ('pos','normal','area','velPot','accPot','velSrc','accSrc'):
+        fs[name] = _arrays[name]
+    return fs
+
+def start(processes=None):
+    """ Start the worker processes. Shared memory arrays must be 
+    allocated before. Processes are only used on posix systems, where
+    they are forked, otherwise the jobs are executed by this process.
+    @param processes Number of processes, None to use all the available
+    cores.
+    """
+    global _pool
+    stop()
+    if os.name != "posix":
+        return
+    try:
+        _pool = multiprocessing.Pool(processes)
+    except:
+        FreeCAD.Console.PrintWarning("mpSim: couldn't use a process pool, computing serially\n")
+        stop()
+
+def stop():
+    """ Stop the worker processes. """
+    global _pool
+    if _pool:
+        _pool.terminate()
+        _pool = None
+
+def blocks(i0, i1):
+    """ Split a range of rows in blocks. Several blocks are generated 
+    per process in order to balance the load.
+    @param i0 First row.
+    @param i1 Last row (not included).
+    @return List of (first, last) rows blocks.
+    """
+    n     = max(1, min(i1-i0, 4*multiprocessing.cpu_count()))
+    edges = np.linspace(i0, i1, n+1).astype(np.int64)
+    return [(int(edges[i]), int(edges[i+1])) for i in range(0,n) if edges[i+1] > edges[i]]
+
+def execute(job):
+    """ Worker process job.
+    @param job (function, first row, last row, arguments...) tuple.
+    """
+    return job[0](*job[1:])
+
+def run(function, i0, i1, *args):
+    """ Execute a function over blocks of rows in the worker processes,
+    or in this process if they are not running.
+    @param function Module level function, called as 
+    function(first row, last row, *args).
+    @param i0 First row.
+    @param i1 Last row (not included).
+    """
+    if not _pool:
+        function(i0, i1, *args)
+        return
+    jobs = [(function, b[0], b[1]) + args for b in blocks(i0, i1)]
+    _pool.map(execute, jobs)
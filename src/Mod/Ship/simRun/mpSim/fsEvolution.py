@@ -0,0 +1,53 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2011, 2012                                              *
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>                            *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# numpy
+import numpy as np
+
+# Simulation stuff
+from simRun.Sim.fsEvolution import simFSEvolution as cpuFSEvolution
+import Utils
+
+def gradientRows(i0, i1, tile):
+    """ Worker process job, computes a block of the potential gradients.
+    @param i0 First point.
+    @param i1 Last point (not included).
+    @param tile Number of points evaluated at once.
+    """
+    evol    = cpuFSEvolution()
+    evol.fs = Utils.freeSurface()
+    Utils.array('grad')[i0:i1] = evol.gradientRows(i0, i1, tile)
+
+class simFSEvolution(cpuFSEvolution):
+    def evaluateGradient(self, tile=None):
+        """ Evaluate potential gradients over free surface, splitting
+        the points between the worker processes. The rest of the time
+        integration is linear with the number of points, so it is
+        computed by this process.
+        @param tile Number of points evaluated at once by each process.
+        @return Potential gradients.
+        """
+        nx = self.fs['Nx']
+        ny = self.fs['Ny']
+        Utils.run(gradientRows, 0, nx*ny, tile)
+        return np.copy(Utils.array('grad'))
@@ -0,0 +1,54 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2011, 2012                                              *
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>                            *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# numpy
+import numpy as np
+
+# Simulation stuff
+from simRun.Sim.initialization import simInitialization as cpuInitialization
+import Utils
+
+class simInitialization(cpuInitialization):
+    def loadData(self, FSmesh, waves):
+        """ Convert data to numpy format, in shared memory.
+        @param FSmesh Initial free surface mesh.
+        @param waves Considered simulation waves (A,T,phi,heading).        
+        """
+        cpuInitialization.loadData(self, FSmesh, waves)
+        for name in ('pos','normal','area','velPot','accPot','velSrc','accSrc'):
+            a = self.fs[name]
+            self.fs[name] = Utils.sharedArray(name, a.shape, a.dtype)
+            self.fs[name][...] = a
+        nF = self.fs['Nx']*self.fs['Ny']
+        N  = self.A.shape[0]
+        # Linear system matrix, mapped to a temporary file if it is too
+        # big to be kept in RAM (see Sim.initialization.MAXMATRIX)
+        disk   = isinstance(self.A, np.memmap)
+        self.A = Utils.sharedArray('A', (N,N), np.float32, disk)
+        # Potential gradients
+        Utils.sharedArray('grad', (nF,3), np.float32)
+        Utils.start()
+
+    def close(self):
+        """ Stop the worker processes. """
+        Utils.stop()
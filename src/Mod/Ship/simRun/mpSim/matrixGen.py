@@ -0,0 +1,55 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2011, 2012                                              *
+#*   Jose Luis Cercos Pita <jlcercos@gmail.com>                            *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+# numpy
+import numpy as np
+
+# Simulation stuff
+from simRun.Sim.matrixGen import simMatrixGen as cpuMatrixGen
+import Utils
+
+def assembleRows(i0, i1, linear, block):
+    """ Worker process job, computes a block of the system matrix rows.
+    @param i0 First row.
+    @param i1 Last row (not included).
+    @param linear True if the linearized scheme must be used.
+    @param block Number of rows computed at once.
+    """
+    gen    = cpuMatrixGen(linear=linear)
+    gen.fs = Utils.freeSurface()
+    cpuMatrixGen.assemble(gen, Utils.array('A'), i0, i1, block)
+
+class simMatrixGen(cpuMatrixGen):
+    def assemble(self, A, i0, i1, block=None):
+        """ Compute a range of fluid sources rows of the system matrix,
+        splitting them between the worker processes.
+        @param A Linear system matrix.
+        @param i0 First row.
+        @param i1 Last row (not included).
+        @param block Number of rows computed at once by each process.
+        """
+        if A is not Utils.array('A'):
+            # Not a shared memory matrix
+            cpuMatrixGen.assemble(self, A, i0, i1, block)
+            return
+        Utils.run(assembleRows, i0, i1, self.linear, block)
@@ -55,27 +55,35 @@ class TaskPanel:
 		roll1 = self.form.roll1.value()
 		nRoll = self.form.nRoll.value()
 		dRoll = (roll1 - roll0) / (nRoll - 1)
-		roll  = []
-		GZ	= []
+		self.roll = []
+		self.GZ   = []
 		msg = QtGui.QApplication.translate("ship_console","Computing GZ",
                                    None,QtGui.QApplication.UnicodeUTF8)
 		App.Console.PrintMessage(msg + "...\n")
-		loop=QtCore.QEventLoop()
-		timer=QtCore.QTimer()
-		timer.setSingleShot(True)
-		QtCore.QObject.connect(timer,QtCore.SIGNAL("timeout()"),loop,QtCore.SLOT("quit()"))
+		self.loop=QtCore.QEventLoop()
+		self.timer=QtCore.QTimer()
+		self.timer.setSingleShot(True)
+		QtCore.QObject.connect(self.timer,QtCore.SIGNAL("timeout()"),self.loop,QtCore.SLOT("quit()"))
 		self.running = True
-		for i in range(0, nRoll):
-			App.Console.PrintMessage("\t%d/%d\n" % (i+1,nRoll))
-			roll.append(i*dRoll)
-			GZ.append(self.computeGZ(draft[0], trim, roll[-1]))
-			timer.start(0.0)
-			loop.exec_()
-			if(not self.running):
-				break
-		PlotAux.Plot(roll, GZ, disp[0]/1000.0, draft[0], trim)
+		# Bouyancy centers are computed in parallel
+		conditions = [(draft[0], trim, i*dRoll) for i in range(0, nRoll)]
+		Hydrostatics.batch(self.ship, conditions, None, self.onGZ, False)
+		PlotAux.Plot(self.roll, self.GZ, disp[0]/1000.0, draft[0], trim)
 		return True
 
+	def onGZ(self, i, data):
+		""" Receives the hydrostatics of a roll angle.
+		@param i Roll angle index.
+		@param data Hydrostatics dictionary.
+		@return False if the computation has been cancelled.
+		"""
+		App.Console.PrintMessage("\t%d/%d\n" % (i+1,self.form.nRoll.value()))
+		self.roll.append(data['roll'])
+		self.GZ.append(self.computeGZ(data['draft'], data['trim'], data['roll'], data['B']))
+		self.timer.start(0.0)
+		self.loop.exec_()
+		return self.running
+
 	def reject(self):
 		if not self.ship:
 			return False
@@ -270,43 +278,12 @@ class TaskPanel:
 	def onAutoTrim(self):
 		""" Called when trim angle must be auto computed.
 		"""
-		# Start at null trim angle
-		trim = 0.0
-		# Get center of gravity
-		disp  = self.computeDisplacement(trim)
-		G	 = [disp[1], disp[2], disp[3]]
-		disp  = disp[0]
-		# Get bouyancy center
-		draft = self.computeDraft(disp)
-		B	 = [draft[1].x, draft[1].y, draft[1].z]
-		draft = draft[0]
-		# Get stability initial condition
-		BG	= [G[0]-B[0], G[1]-B[1], G[2]-B[2]]
-		x	 = BG[0]*math.cos(math.radians(trim)) - BG[2]*math.sin(math.radians(trim))
-		y	 = BG[1]
-		z	 = BG[0]*math.sin(math.radians(trim)) + BG[2]*math.cos(math.radians(trim))
-		var   = math.degrees(math.atan2(x,z))
-		# Iterate looking stability point
-		dVar = math.copysign(0.01, var)
-		while True:
-			if (dVar*var < 0.0) or (abs(var) < 0.1):
-				break
-			trim = trim - math.copysign(max(dVar, abs(var)/200.0), var)
-			# Get center of gravity
-			disp  = self.computeDisplacement(trim)
-			G	 = [disp[1], disp[2], disp[3]]
-			disp  = disp[0]
-			# Get bouyancy center
-			draft = self.computeDraft(disp, trim)
-			B	 = [draft[1].x, draft[1].y, draft[1].z]
-			draft = draft[0]
-			# Get stability initial condition
-			BG	= [G[0]-B[0], G[1]-B[1], G[2]-B[2]]
-			x	 = BG[0]*math.cos(math.radians(trim)) - BG[2]*math.sin(math.radians(trim))
-			y	 = BG[1]
-			z	 = BG[0]*math.sin(math.radians(trim)) + BG[2]*math.cos(math.radians(trim))
-			var   = math.degrees(math.atan2(x,z))
-		self.form.trim.setValue(trim)
+		def weights(trim):
+			""" Ship weight [ton] and center of gravity. """
+			disp = self.computeDisplacement(trim)
+			return [disp[0]/1000.0, disp[1], disp[2], disp[3]]
+		data = Hydrostatics.solveEquilibrium(self.ship, weights)
+		self.form.trim.setValue(data[1])
 
 	def onRoll(self, value):
 		""" Called when roll angles options are modified.
@@ -375,26 +352,14 @@ class TaskPanel:
 		"""
 		if not self.ship:
 			return None
-		# Initial condition
-		dens  = 1025
-		bbox  = self.ship.Shape.BoundBox
-		draft = bbox.ZMin
-		dx	= bbox.XMax - bbox.XMin
-		dy	= bbox.YMax - bbox.YMin
-		w	 = 0.0
-		xcb   = 0.0
-		while(abs(disp - w)/disp > 0.01):
-			draft = draft + (disp - w) / (dens*dx*dy)
-			ww	= Hydrostatics.displacement(self.ship, draft, 0.0, trim, 0.0)
-			w	 = 1000.0*ww[0]
-			B	 = ww[1]
-		return [draft,B]
+		return Hydrostatics.solveDraft(self.ship, disp/1000.0, trim)
 
-	def computeGZ(self, draft, trim, roll):
+	def computeGZ(self, draft, trim, roll, B=None):
 		""" Compute GZ value.
 		@param draft Ship draft.
 		@param trim Ship trim angle [degrees].
 		@param roll Ship roll angle [degrees].
+		@param B Bouyancy center, None if it must be computed.
 		@return GZ value [m].
 		"""
 		# Get center of gravity (x coordinate not relevant)
@@ -402,8 +367,9 @@ class TaskPanel:
 		G	= [disp[2], disp[3]]
 		disp = disp[0]
 		# Get bouyancy center (x coordinate not relevant)
-		disp  = Hydrostatics.displacement(self.ship, draft, roll, trim, 0.0)
-		B	 = [disp[1].y, disp[1].z]
+		if B is None:
+			B = Hydrostatics.displacement(self.ship, draft, roll, trim, 0.0)[1]
+		B	 = [B.y, B.z]
 		# GZ computation
 		BG   = [G[0] - B[0], G[1] - B[1]]
 		y	= BG[0]*math.cos(math.radians(roll)) - BG[1]*math.sin(math.radians(roll))
@@ -46,11 +46,18 @@ def All():
     suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestSketcherApp") )
     suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestPartApp") )
     suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestPartDesignApp") )
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestDraftApp") )
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestArchApp") )
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestShipApp") )
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestOpenSCADApp") )
     # gui tests of modules
     if ( FreeCAD.GuiUp == 1):
         suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestSketcherGui") )
         suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestPartGui") )
         suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestPartDesignGui") )
+        suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestDraftGui") )
+        suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestArchGui") )
+        suite.addTest(unittest.defaultTestLoader.loadTestsFromName("TestShipGui") )
     return suite
 
     